@@ -0,0 +1,17 @@
+import fakeredis
+import pytest
+
+from benchmarking.fixtures import ROUNDS, apply_benchmark_settings, bench  # noqa: F401
+
+
+@pytest.fixture(autouse=True)
+def benchmark_settings(settings, monkeypatch):
+    # Every login comes from one client: keep the rate-limit windows in the path but never reject.
+    settings.OTP_RATE_LIMITS = {scope: (10**9, window) for scope, (_limit, window) in settings.OTP_RATE_LIMITS.items()}
+    if not apply_benchmark_settings(settings):
+        redis = fakeredis.FakeRedis()
+        monkeypatch.setattr("authentication.otp.get_redis_connection", lambda *args, **kwargs: redis)
+
+
+def pytest_benchmark_update_json(config, benchmarks, output_json):
+    output_json["dataset"] = {"rounds": ROUNDS}
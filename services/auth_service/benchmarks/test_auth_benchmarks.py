@@ -0,0 +1,31 @@
+from itertools import count
+
+import pytest
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from authentication.otp import get_store
+
+pytestmark = pytest.mark.django_db
+
+
+def ok(response, status=200):
+    assert response.status_code == status, response.content[:500]
+    return response
+
+
+def test_otp_login(bench):
+    client = APIClient()
+    emails = (f"user{index}@bench.local" for index in count())
+    bench(lambda: ok(client.post(reverse("authentication:login"), {"email": next(emails)}, format="json")))
+
+
+def test_otp_confirm(bench):
+    client = APIClient()
+    emails = (f"user{index}@bench.local" for index in count())
+
+    def issue_code():
+        email = next(emails)
+        return ({"email": email, "code": get_store().issue(email, "127.0.0.1")},), {}
+
+    bench(lambda payload: ok(client.post(reverse("authentication:confirm"), payload, format="json")), setup=issue_code)
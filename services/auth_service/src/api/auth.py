@@ -1,19 +1,54 @@
 from __future__ import annotations
 
+import math
+from typing import Optional
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.mail import send_mail
-from django.db import transaction
-from rest_framework import permissions, serializers, status
+from rest_framework import exceptions, permissions, serializers, status
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework_simplejwt.tokens import RefreshToken
 
+from authentication import otp as otp_store
 from authentication.models import OTPRequest
+from ferrum_common.metrics import Counter
 
 User = get_user_model()
 
+OTP_ISSUED = Counter("otp_issued_total", "One-time login codes issued.")
+OTP_VERIFICATIONS = Counter(
+    "otp_verifications_total", "One-time code confirmations by result: success, invalid, locked, missing.", ("result",)
+)
+OTP_RATE_LIMITED = Counter(
+    "otp_rate_limited_total", "Login and confirm requests rejected by a rate limit, by scope.", ("scope",)
+)
+
+
+def client_ip(request: Request) -> Optional[str]:
+    """
+    Client address for the rate limits.
+
+    ``OTP_CLIENT_IP_HEADER`` names the header set by a trusted ingress, if
+    any; ``REMOTE_ADDR`` is used otherwise. In a list header such as
+    ``X-Forwarded-For`` every proxy appends the address it saw, and the
+    entries on the left come from the client and can be forged. So the
+    entry ``OTP_TRUSTED_PROXY_HOPS`` from the right is taken.
+    """
+    header = getattr(settings, "OTP_CLIENT_IP_HEADER", "")
+    hops = [part.strip() for part in (request.META.get(header) or "").split(",") if part.strip()] if header else []
+    if not hops:
+        return request.META.get("REMOTE_ADDR") or None
+    trusted = max(int(getattr(settings, "OTP_TRUSTED_PROXY_HOPS", 1)), 1)
+    return hops[-min(trusted, len(hops))]
+
+
+def rate_limited(exc: otp_store.RateLimited) -> exceptions.Throttled:
+    OTP_RATE_LIMITED.inc(exc.scope)
+    return exceptions.Throttled(wait=math.ceil(exc.retry_after), detail="Слишком много запросов. Попробуйте позже.")
+
 
 class LoginSerializer(serializers.Serializer):
     email = serializers.EmailField()
@@ -30,22 +65,21 @@ class ConfirmSerializer(serializers.Serializer):
     code = serializers.CharField(min_length=6, max_length=6)
 
     def validate(self, attrs):
-        email = attrs["email"]
-        code = attrs["code"]
-
+        email = otp_store.normalize_email(attrs["email"])
         try:
-            otp = OTPRequest.objects.get(email=email)
-        except OTPRequest.DoesNotExist as exc:
-            raise serializers.ValidationError({"email": "Код для этого email не найден."}) from exc
-
-        if otp.is_expired():
-            raise serializers.ValidationError({"code": "Срок действия кода истек."})
-
-        if otp.code != code:
-            otp.register_attempt(False)
+            result, _attempts = otp_store.get_store().verify(email, attrs["code"], self.context.get("ip"))
+        except otp_store.RateLimited as exc:
+            raise rate_limited(exc) from exc
+        OTP_VERIFICATIONS.inc(result)
+        if result != otp_store.MISSING and getattr(settings, "OTP_AUDIT_ENABLED", False):
+            OTPRequest.record_attempt(email, success=result == otp_store.SUCCESS)
+
+        if result == otp_store.MISSING:
+            raise serializers.ValidationError({"email": "Код для этого email не найден или срок его действия истек."})
+        if result == otp_store.LOCKED:
+            raise serializers.ValidationError({"code": "Превышено число попыток ввода кода. Запросите новый код."})
+        if result != otp_store.SUCCESS:
             raise serializers.ValidationError({"code": "Неверный код подтверждения."})
-
-        attrs["otp"] = otp
         return attrs
 
 
@@ -63,12 +97,20 @@ class LoginView(APIView):
         serializer = LoginSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         email = serializer.validated_data["email"]
+        ip = client_ip(request)
 
-        otp = OTPRequest.issue_code(email=email)
+        store = otp_store.get_store()
+        try:
+            code = store.issue(email, ip)
+        except otp_store.RateLimited as exc:
+            raise rate_limited(exc) from exc
+        OTP_ISSUED.inc()
+        if getattr(settings, "OTP_AUDIT_ENABLED", False):
+            OTPRequest.record_issued(otp_store.normalize_email(email), ip, store.ttl)
 
         send_mail(
             subject="Ваш код авторизации",
-            message=f"Ваш одноразовый код: {otp.code}",
+            message=f"Ваш одноразовый код: {code}",
             from_email=settings.DEFAULT_FROM_EMAIL if hasattr(settings, "DEFAULT_FROM_EMAIL") else None,
             recipient_list=[email],
             fail_silently=True,
@@ -83,11 +125,10 @@ class LoginView(APIView):
 class ConfirmView(APIView):
     permission_classes = (permissions.AllowAny,)
 
-    @transaction.atomic
     def post(self, request: Request) -> Response:
-        serializer = ConfirmSerializer(data=request.data)
+        # No surrounding transaction: audit rows of failed attempts must survive the 400.
+        serializer = ConfirmSerializer(data=request.data, context={"ip": client_ip(request)})
         serializer.is_valid(raise_exception=True)
-        otp: OTPRequest = serializer.validated_data["otp"]
         email = serializer.validated_data["email"]
 
         user, _created = User.objects.get_or_create(
@@ -98,8 +139,6 @@ class ConfirmView(APIView):
         refresh = RefreshToken.for_user(user)
         access_token = str(refresh.access_token)
 
-        otp.delete()
-
         response = Response(
             {
                 "access": access_token,
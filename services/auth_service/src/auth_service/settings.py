@@ -29,6 +29,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "ferrum_common.metrics.MetricsMiddleware",
+    "ferrum_common.tracing.TracingMiddleware",
+    "ferrum_common.query_budget.QueryBudgetMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -65,6 +68,14 @@ DATABASES = {
     )
 }
 
+CACHES = {
+    "default": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": os.getenv("REDIS_URL", "redis://localhost:6379/3"),
+        "OPTIONS": {"CLIENT_CLASS": "django_redis.client.DefaultClient"},
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -92,6 +103,15 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_RENDERER_CLASSES": (
+        "ferrum_common.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "ferrum_common.parsers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
     "DEFAULT_AUTHENTICATION_CLASSES": ("rest_framework_simplejwt.authentication.JWTAuthentication",),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
 }
@@ -112,7 +132,34 @@ SIMPLE_JWT = {
     "BLACKLIST_AFTER_ROTATION": True,
 }
 
+# One-time codes live in Redis (authentication.otp.OTPStore) and expire after OTP_TTL seconds.
+OTP_TTL = int(os.getenv("OTP_TTL", 300))
 OTP_MAX_ATTEMPTS = int(os.getenv("OTP_MAX_ATTEMPTS", 5))
+# Sliding-window limits: scope -> (requests, window in seconds); a limit of 0 disables the scope.
+OTP_RATE_LIMITS = {
+    "login:email": (int(os.getenv("OTP_LOGIN_EMAIL_LIMIT", 5)), 600),
+    "login:ip": (int(os.getenv("OTP_LOGIN_IP_LIMIT", 30)), 600),
+    "confirm:ip": (int(os.getenv("OTP_CONFIRM_IP_LIMIT", 60)), 600),
+}
+# META key of the client address header set by a trusted ingress, e.g. "HTTP_X_REAL_IP"; REMOTE_ADDR otherwise.
+OTP_CLIENT_IP_HEADER = os.getenv("OTP_CLIENT_IP_HEADER", "")
+# Trusted proxies appending to a list header (X-Forwarded-For): the client is this many entries from the right.
+OTP_TRUSTED_PROXY_HOPS = int(os.getenv("OTP_TRUSTED_PROXY_HOPS", 1))
+# Keep an OTPRequest row per email (issue time, attempts, confirmation) as an audit trail.
+OTP_AUDIT_ENABLED = os.getenv("OTP_AUDIT_ENABLED", "false").lower() == "true"
 OTP_COOKIE_NAME = os.getenv("REFRESH_COOKIE_NAME", "refresh_token")
 OTP_COOKIE_SECURE = os.getenv("REFRESH_COOKIE_SECURE", "false").lower() == "true"
 
+# Query budgets per "<METHOD> <url name>", enforced by ferrum_common.query_budget.QueryBudgetMiddleware in tests.
+QUERY_BUDGET_ENABLED = os.getenv("QUERY_BUDGET_ENABLED", str(DEBUG)).lower() == "true"
+QUERY_BUDGET_N_PLUS_ONE_THRESHOLD = int(os.getenv("QUERY_BUDGET_N_PLUS_ONE_THRESHOLD", 3))
+QUERY_BUDGETS = {
+    "POST authentication:login": 3,
+    "POST authentication:confirm": 6,
+}
+
+# OpenTelemetry tracing (ferrum_common.tracing): "memory", "console", "file" (JSON lines in TRACING_FILE_PATH)
+# or a dotted path to an exporter class, e.g. the OTLP one. Empty disables tracing.
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "")
+TRACING_FILE_PATH = os.getenv("TRACING_FILE_PATH", str(BASE_DIR / "traces.jsonl"))
+TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "auth_service")
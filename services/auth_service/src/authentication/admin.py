@@ -5,7 +5,7 @@ from .models import OTPRequest
 
 @admin.register(OTPRequest)
 class OTPRequestAdmin(admin.ModelAdmin):
-    list_display = ("email", "expires_at", "attempts", "created_at")
-    search_fields = ("email",)
-    readonly_fields = ("created_at", "last_sent_at")
+    list_display = ("email", "last_sent_at", "attempts", "confirmed_at", "last_ip")
+    search_fields = ("email", "last_ip")
+    readonly_fields = ("created_at", "last_sent_at", "confirmed_at")
 
@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("authentication", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name="otprequest",
+            name="code",
+        ),
+        migrations.AddField(
+            model_name="otprequest",
+            name="confirmed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="otprequest",
+            name="last_ip",
+            field=models.GenericIPAddressField(blank=True, null=True),
+        ),
+    ]
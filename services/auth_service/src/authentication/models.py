@@ -1,11 +1,9 @@
 from __future__ import annotations
 
-import secrets
 from datetime import timedelta
+from typing import Optional
 
-from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.validators import MinLengthValidator
 from django.db import models
 from django.utils import timezone
 
@@ -17,16 +15,21 @@ def default_expiration() -> timezone.datetime:
 
 
 class OTPRequest(models.Model):
+    """
+    Audit trail of one-time login codes, one row per email.
+
+    Codes themselves live in Redis (``authentication.otp.OTPStore``); rows are
+    written only when ``OTP_AUDIT_ENABLED`` is set and are never read on the
+    login path.
+    """
+
     email = models.EmailField(unique=True)
-    code = models.CharField(
-        max_length=6,
-        validators=[MinLengthValidator(6)],
-        help_text="Одноразовый шестизначный код подтверждения.",
-    )
     created_at = models.DateTimeField(auto_now_add=True)
     expires_at = models.DateTimeField(default=default_expiration)
     attempts = models.PositiveSmallIntegerField(default=0)
     last_sent_at = models.DateTimeField(auto_now=True)
+    last_ip = models.GenericIPAddressField(null=True, blank=True)
+    confirmed_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ("-created_at",)
@@ -34,28 +37,24 @@ class OTPRequest(models.Model):
         verbose_name_plural = "OTP запросы"
 
     @classmethod
-    def issue_code(cls, email: str) -> "OTPRequest":
-        code = "".join(secrets.choice("0123456789") for _ in range(6))
-        obj, _created = cls.objects.update_or_create(
+    def record_issued(cls, email: str, ip: Optional[str], ttl: int) -> None:
+        cls.objects.update_or_create(
             email=email,
             defaults={
-                "code": code,
-                "expires_at": timezone.now() + timedelta(minutes=5),
+                "expires_at": timezone.now() + timedelta(seconds=ttl),
                 "attempts": 0,
+                "last_ip": ip,
+                "confirmed_at": None,
             },
         )
-        return obj
-
-    def is_expired(self) -> bool:
-        return timezone.now() > self.expires_at
 
-    def register_attempt(self, success: bool) -> None:
-        self.attempts = models.F("attempts") + 1
-        self.save(update_fields=["attempts"])
-        if not success and self.attempts >= getattr(settings, "OTP_MAX_ATTEMPTS", 5):
-            self.expires_at = timezone.now()
-            self.save(update_fields=["expires_at"])
+    @classmethod
+    def record_attempt(cls, email: str, success: bool) -> None:
+        # One UPDATE: the counter is incremented in the database, not read-modified-written.
+        changes = {"attempts": models.F("attempts") + 1}
+        if success:
+            changes["confirmed_at"] = timezone.now()
+        cls.objects.filter(email=email).update(**changes)
 
     def __str__(self) -> str:  # pragma: no cover - human readable
         return f"OTPRequest(email={self.email}, expires_at={self.expires_at})"
-
@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import hashlib
+import hmac
+import math
+import secrets
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+
+from ferrum_common.metrics import get_redis_connection
+
+MISSING = "missing"
+INVALID = "invalid"
+LOCKED = "locked"
+SUCCESS = "success"
+
+KEY_PREFIX = "otp"
+
+# (scope, key, limit, window in ms)
+Window = Tuple[str, str, int, int]
+
+# Sliding-window log: every admitted request is a member of a sorted set
+# scored by its timestamp. ``admit`` first checks every window and only then
+# records the request in all of them, so a rejected request uses no quota.
+# Window ``i`` is KEYS[offset + i]; its limit and length (ms) are
+# ARGV[argv_offset + 2i - 1] and ARGV[argv_offset + 2i].
+_ADMIT_LUA = """
+local function admit(now, member, offset, argv_offset)
+    local windows = #KEYS - offset
+    for i = 1, windows do
+        local key = KEYS[offset + i]
+        local limit = tonumber(ARGV[argv_offset + 2 * i - 1])
+        local window = tonumber(ARGV[argv_offset + 2 * i])
+        redis.call('ZREMRANGEBYSCORE', key, '-inf', now - window)
+        if redis.call('ZCARD', key) >= limit then
+            local oldest = redis.call('ZRANGE', key, 0, 0, 'WITHSCORES')
+            return {i, tonumber(oldest[2]) + window - now}
+        end
+    end
+    for i = 1, windows do
+        local key = KEYS[offset + i]
+        redis.call('ZADD', key, now, member)
+        redis.call('PEXPIRE', key, tonumber(ARGV[argv_offset + 2 * i]))
+    end
+    return nil
+end
+"""
+
+# KEYS: code hash, rate-limit windows...
+# ARGV: now (ms), request id, code digest, code TTL (s), (limit, window ms) per window
+_ISSUE_LUA = (
+    _ADMIT_LUA
+    + """
+local rejected = admit(tonumber(ARGV[1]), ARGV[2], 1, 4)
+if rejected then
+    return rejected
+end
+redis.call('DEL', KEYS[1])
+redis.call('HSET', KEYS[1], 'digest', ARGV[3], 'attempts', 0)
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[4]))
+return {0, 0}
+"""
+)
+
+# KEYS: code hash, rate-limit windows...
+# ARGV: now (ms), request id, code digest, max attempts, (limit, window ms) per window
+_VERIFY_LUA = (
+    _ADMIT_LUA
+    + """
+local rejected = admit(tonumber(ARGV[1]), ARGV[2], 1, 4)
+if rejected then
+    return {'rate_limited', rejected[1], rejected[2]}
+end
+local digest = redis.call('HGET', KEYS[1], 'digest')
+if not digest then
+    return {'missing', 0, 0}
+end
+if digest == ARGV[3] then
+    redis.call('DEL', KEYS[1])
+    return {'success', 0, 0}
+end
+local attempts = redis.call('HINCRBY', KEYS[1], 'attempts', 1)
+if attempts >= tonumber(ARGV[4]) then
+    redis.call('DEL', KEYS[1])
+    return {'locked', attempts, 0}
+end
+return {'invalid', attempts, 0}
+"""
+)
+
+
+class RateLimited(Exception):
+    """Too many requests for one email or IP within the sliding window."""
+
+    def __init__(self, scope: str, retry_after: float):
+        super().__init__(f"Rate limit {scope} exceeded, retry in {retry_after:.0f}s")
+        self.scope = scope
+        self.retry_after = retry_after
+
+
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
+def generate_code() -> str:
+    return "".join(secrets.choice("0123456789") for _ in range(6))
+
+
+def _decode(value) -> str:
+    return value.decode() if isinstance(value, bytes) else str(value)
+
+
+class OTPStore:
+    """
+    One-time login codes kept in Redis.
+
+    A code lives in a hash (``otp:code:<email>``) holding the HMAC of the
+    code and the number of failed attempts; Redis expires it after
+    ``OTP_TTL`` seconds. Issuing and verifying are single Lua scripts, so
+    the code, the attempt counter and the sliding-window rate limits of
+    ``OTP_RATE_LIMITS`` change atomically in one round-trip. A code is
+    deleted when it is confirmed or after ``OTP_MAX_ATTEMPTS`` failures.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+        self._issue = connection.register_script(_ISSUE_LUA)
+        self._verify = connection.register_script(_VERIFY_LUA)
+
+    def issue(self, email: str, ip: Optional[str]) -> str:
+        """Store a fresh code for ``email`` (replacing an older one) and return it; raises ``RateLimited``."""
+        email = normalize_email(email)
+        code = generate_code()
+        windows = self._windows(("login:email", email), ("login:ip", ip))
+        rejected, retry_after = self._issue(
+            keys=[self.code_key(email), *(window[1] for window in windows)],
+            args=[self._now_ms(), secrets.token_hex(8), self._digest(email, code), self.ttl, *self._limits(windows)],
+        )
+        if rejected:
+            raise RateLimited(windows[int(rejected) - 1][0], int(retry_after) / 1000)
+        return code
+
+    def verify(self, email: str, code: str, ip: Optional[str]) -> Tuple[str, int]:
+        """
+        Check ``code`` for ``email``; returns ``(result, attempts)``.
+
+        ``result`` is ``SUCCESS`` (the code is consumed), ``INVALID``,
+        ``LOCKED`` (the failure used up the attempts, the code is gone) or
+        ``MISSING`` (no code issued or it expired). Raises ``RateLimited``.
+        """
+        email = normalize_email(email)
+        windows = self._windows(("confirm:ip", ip))
+        result, attempts, retry_after = self._verify(
+            keys=[self.code_key(email), *(window[1] for window in windows)],
+            args=[
+                self._now_ms(),
+                secrets.token_hex(8),
+                self._digest(email, code),
+                self.max_attempts,
+                *self._limits(windows),
+            ],
+        )
+        result = _decode(result)
+        if result == "rate_limited":
+            raise RateLimited(windows[int(attempts) - 1][0], int(retry_after) / 1000)
+        return result, int(attempts)
+
+    @property
+    def ttl(self) -> int:
+        return getattr(settings, "OTP_TTL", 300)
+
+    @property
+    def max_attempts(self) -> int:
+        return getattr(settings, "OTP_MAX_ATTEMPTS", 5)
+
+    @staticmethod
+    def code_key(email: str) -> str:
+        return f"{KEY_PREFIX}:code:{email}"
+
+    @staticmethod
+    def _digest(email: str, code: str) -> str:
+        # Only an HMAC of the code is stored, a Redis dump does not reveal live codes.
+        return hmac.new(settings.SECRET_KEY.encode(), f"{email}:{code}".encode(), hashlib.sha256).hexdigest()
+
+    @staticmethod
+    def _now_ms() -> int:
+        return int(time.time() * 1000)
+
+    @staticmethod
+    def _windows(*scopes: Tuple[str, Optional[str]]) -> List[Window]:
+        """``(scope, key, limit, window_ms)`` for each configured ``(scope, subject)``; unlimited scopes are skipped."""
+        limits: Dict[str, Sequence[int]] = getattr(settings, "OTP_RATE_LIMITS", {})
+        windows = []
+        for scope, subject in scopes:
+            limit, window = limits.get(scope) or (0, 0)
+            if limit > 0 and subject:
+                windows.append((scope, f"{KEY_PREFIX}:rate:{scope}:{subject}", int(limit), math.ceil(window * 1000)))
+        return windows
+
+    @staticmethod
+    def _limits(windows: List[Window]) -> List[int]:
+        return [value for _scope, _key, limit, window in windows for value in (limit, window)]
+
+
+def get_store() -> OTPStore:
+    return OTPStore(get_redis_connection("default"))
@@ -0,0 +1 @@
+"""Shared helpers for auth service."""
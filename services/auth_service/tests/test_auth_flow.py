@@ -1,36 +1,135 @@
 from __future__ import annotations
 
+import pytest
 from django.urls import reverse
 from rest_framework.test import APIClient
 
+from authentication import otp
 from authentication.models import OTPRequest
+from ferrum_common import metrics
 
 
-def test_login_creates_otp(db, monkeypatch):
+def login(client, email="user@example.com", **extra):
+    return client.post(reverse("authentication:login"), {"email": email}, format="json", **extra)
+
+
+def confirm(client, code, email="user@example.com", **extra):
+    return client.post(reverse("authentication:confirm"), {"email": email, "code": code}, format="json", **extra)
+
+
+def test_login_stores_code_in_redis_with_ttl(db, monkeypatch, otp_redis, settings):
     client = APIClient()
-    monkeypatch.setattr("authentication.models.secrets.choice", lambda _: "1")
+    monkeypatch.setattr("authentication.otp.secrets.choice", lambda _: "1")
 
-    response = client.post(reverse("authentication:login"), {"email": "user@example.com"}, format="json")
+    response = login(client, email="User@Example.com")
 
     assert response.status_code == 200
-    assert OTPRequest.objects.filter(email="user@example.com").exists()
-    otp = OTPRequest.objects.get(email="user@example.com")
-    assert otp.code == "111111"
+    key = otp.OTPStore.code_key("user@example.com")
+    assert 0 < otp_redis.ttl(key) <= settings.OTP_TTL
+    # Only a digest of the code is kept.
+    assert b"111111" not in otp_redis.hget(key, "digest")
+    assert not OTPRequest.objects.exists()
 
 
-def test_confirm_returns_tokens(db):
+def test_confirm_returns_tokens(db, monkeypatch):
     client = APIClient()
-    OTPRequest.issue_code("user@example.com")
-    otp = OTPRequest.objects.get(email="user@example.com")
+    monkeypatch.setattr("authentication.otp.secrets.choice", lambda _: "1")
+    login(client)
 
-    response = client.post(
-        reverse("authentication:confirm"),
-        {"email": "user@example.com", "code": otp.code},
-        format="json",
-    )
+    response = confirm(client, "111111")
 
     assert response.status_code == 200
     data = response.json()
     assert "access" in data
     assert response.cookies.get("refresh_token") is not None
+    # The code is single-use.
+    assert confirm(client, "111111").status_code == 400
+
+
+def test_code_is_dropped_after_max_attempts(db, monkeypatch, settings):
+    settings.OTP_MAX_ATTEMPTS = 3
+    client = APIClient()
+    monkeypatch.setattr("authentication.otp.secrets.choice", lambda _: "1")
+    login(client)
+
+    assert [confirm(client, "000000").status_code for _ in range(2)] == [400, 400]
+    response = confirm(client, "000000")
+    assert "попыток" in response.json()["code"][0]
+    # Even the right code no longer works.
+    assert "email" in confirm(client, "111111").json()
+
+
+def test_login_is_rate_limited_per_email_and_ip(db, settings):
+    settings.OTP_RATE_LIMITS = {"login:email": (2, 600), "login:ip": (3, 600)}
+    client = APIClient()
+
+    assert [login(client).status_code for _ in range(3)] == [200, 200, 429]
+    limited = login(client)
+    assert limited.status_code == 429
+    assert 0 < int(limited["Retry-After"]) <= 600
+
+    assert login(client, email="other@example.com").status_code == 200
+    # Both rejected requests above spent no quota, the IP allowed three logins in total.
+    assert login(client, email="third@example.com").status_code == 429
+    assert login(client, email="third@example.com", REMOTE_ADDR="10.0.0.2").status_code == 200
+
+
+def test_forwarded_client_ip_ignores_entries_set_by_the_client(db, settings):
+    settings.OTP_RATE_LIMITS = {"login:ip": (1, 600)}
+    settings.OTP_CLIENT_IP_HEADER = "HTTP_X_FORWARDED_FOR"
+    client = APIClient()
+
+    assert login(client, HTTP_X_FORWARDED_FOR="1.1.1.1, 203.0.113.5").status_code == 200
+    # A forged leftmost entry does not give the same client a fresh quota.
+    assert login(client, email="other@example.com", HTTP_X_FORWARDED_FOR="2.2.2.2, 203.0.113.5").status_code == 429
+    assert login(client, email="other@example.com", HTTP_X_FORWARDED_FOR="203.0.113.6").status_code == 200
+
+    settings.OTP_TRUSTED_PROXY_HOPS = 2
+    forwarded = "9.9.9.9, 203.0.113.7, 10.0.0.1"
+    assert login(client, email="third@example.com", HTTP_X_FORWARDED_FOR=forwarded).status_code == 200
+    assert login(client, email="fourth@example.com", HTTP_X_FORWARDED_FOR=forwarded).status_code == 429
+
+
+def test_rate_limit_window_slides(monkeypatch, settings):
+    settings.OTP_RATE_LIMITS = {"login:email": (1, 60)}
+    now = [1_000_000]
+    monkeypatch.setattr(otp.OTPStore, "_now_ms", staticmethod(lambda: now[0]))
+    store = otp.get_store()
+
+    store.issue("user@example.com", "10.0.0.1")
+    now[0] += 59_000
+    with pytest.raises(otp.RateLimited) as excinfo:
+        store.issue("user@example.com", "10.0.0.1")
+    assert (excinfo.value.scope, excinfo.value.retry_after) == ("login:email", 1.0)
+    now[0] += 1_000
+    store.issue("user@example.com", "10.0.0.1")
+
+
+def test_audit_trail_records_issue_and_attempts(db, monkeypatch, settings):
+    settings.OTP_AUDIT_ENABLED = True
+    client = APIClient()
+    monkeypatch.setattr("authentication.otp.secrets.choice", lambda _: "1")
+
+    login(client, REMOTE_ADDR="10.0.0.7")
+    confirm(client, "000000")
+    confirm(client, "000000")
+    assert confirm(client, "111111").status_code == 200
+
+    audit = OTPRequest.objects.get(email="user@example.com")
+    assert (audit.attempts, audit.last_ip) == (3, "10.0.0.7")
+    assert audit.confirmed_at is not None
+
+
+def test_otp_outcomes_are_counted(db, monkeypatch):
+    client = APIClient()
+    monkeypatch.setattr("authentication.otp.secrets.choice", lambda _: "1")
+    before = metrics.sample("otp_verifications_total", "missing") or 0
+    invalid_before = metrics.sample("otp_verifications_total", "invalid") or 0
+
+    login(client)
+    assert confirm(client, "123456", email="other@example.com").status_code == 400
+    assert confirm(client, "000000").status_code == 400
 
+    assert metrics.sample("otp_verifications_total", "missing") == before + 1
+    assert metrics.sample("otp_verifications_total", "invalid") == invalid_before + 1
+    assert metrics.sample("otp_issued_total") >= 1
@@ -0,0 +1,18 @@
+"""
+Helpers shared by the service benchmarks and ``loadtest.py``.
+
+This package only uses the standard library; the pytest fixtures live in
+``benchmarking.fixtures``. The services put ``services/`` on the pytest
+``pythonpath`` to import it.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Sequence
+
+
+def percentile(data: Sequence[float], q: float) -> float:
+    """Nearest-rank percentile of ``data``; 0 for no data."""
+    ordered = sorted(data)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)] if ordered else 0.0
@@ -0,0 +1,60 @@
+"""
+pytest-benchmark fixtures shared by the ``benchmarks/conftest.py`` of the services.
+
+Import the fixtures into the conftest (``from benchmarking.fixtures import bench``)
+and call ``apply_benchmark_settings`` from its ``benchmark_settings`` fixture.
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Callable, Optional
+
+import pytest
+
+from benchmarking import percentile
+
+ROUNDS = int(os.getenv("BENCH_ROUNDS", "50"))
+
+
+def apply_benchmark_settings(settings) -> bool:
+    """
+    Production-like settings for a benchmark run.
+
+    Turns off ``DEBUG`` and the query budgets and, when ``BENCH_REDIS_URL``
+    is set, points the default cache at that Redis. Returns whether it did,
+    so the caller can pick its own fallback.
+    """
+    settings.DEBUG = False
+    settings.QUERY_BUDGET_ENABLED = False
+    redis_url = os.getenv("BENCH_REDIS_URL")
+    if not redis_url:
+        return False
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": redis_url,
+            "OPTIONS": {"CLIENT_CLASS": "django_redis.client.DefaultClient"},
+        }
+    }
+    return True
+
+
+@pytest.fixture
+def bench(benchmark):
+    """
+    ``bench(func)`` times ``func`` for ``BENCH_ROUNDS`` rounds.
+
+    p50/p95/p99 (ms) and throughput (requests/s of one worker) are stored
+    in the benchmark's ``extra_info`` and end up in ``--benchmark-json``.
+    """
+
+    def run(func: Callable, setup: Optional[Callable] = None, rounds: int = ROUNDS):
+        result = benchmark.pedantic(func, setup=setup, rounds=rounds, warmup_rounds=0 if setup else 2, iterations=1)
+        if benchmark.stats is not None:
+            data = benchmark.stats.stats.data
+            benchmark.extra_info.update({f"p{q}_ms": round(percentile(data, q) * 1000, 3) for q in (50, 95, 99)})
+            benchmark.extra_info["throughput_rps"] = round(len(data) / sum(data), 1)
+        return result
+
+    return run
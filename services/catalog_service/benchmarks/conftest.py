@@ -0,0 +1,46 @@
+import math
+import os
+
+import pytest
+from django.core.management import call_command
+
+from benchmarking.fixtures import ROUNDS, apply_benchmark_settings, bench  # noqa: F401
+
+# BENCH_SCALE=0.01 seeds a hundredth of the dataset for a quick smoke run.
+SCALE = float(os.getenv("BENCH_SCALE", "1"))
+DATASET = {
+    "products": 100_000,
+    "category_depth": 6,
+    "category_fanout": 4,
+    "basket_users": 20,
+    "basket_items": 50,
+}
+
+
+def scaled(value: int) -> int:
+    return max(1, math.ceil(value * SCALE))
+
+
+def dataset() -> dict:
+    return {
+        **DATASET,
+        "products": scaled(DATASET["products"]),
+        "basket_users": scaled(DATASET["basket_users"]),
+    }
+
+
+@pytest.fixture(scope="session")
+def django_db_setup(django_db_setup, django_db_blocker):
+    """Seed the benchmark dataset once per session; tests run in transactions on top of it."""
+    with django_db_blocker.unblock():
+        call_command("seed_benchmark", verbosity=0, **dataset())
+
+
+@pytest.fixture(autouse=True)
+def benchmark_settings(settings):
+    if not apply_benchmark_settings(settings):
+        settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+def pytest_benchmark_update_json(config, benchmarks, output_json):
+    output_json["dataset"] = {"scale": SCALE, "rounds": ROUNDS, **dataset()}
@@ -0,0 +1,115 @@
+"""
+Rows/sec of the product, brand and size list serializers: DRF vs compiled.
+
+Seeds ``--products`` products (two images and two sizes each) into the
+configured database, then renders pages of ``--page-size`` rows to JSON
+bytes with ``ModelSerializer`` + ``JSONRenderer`` and with
+``CompiledSerializer`` + orjson, checking that both produce the same bytes::
+
+    DATABASE_URL=sqlite:////tmp/catalog_bench.sqlite3 python benchmarks/serializer_throughput.py
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "catalog_service.settings")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--products", type=int, default=2000)
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    import django
+
+    django.setup()
+
+    from django.core.management import call_command
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from api.goods import BrandSerializer, ProductSerializer, SizeSerializer
+    from catalog.models import Category
+    from common.fast_serializers import compile_serializer
+    from ferrum_common.renderers import dumps
+    from goods.models import Brand, Product, ProductImage, ProductSize, Size
+
+    call_command("migrate", verbosity=0, skip_checks=True)
+    suffix = str(int(time.time() * 1000))
+    category = Category.objects.create(name=f"Bench {suffix}", slug=f"bench-{suffix}")
+    brands = Brand.objects.bulk_create(
+        Brand(name=f"Бренд {index}", slug=f"bench-{suffix}-{index}", logo=f"brands/{index}.png") for index in range(50)
+    )
+    sizes = Size.objects.bulk_create(
+        Size(name=f"S{index}", code=f"B{suffix}{index}", measurements={"chest": 90 + index}) for index in range(4)
+    )
+    products = Product.objects.bulk_create(
+        Product(
+            name=f"Товар {index}",
+            slug=f"bench-{suffix}-{index}",
+            sku=f"B{suffix}-{index}",
+            category=category,
+            brand=brands[index % len(brands)],
+            price=f"{1000 + index}.90",
+            attributes={"цвет": "чёрный", "вес": 0.3},
+            is_published=True,
+        )
+        for index in range(args.products)
+    )
+    ProductImage.objects.bulk_create(
+        ProductImage(product=product, image=f"products/{product.pk}-{position}.jpg", position=position)
+        for product in products
+        for position in range(2)
+    )
+    ProductSize.objects.bulk_create(
+        ProductSize(product=product, size=size, stock=5) for product in products for size in sizes[:2]
+    )
+
+    context = {"request": Request(APIRequestFactory().get("/api/v1/goods/"))}
+    cases = (
+        ("goods", ProductSerializer, Product.objects.filter(category=category).order_by("-created_at", "-id")),
+        ("brands", BrandSerializer, Brand.objects.filter(slug__startswith=f"bench-{suffix}")),
+        ("sizes", SizeSerializer, Size.objects.filter(code__startswith=f"B{suffix}")),
+    )
+    renderer = JSONRenderer()
+    for label, serializer_class, queryset in cases:
+        view_queryset = queryset
+        if serializer_class is ProductSerializer:
+            view_queryset = queryset.select_related("brand").prefetch_related("images", "productsize_set__size")
+        compiled = compile_serializer(serializer_class)
+        total = queryset.count()
+        pages = [(offset, offset + args.page_size) for offset in range(0, total, args.page_size)]
+
+        def drf():
+            return [
+                renderer.render(serializer_class(view_queryset[a:b], many=True, context=context).data)
+                for a, b in pages
+            ]
+
+        def fast():
+            return [dumps(compiled.serialize(compiled.project(queryset)[a:b], context)) for a, b in pages]
+
+        assert drf() == fast(), f"{label}: compiled output differs from DRF"
+        for name, render in (("drf", drf), ("compiled", fast)):
+            best = min(_timed(render) for _ in range(args.rounds))
+            print(f"{label:7s} {name:9s} rows={total:6d} best={best * 1000:8.1f}ms rows/sec={total / best:10.0f}")
+    return 0
+
+
+def _timed(func) -> float:
+    began = time.perf_counter()
+    func()
+    return time.perf_counter() - began
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Concurrency benchmark for the stock reservation engine.
+
+Fires ``--checkouts`` concurrent reservations of one unit each at a product
+holding ``--stock`` units and verifies that exactly ``--stock`` of them
+succeed and the stock ends at zero (no oversell, no lost units).
+
+Run against a disposable PostgreSQL database; SQLite serializes writers and
+only proves correctness, not contention behaviour::
+
+    DATABASE_URL=postgres://.../catalog_bench python benchmarks/stock_contention.py --checkouts 500 --stock 100
+
+``max_connections`` must exceed ``--workers``. ``--redis-gate`` enables the
+Redis counter fast path (``REDIS_URL`` must point to a Redis instance).
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "catalog_service.settings")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkouts", type=int, default=500)
+    parser.add_argument("--stock", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=None, help="Concurrent threads (default: --checkouts).")
+    parser.add_argument("--redis-gate", action="store_true")
+    args = parser.parse_args()
+    if args.redis_gate:
+        os.environ["STOCK_REDIS_GATE"] = "true"
+
+    import django
+
+    django.setup()
+
+    from django.core.management import call_command
+    from django.db import connection, transaction
+
+    from catalog.models import Category
+    from goods.models import Brand, Product
+    from orders.models import Checkout, DeliveryMethod, PaymentMethod, StockReservation
+    from orders.reservations import OutOfStock, reserve_stock
+
+    if connection.vendor == "sqlite":
+        connection.settings_dict.setdefault("OPTIONS", {})["timeout"] = 60
+    call_command("migrate", verbosity=0, skip_checks=True)
+
+    suffix = str(int(time.time() * 1000))
+    category = Category.objects.create(name=f"Bench {suffix}", slug=f"bench-{suffix}")
+    brand = Brand.objects.create(name=f"Bench {suffix}", slug=f"bench-{suffix}")
+    product = Product.objects.create(
+        name="Hot SKU", slug=f"hot-{suffix}", sku=f"HOT-{suffix}", category=category, brand=brand,
+        price="100.00", stock=args.stock,
+    )
+    payment = PaymentMethod.objects.create(name="Bench", code=f"bench-{suffix}")
+    delivery = DeliveryMethod.objects.create(name="Bench", code=f"bench-{suffix}")
+
+    start = threading.Barrier(min(args.workers or args.checkouts, args.checkouts))
+    latencies = []
+    lock = threading.Lock()
+
+    def attempt(index: int) -> bool:
+        try:
+            start.wait(timeout=30)
+        except threading.BrokenBarrierError:
+            pass
+        began = time.perf_counter()
+        try:
+            with transaction.atomic():
+                checkout = Checkout.objects.create(
+                    user_id=index, payment_method=payment, delivery_method=delivery, total_amount="100.00"
+                )
+                reserve_stock(checkout, [(product.id, None, 1)])
+            return True
+        except OutOfStock:
+            return False
+        finally:
+            with lock:
+                latencies.append(time.perf_counter() - began)
+            connection.close()
+
+    began = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers or args.checkouts) as pool:
+        results = list(pool.map(attempt, range(args.checkouts)))
+    elapsed = time.perf_counter() - began
+
+    product.refresh_from_db()
+    reserved = sum(
+        StockReservation.objects.filter(product=product).values_list("quantity", flat=True)
+    )
+    succeeded = sum(results)
+    expected = min(args.stock, args.checkouts)
+    latencies.sort()
+    print(f"backend={connection.vendor} gate={'on' if args.redis_gate else 'off'}")
+    print(f"checkouts={args.checkouts} stock={args.stock} succeeded={succeeded} rejected={args.checkouts - succeeded}")
+    print(f"final_stock={product.stock} reserved_units={reserved} elapsed={elapsed:.2f}s")
+    print(
+        f"latency p50={statistics.median(latencies) * 1000:.1f}ms "
+        f"p99={latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f}ms"
+    )
+    ok = succeeded == expected and reserved == expected and product.stock == args.stock - expected
+    print("OK: no oversell" if ok else "FAIL: stock invariant violated")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
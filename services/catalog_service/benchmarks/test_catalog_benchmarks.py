@@ -0,0 +1,60 @@
+import pytest
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+from catalog.models import Category
+from goods.models import Product
+from orders.models import BasketItem, DeliveryMethod, PaymentMethod
+
+pytestmark = pytest.mark.django_db
+
+
+def ok(response, status=200):
+    assert response.status_code == status, response.content[:500]
+    return response
+
+
+def test_goods_list(bench):
+    client = APIClient()
+    bench(lambda: ok(client.get("/api/v1/goods/")))
+
+
+def test_goods_list_in_category_subtree(bench):
+    client = APIClient()
+    root = Category.objects.filter(parent__isnull=True).order_by("pk").values_list("pk", flat=True)[0]
+    bench(lambda: ok(client.get("/api/v1/goods/", {"category_tree": root, "ordering": "price"})))
+
+
+def test_goods_detail(bench):
+    client = APIClient()
+    product_ids = list(Product.objects.order_by("?").values_list("pk", flat=True)[:100])
+    ids = iter(product_ids * 10)
+    bench(lambda: ok(client.get(f"/api/v1/goods/{next(ids)}/")))
+
+
+def test_category_tree(bench):
+    client = APIClient()
+    bench(lambda: ok(client.get("/api/v1/categories/", {"tree": "true"})))
+
+
+def test_checkout_create_with_large_basket(bench):
+    user = get_user_model().objects.filter(username__startswith="bench-buyer-").order_by("pk").first()
+    client = APIClient()
+    client.force_authenticate(user=user)
+    lines = list(BasketItem.objects.filter(user_id=user.pk).values("product_id", "count", "price"))
+    payment = PaymentMethod.objects.get(code="bench-yookassa")
+    delivery = DeliveryMethod.objects.get(code="bench-courier")
+
+    def refill_basket():
+        # Checkout consumes the basket, every round starts from a full one.
+        BasketItem.objects.filter(user_id=user.pk).delete()
+        items = BasketItem.objects.bulk_create([BasketItem(user_id=user.pk, **line) for line in lines])
+        payload = {
+            "payment_method": payment.pk,
+            "delivery_method": delivery.pk,
+            "basket_item_ids": [item.pk for item in items],
+            "recipient_data": {"full_name": "Нагрузочный Тест"},
+        }
+        return (payload,), {}
+
+    bench(lambda payload: ok(client.post("/api/v1/checkouts/", payload, format="json"), 201), setup=refill_basket)
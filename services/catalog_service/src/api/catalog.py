@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+from django.utils.http import parse_etags, quote_etag
 from rest_framework import filters, response, serializers, status, viewsets
 
 from catalog.models import Category
+from catalog.services import get_category_tree_snapshot
 from common.permissions import IsAdminOrReadOnly
+from ferrum_common.tracing import TracedViewMixin
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -36,7 +39,22 @@ class CategorySerializer(serializers.ModelSerializer):
         return serializer.data
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+def build_category_tree():
+    """Serialize the whole category forest from a single tree CTE query."""
+    queryset = Category.objects.with_tree_fields().order_siblings_by("position", "name")
+    roots, nodes = [], {}
+    for category in queryset:
+        node = dict(CategorySerializer(category).data)
+        node["children"] = []
+        nodes[category.id] = node
+        if category.parent_id is None:
+            roots.append(node)
+        else:
+            nodes[category.parent_id]["children"].append(node)
+    return roots
+
+
+class CategoryViewSet(TracedViewMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all().order_by("position", "name")
     serializer_class = CategorySerializer
     permission_classes = (IsAdminOrReadOnly,)
@@ -46,13 +64,12 @@ class CategoryViewSet(viewsets.ModelViewSet):
 
     def list(self, request, *args, **kwargs):
         if request.query_params.get("tree") == "true":
-            roots = self.get_queryset().filter(parent__isnull=True)
-            serializer = self.get_serializer(
-                roots,
-                many=True,
-                context={**self.get_serializer_context(), "include_children": True},
-            )
-            return response.Response(serializer.data, status=status.HTTP_200_OK)
+            snapshot = get_category_tree_snapshot(build_category_tree)
+            etag = quote_etag(snapshot.etag)
+            headers = {"ETag": etag}
+            if etag in parse_etags(request.headers.get("If-None-Match", "")):
+                return response.Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+            return response.Response(snapshot.nodes, status=status.HTTP_200_OK, headers=headers)
         return super().list(request, *args, **kwargs)
 
 
@@ -1,14 +1,26 @@
 from __future__ import annotations
 
+import io
 import logging
 
-from django.conf import settings
-from django_redis import get_redis_connection
-from rest_framework import filters, serializers, viewsets
+from django.db import transaction
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.utils.http import parse_etags, quote_etag
+from django_filters import rest_framework as django_filters
+from rest_framework import filters, parsers, permissions, response, serializers, status, viewsets
+from rest_framework.decorators import action
 
 from catalog.models import Category
+from common.fast_serializers import FastListMixin
 from common.permissions import IsAdminOrReadOnly
+from ferrum_common.pagination import KeysetPagination
+from ferrum_common.tracing import TracedViewMixin
+from goods.bulk import ImportFormatError, ProductImporter, detect_format, export_products, iter_records
+from goods.events import publish_product_events
+from goods.facets import get_facets
 from goods.models import Brand, Product, ProductImage, ProductSize, Size
+from goods.search import find_by_sku, is_full_text_available, search_products
+from goods.snapshots import absolute_media_urls, get_product_document
 
 logger = logging.getLogger(__name__)
 
@@ -114,31 +126,45 @@ class ProductSerializer(serializers.ModelSerializer):
 
 
 def publish_product_event(product: Product) -> None:
-    stream = getattr(settings, "PRODUCT_STREAM", None)
-    if not stream or not product.is_published:
-        return
-    payload = {
-        "product_id": str(product.id),
-        "slug": product.slug,
-        "name": product.name,
-        "sku": product.sku,
-        "price": str(product.price),
-        "currency": product.currency,
-        "category_id": str(product.category_id),
-    }
-    try:
-        conn = get_redis_connection("default")
-        stream_id = conn.xadd(stream, payload)
-    except Exception as exc:  # pragma: no cover
-        logger.warning("Failed to push product event: %s", exc)
-        stream_id = "offline"
-    meta = product.meta or {}
-    meta["last_stream_id"] = stream_id
-    product.meta = meta
-    product.save(update_fields=["meta"])
-
-
-class BrandViewSet(viewsets.ModelViewSet):
+    publish_product_events([product])
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """
+    Full-text product search with an exact SKU fast path.
+
+    Without PostgreSQL it degrades to the stock ``icontains`` search over
+    ``search_fields``.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, "").strip()
+        if not query:
+            return queryset
+        by_sku = find_by_sku(queryset, query)
+        if by_sku is not None:
+            return by_sku
+        if not is_full_text_available():
+            return super().filter_queryset(request, queryset, view)
+        return search_products(queryset, query)
+
+
+class ProductFilterSet(django_filters.FilterSet):
+    category_tree = django_filters.NumberFilter(method="filter_category_tree", label="Категория с подкатегориями")
+    size = django_filters.NumberFilter(field_name="productsize__size", distinct=True)
+    price_min = django_filters.NumberFilter(field_name="price", lookup_expr="gte")
+    price_max = django_filters.NumberFilter(field_name="price", lookup_expr="lt")
+
+    class Meta:
+        model = Product
+        fields = ("category", "brand", "status", "is_published")
+
+    def filter_category_tree(self, queryset, name, value):
+        subtree = Category.objects.descendants(int(value), include_self=True).values_list("pk", flat=True)
+        return queryset.filter(category_id__in=list(subtree))
+
+
+class BrandViewSet(TracedViewMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = Brand.objects.all()
     serializer_class = BrandSerializer
     permission_classes = (IsAdminOrReadOnly,)
@@ -147,7 +173,7 @@ class BrandViewSet(viewsets.ModelViewSet):
     ordering_fields = ("name", "created_at")
 
 
-class SizeViewSet(viewsets.ModelViewSet):
+class SizeViewSet(TracedViewMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = Size.objects.all()
     serializer_class = SizeSerializer
     permission_classes = (IsAdminOrReadOnly,)
@@ -156,21 +182,92 @@ class SizeViewSet(viewsets.ModelViewSet):
     ordering_fields = ("name",)
 
 
-class ProductViewSet(viewsets.ModelViewSet):
-    queryset = Product.objects.select_related("brand", "category").prefetch_related("images", "sizes").all()
+class ProductViewSet(TracedViewMixin, FastListMixin, viewsets.ModelViewSet):
+    queryset = (
+        Product.objects.select_related("brand", "category")
+        .prefetch_related("images", "productsize_set__size")
+        .defer("search_vector")
+    )
     serializer_class = ProductSerializer
     permission_classes = (IsAdminOrReadOnly,)
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = KeysetPagination
+    filter_backends = [django_filters.DjangoFilterBackend, ProductSearchFilter, filters.OrderingFilter]
     search_fields = ("name", "slug", "sku")
     ordering_fields = ("created_at", "price")
-    filterset_fields = ("category", "brand", "status", "is_published")
-
+    filterset_class = ProductFilterSet
+    facet_exclude_params = ("cursor", "page_size", "ordering", "facets")
+
+    def list_payload(self, queryset, fast: bool):
+        data = super().list_payload(queryset, fast)
+        request = self.request
+        if request.query_params.get("facets") == "true":
+            params = sorted(
+                (key, value)
+                for key, values in request.query_params.lists()
+                if key not in self.facet_exclude_params
+                for value in values
+            )
+            data["facets"] = get_facets(queryset, repr(params))
+        return data
+
+    def retrieve(self, request, *args, **kwargs):
+        """Serve the pre-rendered product document as is, without running the serializer."""
+        if request.accepted_renderer.format != "json":
+            return super().retrieve(request, *args, **kwargs)
+        try:
+            product_id = int(kwargs[self.lookup_url_kwarg or self.lookup_field])
+        except ValueError:
+            raise Http404
+        document = get_product_document(product_id)
+        if document is None:
+            raise Http404
+        etag = quote_etag(document.etag)
+        if etag in parse_etags(request.headers.get("If-None-Match", "")):
+            return HttpResponse(status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+        body = absolute_media_urls(document.body, request)
+        return HttpResponse(body, content_type="application/json", headers={"ETag": etag})
+
+    @transaction.atomic
     def perform_create(self, serializer):
         product = serializer.save()
         publish_product_event(product)
 
+    @transaction.atomic
     def perform_update(self, serializer):
         product = serializer.save()
         publish_product_event(product)
 
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        publish_product_events([instance], deleted=True)
+        instance.delete()
+
+    @action(
+        detail=False,
+        methods=["post"],
+        url_path="import",
+        permission_classes=(permissions.IsAdminUser,),
+        parser_classes=(parsers.MultiPartParser,),
+    )
+    def import_feed(self, request):
+        upload = request.FILES.get("file")
+        if upload is None:
+            return response.Response({"file": "Файл не передан."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            fmt = detect_format(upload.name, request.query_params.get("file_format"))
+        except ImportFormatError as exc:
+            return response.Response({"format": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        stream = io.TextIOWrapper(upload.file, encoding="utf-8", newline="")
+        report = ProductImporter().run(iter_records(stream, fmt))
+        return response.Response(report.as_dict(), status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=["get"], url_path="export", permission_classes=(permissions.IsAdminUser,))
+    def export_feed(self, request):
+        fmt = "csv" if request.query_params.get("file_format") == "csv" else "jsonl"
+        content_type = "text/csv" if fmt == "csv" else "application/x-ndjson"
+        queryset = self.filter_queryset(Product.objects.all())
+        streaming = StreamingHttpResponse(export_products(queryset, fmt), content_type=f"{content_type}; charset=utf-8")
+        streaming["Content-Disposition"] = f'attachment; filename="products.{fmt}"'
+        return streaming
+
 
@@ -1,13 +1,20 @@
 from __future__ import annotations
 
+import ipaddress
+import logging
 from decimal import Decimal
 from typing import List
 
 from django.conf import settings
 from django.db import transaction
-from rest_framework import filters, permissions, serializers, viewsets
+from rest_framework import filters, permissions, serializers, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import APIException, PermissionDenied, ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
 from common.permissions import IsAdminOrReadOnly
+from ferrum_common.tracing import TracedViewMixin
 from goods.models import Product
 from orders.models import (
     BasketItem,
@@ -17,8 +24,30 @@ from orders.models import (
     PaymentMethod,
     Transaction,
 )
-from orders.payments import create_payment
-from orders.services import publish_checkout_event
+from orders.payments import PaymentError
+from orders.reservations import OutOfStock, reserve_stock
+from orders.services import apply_payment_status, attach_payment, cancel_checkout, publish_checkout_event
+from orders.tasks import create_checkout_payment
+from orders.yookassa import YooKassaError, get_client
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentUnavailable(APIException):
+    status_code = status.HTTP_502_BAD_GATEWAY
+    default_detail = "Платёжный сервис недоступен, попробуйте позже."
+    default_code = "payment_unavailable"
+
+
+class InsufficientStock(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Недостаточно товара на складе."
+    default_code = "insufficient_stock"
+
+
+def _size_id(item: BasketItem):
+    size_id = (item.variant_data or {}).get("size_id")
+    return int(size_id) if isinstance(size_id, int) or (isinstance(size_id, str) and size_id.isdigit()) else None
 
 
 class PaymentMethodSerializer(serializers.ModelSerializer):
@@ -179,11 +208,47 @@ class CheckoutSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Необходимо выбрать хотя бы один товар.")
         return value
 
-    @transaction.atomic
     def create(self, validated_data):
         user = self.context["request"].user
         basket_item_ids: List[int] = validated_data.pop("basket_item_ids")
-        basket_items = list(BasketItem.objects.select_related("product").filter(user_id=user.id, id__in=basket_item_ids))
+        return_url = self.context["request"].data.get("return_url") or getattr(
+            settings, "CHECKOUT_RETURN_URL", "https://example.com/orders/success"
+        )
+
+        if getattr(settings, "CHECKOUT_PAYMENT_MODE", "sync") == "async":
+            # The client polls the checkout until ``payment_confirmation`` appears.
+            with transaction.atomic():
+                checkout = self._create_draft(
+                    user, basket_item_ids, validated_data, initial_status=Checkout.Status.PENDING
+                )
+                publish_checkout_event(checkout)
+                transaction.on_commit(lambda: create_checkout_payment.delay(checkout.id, return_url))
+            return checkout
+
+        with transaction.atomic():
+            checkout = self._create_draft(user, basket_item_ids, validated_data)
+        try:
+            attach_payment(checkout, return_url=return_url)
+        except PaymentError as exc:
+            raise PaymentUnavailable() from exc
+        return checkout
+
+    def _create_draft(
+        self, user, basket_item_ids: List[int], validated_data, initial_status: str = Checkout.Status.DRAFT
+    ) -> Checkout:
+        """
+        Turn the selected basket items into a draft checkout.
+
+        Basket rows are locked so two concurrent checkouts cannot consume the
+        same items; items are inserted in one statement, stock for all lines
+        is reserved with conditional decrements and the basket is cleared with
+        one set-based DELETE. A short line aborts the whole transaction.
+        """
+        basket_items = list(
+            BasketItem.objects.select_related("product")
+            .select_for_update(of=("self",))
+            .filter(user_id=user.id, id__in=basket_item_ids)
+        )
         if not basket_items:
             raise serializers.ValidationError({"basket_item_ids": "Корзина пуста или не найдены элементы."})
 
@@ -204,12 +269,14 @@ class CheckoutSerializer(serializers.ModelSerializer):
                 "count": item.count,
                 "unit_price": str(item.price),
                 "variant": item.variant_data,
+                "variant_key": item.variant_key,
             }
             for item in basket_items
         ]
 
         checkout = Checkout.objects.create(
             user_id=user.id,
+            status=initial_status,
             total_amount=subtotal + delivery_price + payment_fee,
             currency=currency,
             delivery_price=delivery_price,
@@ -217,36 +284,31 @@ class CheckoutSerializer(serializers.ModelSerializer):
             items_snapshot=snapshot,
             **validated_data,
         )
-
-        for item in basket_items:
-            CheckoutItem.objects.create(
-                checkout=checkout,
-                product=item.product,
-                name=item.product.name,
-                sku=item.product.sku,
-                price=item.price,
-                currency=item.currency,
-                quantity=item.count,
-                metadata=item.variant_data,
-            )
-        BasketItem.objects.filter(id__in=[item.id for item in basket_items]).delete()
-
-        return_url = self.context["request"].data.get("return_url") or getattr(
-            settings, "CHECKOUT_RETURN_URL", "https://example.com/orders/success"
-        )
-        payment_payload = create_payment(checkout, return_url=return_url)
-        Transaction.objects.create(
-            checkout=checkout,
-            provider=payment_payload.get("provider", "yookassa"),
-            external_id=payment_payload["id"],
-            status=payment_payload.get("status", "initiated"),
-            payload=payment_payload,
+        CheckoutItem.objects.bulk_create(
+            [
+                CheckoutItem(
+                    checkout=checkout,
+                    product=item.product,
+                    name=item.product.name,
+                    sku=item.product.sku,
+                    price=item.price,
+                    currency=item.currency,
+                    quantity=item.count,
+                    metadata=item.variant_data,
+                )
+                for item in basket_items
+            ]
         )
-        publish_checkout_event(checkout)
+        try:
+            reserve_stock(checkout, [(item.product_id, _size_id(item), item.count) for item in basket_items])
+        except OutOfStock as exc:
+            products = {item.product_id: item.product for item in basket_items}
+            raise InsufficientStock({"sku": sorted({products[product_id].sku for product_id, _ in exc.keys})})
+        BasketItem.objects.filter(id__in=[item.id for item in basket_items]).delete()
         return checkout
 
 
-class PaymentMethodViewSet(viewsets.ModelViewSet):
+class PaymentMethodViewSet(TracedViewMixin, viewsets.ModelViewSet):
     queryset = PaymentMethod.objects.all()
     serializer_class = PaymentMethodSerializer
     permission_classes = (IsAdminOrReadOnly,)
@@ -255,7 +317,7 @@ class PaymentMethodViewSet(viewsets.ModelViewSet):
     ordering_fields = ("name",)
 
 
-class DeliveryMethodViewSet(viewsets.ModelViewSet):
+class DeliveryMethodViewSet(TracedViewMixin, viewsets.ModelViewSet):
     queryset = DeliveryMethod.objects.all()
     serializer_class = DeliveryMethodSerializer
     permission_classes = (IsAdminOrReadOnly,)
@@ -264,7 +326,7 @@ class DeliveryMethodViewSet(viewsets.ModelViewSet):
     ordering_fields = ("name",)
 
 
-class BasketItemViewSet(viewsets.ModelViewSet):
+class BasketItemViewSet(TracedViewMixin, viewsets.ModelViewSet):
     serializer_class = BasketItemSerializer
     permission_classes = (permissions.IsAuthenticated,)
 
@@ -276,7 +338,7 @@ class BasketItemViewSet(viewsets.ModelViewSet):
         )
 
 
-class CheckoutViewSet(viewsets.ModelViewSet):
+class CheckoutViewSet(TracedViewMixin, viewsets.ModelViewSet):
     serializer_class = CheckoutSerializer
     permission_classes = (permissions.IsAuthenticated,)
 
@@ -286,8 +348,15 @@ class CheckoutViewSet(viewsets.ModelViewSet):
             return qs
         return qs.filter(user_id=self.request.user.id)
 
+    @action(detail=True, methods=["post"])
+    def cancel(self, request, pk=None):
+        checkout = self.get_object()
+        if not cancel_checkout(checkout):
+            return Response({"detail": "Чекаут уже завершён."}, status=status.HTTP_409_CONFLICT)
+        return Response(self.get_serializer(checkout).data)
+
 
-class TransactionViewSet(viewsets.ReadOnlyModelViewSet):
+class TransactionViewSet(TracedViewMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Transaction.objects.select_related("checkout").all()
     serializer_class = TransactionSerializer
     permission_classes = (permissions.IsAdminUser,)
@@ -296,3 +365,49 @@ class TransactionViewSet(viewsets.ReadOnlyModelViewSet):
     ordering_fields = ("created_at",)
 
 
+class YooKassaWebhookView(APIView):
+    """
+    Receives YooKassa HTTP notifications and applies them to transactions.
+
+    The request is checked against ``YOOKASSA_WEBHOOK_ALLOWED_IPS`` when set.
+    The body only names the payment: its status is always re-read from the
+    API, so notifications are refused while credentials are not configured.
+    """
+
+    authentication_classes: list = []
+    permission_classes = (permissions.AllowAny,)
+
+    def post(self, request):
+        self._check_source(request)
+        payment = request.data.get("object") if isinstance(request.data, dict) else None
+        if not isinstance(payment, dict) or not isinstance(payment.get("id"), str) or not payment["id"]:
+            raise ValidationError({"object": "Ожидается объект платежа."})
+        if not isinstance(payment.get("status"), str):
+            raise ValidationError({"object": "Не указан статус платежа."})
+        if not settings.YOOKASSA_SHOP_ID or not settings.YOOKASSA_API_KEY:
+            raise PermissionDenied("Уведомления не принимаются: не настроены учётные данные YooKassa.")
+
+        try:
+            provider_status = get_client().get_payment(payment["id"]).get("status")
+        except YooKassaError as exc:
+            logger.warning("Failed to verify YooKassa payment %s: %s", payment["id"], exc)
+            raise PaymentUnavailable() from exc
+
+        try:
+            apply_payment_status(payment["id"], provider_status, request.data)
+        except PaymentError as exc:
+            # Refund of a late payment failed: a non-2xx answer makes YooKassa redeliver the notification.
+            logger.warning("Failed to refund YooKassa payment %s: %s", payment["id"], exc)
+            raise PaymentUnavailable() from exc
+        return Response(status=status.HTTP_200_OK)
+
+    def _check_source(self, request) -> None:
+        allowed = getattr(settings, "YOOKASSA_WEBHOOK_ALLOWED_IPS", ())
+        if not allowed:
+            return
+        try:
+            address = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+        except ValueError:
+            address = None
+        if address is None or not any(address in ipaddress.ip_network(network, strict=False) for network in allowed):
+            raise PermissionDenied("Недопустимый источник уведомления.")
@@ -8,4 +8,5 @@ class CatalogConfig(AppConfig):
     name = "catalog"
     verbose_name = "Категории товаров"
 
-
+    def ready(self) -> None:
+        from . import signals  # noqa: F401
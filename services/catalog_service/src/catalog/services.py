@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Callable, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+CATEGORY_TREE_VERSION_KEY = "catalog:category-tree:version"
+CATEGORY_TREE_SNAPSHOT_KEY = "catalog:category-tree:{version}"
+
+
+@dataclass(frozen=True)
+class CategoryTreeSnapshot:
+    version: Optional[int]
+    etag: str
+    nodes: List[dict]
+
+
+def _new_version() -> int:
+    # Millisecond timestamps keep versions unique even after Redis is flushed.
+    return int(time.time() * 1000)
+
+
+def get_category_tree_version() -> Optional[int]:
+    try:
+        return cache.get_or_set(CATEGORY_TREE_VERSION_KEY, _new_version, timeout=None)
+    except Exception as exc:  # pragma: no cover - network errors
+        logger.warning("Failed to read category tree version: %s", exc)
+        return None
+
+
+def bump_category_tree_version() -> None:
+    try:
+        try:
+            cache.incr(CATEGORY_TREE_VERSION_KEY)
+        except ValueError:
+            cache.set(CATEGORY_TREE_VERSION_KEY, _new_version(), timeout=None)
+    except Exception as exc:  # pragma: no cover - network errors
+        logger.warning("Failed to bump category tree version: %s", exc)
+
+
+def _make_snapshot(version: Optional[int], nodes: List[dict]) -> CategoryTreeSnapshot:
+    digest = hashlib.sha1(json.dumps(nodes, sort_keys=True, default=str).encode()).hexdigest()
+    return CategoryTreeSnapshot(version=version, etag=digest, nodes=nodes)
+
+
+@lru_cache(maxsize=8)
+def _load_snapshot(version: int, build: Callable[[], List[dict]]) -> CategoryTreeSnapshot:
+    key = CATEGORY_TREE_SNAPSHOT_KEY.format(version=version)
+    try:
+        snapshot = cache.get(key)
+    except Exception as exc:  # pragma: no cover - network errors
+        logger.warning("Failed to read category tree snapshot: %s", exc)
+        snapshot = None
+    if snapshot is not None:
+        return snapshot
+    snapshot = _make_snapshot(version, build())
+    try:
+        cache.set(key, snapshot, timeout=getattr(settings, "CATEGORY_TREE_CACHE_TIMEOUT", 3600))
+    except Exception as exc:  # pragma: no cover - network errors
+        logger.warning("Failed to store category tree snapshot: %s", exc)
+    return snapshot
+
+
+def get_category_tree_snapshot(build: Callable[[], List[dict]]) -> CategoryTreeSnapshot:
+    """
+    Return the materialized category tree for the current version.
+
+    Lookup order is the in-process LRU, then Redis, then ``build``. Without
+    Redis the tree is rebuilt on every call since the version is unknown.
+    """
+    version = get_category_tree_version()
+    if version is None:
+        return _make_snapshot(None, build())
+    return _load_snapshot(version, build)
@@ -1,3 +1,5 @@
 """Catalog service Django project package."""
 
+from .celery import app as celery_app
 
+__all__ = ("celery_app",)
@@ -0,0 +1,13 @@
+"""Celery application for catalog service background jobs."""
+
+from __future__ import annotations
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "catalog_service.settings")
+
+app = Celery("catalog_service")
+app.config_from_object("django.conf:settings", namespace="CELERY")
+app.autodiscover_tasks()
@@ -21,6 +21,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "django_filters",
     "drf_spectacular",
@@ -28,9 +29,13 @@ INSTALLED_APPS = [
     "catalog",
     "goods",
     "orders",
+    "ferrum_common.outbox",
 ]
 
 MIDDLEWARE = [
+    "ferrum_common.metrics.MetricsMiddleware",
+    "ferrum_common.tracing.TracingMiddleware",
+    "ferrum_common.query_budget.QueryBudgetMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -78,6 +83,15 @@ CACHES = {
 
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_RENDERER_CLASSES": (
+        "ferrum_common.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "ferrum_common.parsers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
     "DEFAULT_AUTHENTICATION_CLASSES": ("rest_framework_simplejwt.authentication.JWTAuthentication",),
     "DEFAULT_FILTER_BACKENDS": [
@@ -118,6 +132,20 @@ STORAGES = {
 REDIS_STREAM_PREFIX = os.getenv("REDIS_STREAM_PREFIX", "catalog")
 PRODUCT_STREAM = f"{REDIS_STREAM_PREFIX}:product"
 CHECKOUT_STREAM = f"{REDIS_STREAM_PREFIX}:checkout"
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 500))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 10))
+OUTBOX_RETRY_BACKOFF = int(os.getenv("OUTBOX_RETRY_BACKOFF", 5))
+OUTBOX_STREAM_MAXLEN = int(os.getenv("OUTBOX_STREAM_MAXLEN", 0)) or None
+
+CATEGORY_TREE_CACHE_TIMEOUT = int(os.getenv("CATEGORY_TREE_CACHE_TIMEOUT", 3600))
+PRODUCT_FACETS_CACHE_TIMEOUT = int(os.getenv("PRODUCT_FACETS_CACHE_TIMEOUT", 300))
+PRODUCT_SNAPSHOT_CACHE_TIMEOUT = int(os.getenv("PRODUCT_SNAPSHOT_CACHE_TIMEOUT", 86400))
+PRODUCT_SNAPSHOT_STORE_DB = os.getenv("PRODUCT_SNAPSHOT_STORE_DB", "true").lower() == "true"
+# Seconds between re-renders of products whose stock changed through reservations (goods.tasks).
+PRODUCT_SNAPSHOT_STOCK_REFRESH_INTERVAL = float(os.getenv("PRODUCT_SNAPSHOT_STOCK_REFRESH_INTERVAL", 5))
+PRODUCT_PRICE_BUCKETS = [
+    int(bound) for bound in os.getenv("PRODUCT_PRICE_BUCKETS", "1000,3000,5000,10000").split(",") if bound
+]
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=30),
@@ -126,6 +154,52 @@ SIMPLE_JWT = {
 
 YOOKASSA_SHOP_ID = os.getenv("YOOKASSA_SHOP_ID", "")
 YOOKASSA_API_KEY = os.getenv("YOOKASSA_API_KEY", "")
+YOOKASSA_API_URL = os.getenv("YOOKASSA_API_URL", "https://api.yookassa.ru/v3/")
+YOOKASSA_CONNECT_TIMEOUT = float(os.getenv("YOOKASSA_CONNECT_TIMEOUT", 3.05))
+YOOKASSA_READ_TIMEOUT = float(os.getenv("YOOKASSA_READ_TIMEOUT", 15))
+YOOKASSA_MAX_RETRIES = int(os.getenv("YOOKASSA_MAX_RETRIES", 2))
+YOOKASSA_POOL_SIZE = int(os.getenv("YOOKASSA_POOL_SIZE", 10))
+YOOKASSA_BREAKER_THRESHOLD = int(os.getenv("YOOKASSA_BREAKER_THRESHOLD", 5))
+YOOKASSA_BREAKER_RESET_TIMEOUT = float(os.getenv("YOOKASSA_BREAKER_RESET_TIMEOUT", 30))
+YOOKASSA_WEBHOOK_ALLOWED_IPS = [
+    network for network in os.getenv("YOOKASSA_WEBHOOK_ALLOWED_IPS", "").split(",") if network
+]
 CHECKOUT_RETURN_URL = os.getenv("CHECKOUT_RETURN_URL", "https://example.com/orders/success")
+# "sync" creates the YooKassa payment inside the request, "async" hands it to a Celery task.
+CHECKOUT_PAYMENT_MODE = os.getenv("CHECKOUT_PAYMENT_MODE", "sync")
+STOCK_RESERVATION_TTL = int(os.getenv("STOCK_RESERVATION_TTL", 900))
+# Redis counters in front of stock decrements to absorb contention on hot SKUs.
+STOCK_REDIS_GATE = os.getenv("STOCK_REDIS_GATE", "false").lower() == "true"
+STOCK_REDIS_GATE_TTL = int(os.getenv("STOCK_REDIS_GATE_TTL", 60))
+
+CELERY_BROKER_URL = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/2")
+CELERY_TASK_ALWAYS_EAGER = os.getenv("CELERY_TASK_ALWAYS_EAGER", "false").lower() == "true"
+CELERY_TASK_ACKS_LATE = True
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+CELERY_BEAT_SCHEDULE = {
+    "expire-stale-checkouts": {"task": "orders.tasks.expire_stale_checkouts", "schedule": 60.0},
+    "refresh-stock-snapshots": {
+        "task": "goods.tasks.refresh_stock_snapshots",
+        "schedule": PRODUCT_SNAPSHOT_STOCK_REFRESH_INTERVAL,
+    },
+}
 
+# Query budgets per "<METHOD> <url name>", enforced by ferrum_common.query_budget.QueryBudgetMiddleware in tests.
+QUERY_BUDGET_ENABLED = os.getenv("QUERY_BUDGET_ENABLED", str(DEBUG)).lower() == "true"
+QUERY_BUDGET_N_PLUS_ONE_THRESHOLD = int(os.getenv("QUERY_BUDGET_N_PLUS_ONE_THRESHOLD", 3))
+QUERY_BUDGETS = {
+    "GET category-list": 3,
+    "GET product-list": 12,
+    "GET product-detail": 2,
+    "POST basket-item-list": 4,
+    "GET checkout-list": 4,
+    "GET checkout-detail": 4,
+    "POST checkout-list": 16,
+    "POST yookassa-webhook": 8,
+}
 
+# OpenTelemetry tracing (ferrum_common.tracing): "memory", "console", "file" (JSON lines in TRACING_FILE_PATH)
+# or a dotted path to an exporter class, e.g. the OTLP one. Empty disables tracing.
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "")
+TRACING_FILE_PATH = os.getenv("TRACING_FILE_PATH", str(BASE_DIR / "traces.jsonl"))
+TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "catalog_service")
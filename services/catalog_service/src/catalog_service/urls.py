@@ -15,7 +15,9 @@ from api.orders import (
     DeliveryMethodViewSet,
     PaymentMethodViewSet,
     TransactionViewSet,
+    YooKassaWebhookView,
 )
+from ferrum_common.metrics import metrics_view
 
 router = DefaultRouter()
 router.register(r"categories", CategoryViewSet, basename="category")
@@ -30,8 +32,10 @@ router.register(r"transactions", TransactionViewSet, basename="transaction")
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("metrics", metrics_view, name="metrics"),
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path("api/docs/", SpectacularSwaggerView.as_view(url_name="schema"), name="docs"),
+    path("api/v1/payments/yookassa/webhook/", YooKassaWebhookView.as_view(), name="yookassa-webhook"),
     path("api/v1/", include(router.urls)),
 ]
 
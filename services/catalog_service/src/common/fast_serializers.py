@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import QuerySet
+from rest_framework import serializers
+from rest_framework.response import Response
+
+# Fields whose ``to_representation`` returns the database value unchanged.
+PASSTHROUGH_FIELDS = (
+    serializers.BooleanField,
+    serializers.CharField,
+    serializers.ChoiceField,
+    serializers.IntegerField,
+    serializers.JSONField,
+)
+UNSUPPORTED_FIELDS = (
+    serializers.BaseSerializer,
+    serializers.ManyRelatedField,
+    serializers.ModelField,
+    serializers.RelatedField,
+)
+
+
+class _Nested:
+    """A nested serializer resolved with one extra query per page."""
+
+    def __init__(self, name: str, compiled: "CompiledSerializer", key: str, related_key: str, many: bool):
+        self.name = name
+        self.compiled = compiled
+        self.key = key  # column of the parent row
+        self.related_key = related_key  # column of the related row
+        self.many = many
+
+    def resolve(self, rows: List[dict], context: dict) -> Dict[Any, Any]:
+        ids = {row[self.key] for row in rows if row[self.key] is not None}
+        if not ids:
+            return {}
+        model = self.compiled.model
+        queryset = model._default_manager.filter(**{f"{self.related_key}__in": ids})
+        if self.many:
+            queryset = queryset.order_by(*(model._meta.ordering or ("pk",)))
+        related = list(self.compiled.project(queryset, extra=(self.related_key,)))
+        rendered = self.compiled.serialize(related, context)
+        if not self.many:
+            return {row[self.related_key]: item for row, item in zip(related, rendered)}
+        grouped: Dict[Any, list] = {}
+        for row, item in zip(related, rendered):
+            grouped.setdefault(row[self.related_key], []).append(item)
+        return grouped
+
+
+class CompiledSerializer:
+    """
+    Read-only counterpart of a ``ModelSerializer`` working on ``values()`` rows.
+
+    Field getters are compiled once per serializer class: plain columns are
+    copied as is, other fields reuse the bound ``to_representation`` of the
+    DRF field, file fields resolve storage URLs, and nested serializers are
+    fetched in bulk (one query per nested field per page). The output is
+    identical to ``serializer(many=True).data``; serializers with fields it
+    cannot compile (e.g. ``SerializerMethodField``) raise
+    ``ImproperlyConfigured``.
+    """
+
+    def __init__(self, serializer_class):
+        serializer = serializer_class()
+        self.model = serializer.Meta.model
+        opts = self.model._meta
+        self.columns: List[str] = []
+        self.getters: List[Tuple[str, str, Optional[Callable]]] = []
+        self.files: List[Tuple[str, str, Any]] = []
+        self.nested: List[_Nested] = []
+
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if isinstance(field, serializers.ListSerializer) and isinstance(field.child, serializers.ModelSerializer):
+                relation = next(
+                    (rel for rel in opts.related_objects if rel.get_accessor_name() == field.source), None
+                )
+                if relation is None:
+                    raise ImproperlyConfigured(f"{serializer_class.__name__}.{name}: unsupported many relation")
+                self._add_column(opts.pk.attname)
+                self.nested.append(
+                    _Nested(name, compile_serializer(type(field.child)), opts.pk.attname, relation.field.attname, True)
+                )
+            elif isinstance(field, serializers.ModelSerializer):
+                model_field = opts.get_field(field.source)
+                self._add_column(model_field.attname)
+                self.nested.append(
+                    _Nested(name, compile_serializer(type(field)), model_field.attname, "pk", False)
+                )
+            elif isinstance(field, serializers.PrimaryKeyRelatedField) and field.pk_field is None:
+                self._add_column(opts.get_field(field.source).attname, name, None)
+            elif isinstance(field, serializers.FileField):
+                self._add_column(field.source)
+                self.files.append((name, field.source, opts.get_field(field.source).storage))
+            elif isinstance(field, UNSUPPORTED_FIELDS) or field.source == "*" or "." in field.source:
+                raise ImproperlyConfigured(f"{serializer_class.__name__}.{name}: unsupported field {field!r}")
+            else:
+                convert = None if isinstance(field, PASSTHROUGH_FIELDS) else field.to_representation
+                self._add_column(field.source, name, convert)
+        self.names = [name for name, field in serializer.fields.items() if not field.write_only]
+
+    def _add_column(self, column: str, name: Optional[str] = None, convert: Optional[Callable] = None) -> None:
+        if column not in self.columns:
+            self.columns.append(column)
+        if name is not None:
+            self.getters.append((name, column, convert))
+
+    def project(self, queryset: QuerySet, extra: Iterable[str] = ()) -> QuerySet:
+        """``values()`` projection of ``queryset`` keeping annotations used for ordering or pagination."""
+        columns = list(dict.fromkeys([*self.columns, *extra, *queryset.query.annotations]))
+        return queryset.prefetch_related(None).values(*columns)
+
+    def serialize(self, rows: Iterable[dict], context: Optional[dict] = None) -> List[dict]:
+        rows = list(rows)
+        context = context or {}
+        request = context.get("request")
+        resolved = {nested.name: (nested, nested.resolve(rows, context)) for nested in self.nested}
+        result = []
+        for row in rows:
+            values: Dict[str, Any] = {}
+            for name, column, convert in self.getters:
+                value = row[column]
+                values[name] = value if convert is None or value is None else convert(value)
+            for name, column, storage in self.files:
+                path = row[column]
+                if not path:
+                    values[name] = None
+                else:
+                    url = storage.url(path)
+                    values[name] = request.build_absolute_uri(url) if request is not None else url
+            for name, (nested, items) in resolved.items():
+                values[name] = items.get(row[nested.key], [] if nested.many else None)
+            result.append({name: values[name] for name in self.names})
+        return result
+
+
+@lru_cache(maxsize=None)
+def compile_serializer(serializer_class) -> CompiledSerializer:
+    return CompiledSerializer(serializer_class)
+
+
+class FastListMixin:
+    """
+    ``list()`` through ``CompiledSerializer`` for JSON clients.
+
+    Other renderers (the browsable API) go through the regular serializer.
+    Override ``list_payload`` to add data next to the page.
+    """
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        if request.accepted_renderer.format == "json":
+            return Response(self.list_payload(queryset, fast=True))
+        return Response(self.list_payload(queryset, fast=False))
+
+    def list_payload(self, queryset, fast: bool):
+        if fast:
+            compiled = compile_serializer(self.get_serializer_class())
+            queryset = compiled.project(queryset)
+            context = self.get_serializer_context()
+
+            def serialize(rows):
+                return compiled.serialize(rows, context)
+
+        else:
+
+            def serialize(rows):
+                return self.get_serializer(rows, many=True).data
+
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return serialize(queryset)
+        return self.get_paginated_response(serialize(page)).data
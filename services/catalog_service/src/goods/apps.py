@@ -8,4 +8,5 @@ class GoodsConfig(AppConfig):
     name = "goods"
     verbose_name = "Товары"
 
-
+    def ready(self) -> None:
+        from . import signals  # noqa: F401
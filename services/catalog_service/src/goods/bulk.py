@@ -0,0 +1,480 @@
+from __future__ import annotations
+
+import csv
+import json
+from dataclasses import dataclass, field
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from django.db import transaction
+from django.utils.text import slugify
+
+from catalog.models import Category
+
+from .events import publish_product_events
+from .facets import bump_facets_version
+from .models import Brand, Product, ProductImage, ProductSize, Size
+from .search import refresh_search_vectors
+from .snapshots import schedule_snapshot_refresh
+
+FORMATS = ("csv", "jsonl")
+CSV_COLUMNS = [
+    "sku",
+    "name",
+    "slug",
+    "description",
+    "category",
+    "brand",
+    "price",
+    "currency",
+    "status",
+    "is_published",
+    "stock",
+    "weight_grams",
+    "attributes",
+    "sizes",
+    "images",
+]
+PRODUCT_UPDATE_FIELDS = [
+    "name",
+    "slug",
+    "description",
+    "category",
+    "brand",
+    "price",
+    "currency",
+    "status",
+    "is_published",
+    "attributes",
+    "stock",
+    "weight_grams",
+    "updated_at",
+]
+MAX_REPORTED_ERRORS = 1000
+_TRUE_VALUES = {"1", "true", "yes", "y", "да"}
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+@dataclass
+class ImportReport:
+    processed: int = 0
+    upserted: int = 0
+    failed: int = 0
+    published: int = 0
+    errors: List[dict] = field(default_factory=list)
+
+    def add_error(self, line: int, sku: str, errors: Dict[str, str]) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "sku": sku, "errors": errors})
+
+    def as_dict(self) -> dict:
+        return {
+            "processed": self.processed,
+            "upserted": self.upserted,
+            "failed": self.failed,
+            "published": self.published,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+@dataclass
+class _Row:
+    line: int
+    product: Product
+    # (size id, stock, price modifier)
+    sizes: Optional[List[Tuple[int, int, Decimal]]]
+    images: Optional[List[Tuple[str, str]]]
+
+
+def detect_format(filename: str, explicit: Optional[str] = None) -> str:
+    fmt = (explicit or filename.rsplit(".", 1)[-1]).lower()
+    if fmt == "json":
+        fmt = "jsonl"
+    if fmt not in FORMATS:
+        raise ImportFormatError(f"Неподдерживаемый формат: {fmt}. Допустимо: {', '.join(FORMATS)}.")
+    return fmt
+
+
+def _parse_csv_sizes(value: str) -> List[dict]:
+    # "code:stock:modifier:size_type"; trailing parts are optional.
+    sizes = []
+    for chunk in filter(None, (part.strip() for part in value.split(";"))):
+        code, stock, modifier, size_type = (chunk.split(":", 3) + ["", "", ""])[:4]
+        sizes.append({"size": code, "stock": stock or 0, "price_modifier": modifier or "0", "size_type": size_type})
+    return sizes
+
+
+def _parse_csv_images(value: str) -> List[dict]:
+    images = []
+    for chunk in filter(None, (part.strip() for part in value.split(";"))):
+        path, _, alt_text = chunk.partition("|")
+        images.append({"image": path, "alt_text": alt_text})
+    return images
+
+
+def iter_records(stream: IO[str], fmt: str) -> Iterator[Tuple[int, dict]]:
+    """Yield ``(line number, record)`` pairs without reading the whole feed into memory."""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            if record.get("attributes"):
+                try:
+                    record["attributes"] = json.loads(record["attributes"])
+                except ValueError:
+                    pass
+            record["sizes"] = _parse_csv_sizes(record["sizes"]) if record.get("sizes") else None
+            record["images"] = _parse_csv_images(record["images"]) if record.get("images") else None
+            yield reader.line_num, record
+        return
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = {"__error__": "Строка не является корректным JSON."}
+        if not isinstance(record, dict):
+            record = {"__error__": "Ожидается JSON-объект."}
+        yield line_number, record
+
+
+class _Lookup:
+    """Per-import memo of slug/code -> id lookups, filled one query per chunk."""
+
+    def __init__(self, model, key: str):
+        self.model = model
+        self.key = key
+        self.ids: Dict[str, int] = {}
+
+    def preload(self, values: Iterable[str]) -> None:
+        missing = {value for value in values if value and value not in self.ids}
+        if missing:
+            self.ids.update(self.model.objects.filter(**{f"{self.key}__in": missing}).values_list(self.key, "id"))
+
+    def get(self, value: str) -> Optional[int]:
+        return self.ids.get(value)
+
+
+class _SizeLookup:
+    """
+    Per-import memo of size code -> ``{size_type: id}``.
+
+    Sizes are unique by ``(code, size_type)``: a bare code is enough only
+    while a single size type uses it, otherwise the record must name the type.
+    """
+
+    def __init__(self):
+        self.ids: Dict[str, Dict[str, int]] = {}
+
+    def preload(self, codes: Iterable[str]) -> None:
+        missing = {code for code in codes if code and code not in self.ids}
+        if missing:
+            for code in missing:
+                self.ids[code] = {}
+            sizes = Size.objects.filter(code__in=missing).values_list("code", "size_type", "id")
+            for code, size_type, size_id in sizes:
+                self.ids[code][size_type] = size_id
+
+    def resolve(self, code: str, size_type: str = "") -> Tuple[Optional[int], Optional[str]]:
+        """``(size id, None)`` or ``(None, error message)``."""
+        by_type = self.ids.get(code) or {}
+        if size_type:
+            size_id = by_type.get(size_type)
+            return (size_id, None) if size_id is not None else (None, f"Размер не найден: {code} ({size_type}).")
+        if len(by_type) == 1:
+            return next(iter(by_type.values())), None
+        if by_type:
+            return None, f"Размер {code} есть у нескольких типов, укажите size_type."
+        return None, f"Размер не найден: {code or '—'}."
+
+
+class ProductImporter:
+    """
+    Chunked upsert of products, their sizes and images keyed by SKU.
+
+    Each chunk is validated, written with ``bulk_create(update_conflicts=True)``
+    inside one transaction together with its outbox events.
+    Sizes are referenced by code (plus ``size_type`` when the code is shared)
+    and merged (listed sizes are upserted, others kept); images listed for a
+    product replace its existing images.
+    """
+
+    def __init__(self, chunk_size: int = 1000, publish: bool = True):
+        self.chunk_size = chunk_size
+        self.publish = publish
+        self.report = ImportReport()
+        self.categories = _Lookup(Category, "slug")
+        self.brands = _Lookup(Brand, "slug")
+        self.sizes = _SizeLookup()
+
+    def run(self, records: Iterable[Tuple[int, dict]]) -> ImportReport:
+        iterator = iter(records)
+        while True:
+            chunk = list(islice(iterator, self.chunk_size))
+            if not chunk:
+                break
+            self._import_chunk(chunk)
+        if self.report.upserted:
+            bump_facets_version()
+        return self.report
+
+    def _import_chunk(self, chunk: List[Tuple[int, dict]]) -> None:
+        self.report.processed += len(chunk)
+        self.categories.preload(str(record.get("category") or "") for _, record in chunk)
+        self.brands.preload(str(record.get("brand") or "") for _, record in chunk)
+        self.sizes.preload(
+            str(size.get("size") or "")
+            for _, record in chunk
+            if isinstance(record.get("sizes"), list)
+            for size in record["sizes"]
+            if isinstance(size, dict)
+        )
+
+        rows: Dict[str, _Row] = {}
+        for line, record in chunk:
+            row = self._build_row(line, record)
+            if row is not None:
+                # The last occurrence of a SKU within a chunk wins.
+                rows[row.product.sku] = row
+        self._reject_foreign_slugs(rows)
+        if not rows:
+            return
+
+        with transaction.atomic():
+            Product.objects.bulk_create(
+                [row.product for row in rows.values()],
+                update_conflicts=True,
+                unique_fields=["sku"],
+                update_fields=PRODUCT_UPDATE_FIELDS,
+            )
+            products = {
+                product.sku: product
+                for product in Product.objects.filter(sku__in=list(rows)).defer("search_vector")
+            }
+            self._write_sizes(rows, products)
+            self._write_images(rows, products)
+            refresh_search_vectors(product.id for product in products.values())
+            schedule_snapshot_refresh(product.id for product in products.values())
+            if self.publish:
+                self.report.published += len(publish_product_events(products.values()))
+        self.report.upserted += len(products)
+
+    def _build_row(self, line: int, record: dict) -> Optional[_Row]:
+        sku = str(record.get("sku") or "").strip()
+        if "__error__" in record:
+            self.report.add_error(line, sku, {"record": record["__error__"]})
+            return None
+        errors: Dict[str, str] = {}
+        if not sku:
+            errors["sku"] = "Обязательное поле."
+        name = str(record.get("name") or "").strip()
+        if not name:
+            errors["name"] = "Обязательное поле."
+        try:
+            price = Decimal(str(record.get("price")))
+            if price < 0 or not price.is_finite():
+                raise InvalidOperation
+        except (InvalidOperation, ValueError):
+            errors["price"] = "Некорректная цена."
+            price = None
+        category_id = self.categories.get(str(record.get("category") or ""))
+        if category_id is None:
+            errors["category"] = "Категория не найдена."
+        brand_id = self.brands.get(str(record.get("brand") or ""))
+        if brand_id is None:
+            errors["brand"] = "Бренд не найден."
+        status = record.get("status") or Product.Availability.IN_STOCK
+        if status not in Product.Availability.values:
+            errors["status"] = "Недопустимый статус."
+        attributes = record.get("attributes") or {}
+        if not isinstance(attributes, dict):
+            errors["attributes"] = "Ожидается JSON-объект."
+        try:
+            stock = int(record.get("stock") or 0)
+            weight_grams = int(record.get("weight_grams") or 0)
+            if stock < 0 or weight_grams < 0:
+                raise ValueError
+        except (TypeError, ValueError):
+            errors["stock"] = "Остаток и вес должны быть неотрицательными целыми числами."
+            stock = weight_grams = 0
+        sizes = self._build_sizes(record.get("sizes"), errors)
+        images = self._build_images(record.get("images"), errors)
+        if errors:
+            self.report.add_error(line, sku, errors)
+            return None
+
+        is_published = record.get("is_published")
+        if not isinstance(is_published, bool):
+            is_published = str(is_published or "").strip().lower() in _TRUE_VALUES
+        product = Product(
+            sku=sku,
+            name=name,
+            slug=str(record.get("slug") or "").strip() or slugify(f"{name}-{sku}", allow_unicode=False) or sku.lower(),
+            description=str(record.get("description") or ""),
+            category_id=category_id,
+            brand_id=brand_id,
+            price=price,
+            currency=str(record.get("currency") or "RUB")[:3],
+            status=status,
+            is_published=is_published,
+            attributes=attributes,
+            stock=stock,
+            weight_grams=weight_grams,
+        )
+        return _Row(line=line, product=product, sizes=sizes, images=images)
+
+    def _build_sizes(self, value, errors: Dict[str, str]) -> Optional[List[Tuple[int, int, Decimal]]]:
+        if value is None:
+            return None
+        if not isinstance(value, list):
+            errors["sizes"] = "Ожидается список размеров."
+            return None
+        sizes = []
+        for entry in value:
+            if not isinstance(entry, dict):
+                errors["sizes"] = "Ожидается JSON-объект размера."
+                return None
+            code = str(entry.get("size") or "")
+            size_id, error = self.sizes.resolve(code, str(entry.get("size_type") or ""))
+            if error:
+                errors["sizes"] = error
+                return None
+            try:
+                stock = int(entry.get("stock") or 0)
+                modifier = Decimal(str(entry.get("price_modifier") or "0"))
+                # Checked here so one bad row does not abort the chunk on the stock >= 0 constraint.
+                if stock < 0 or not modifier.is_finite():
+                    raise ValueError
+            except (InvalidOperation, TypeError, ValueError):
+                errors["sizes"] = f"Некорректные данные размера {code}: остаток должен быть неотрицательным целым."
+                return None
+            sizes.append((size_id, stock, modifier))
+        return sizes
+
+    def _build_images(self, value, errors: Dict[str, str]) -> Optional[List[Tuple[str, str]]]:
+        if value is None:
+            return None
+        if not isinstance(value, list):
+            errors["images"] = "Ожидается список изображений."
+            return None
+        images = []
+        for entry in value:
+            path = str(entry.get("image") or "") if isinstance(entry, dict) else ""
+            if not path:
+                errors["images"] = "Для изображения не указан путь."
+                return None
+            images.append((path, str(entry.get("alt_text") or "")))
+        return images
+
+    def _reject_foreign_slugs(self, rows: Dict[str, _Row]) -> None:
+        """Drop rows whose slug already belongs to another SKU instead of failing the whole chunk."""
+        seen: Dict[str, str] = {}
+        for sku, row in list(rows.items()):
+            if row.product.slug in seen:
+                self.report.add_error(row.line, sku, {"slug": "Слаг повторяется в файле."})
+                del rows[sku]
+                continue
+            seen[row.product.slug] = sku
+        taken = Product.objects.filter(slug__in=list(seen)).exclude(sku__in=list(rows)).values_list("slug", flat=True)
+        for slug in taken:
+            sku = seen[slug]
+            if sku in rows:
+                self.report.add_error(rows[sku].line, sku, {"slug": "Слаг уже занят другим товаром."})
+                del rows[sku]
+
+    def _write_sizes(self, rows: Dict[str, _Row], products: Dict[str, Product]) -> None:
+        sizes = [
+            ProductSize(
+                product_id=products[sku].id,
+                size_id=size_id,
+                stock=stock,
+                price_modifier=modifier,
+            )
+            for sku, row in rows.items()
+            if row.sizes
+            for size_id, stock, modifier in row.sizes
+        ]
+        if sizes:
+            ProductSize.objects.bulk_create(
+                sizes,
+                update_conflicts=True,
+                unique_fields=["product", "size"],
+                update_fields=["stock", "price_modifier"],
+            )
+
+    def _write_images(self, rows: Dict[str, _Row], products: Dict[str, Product]) -> None:
+        replaced = [products[sku].id for sku, row in rows.items() if row.images is not None]
+        if not replaced:
+            return
+        ProductImage.objects.filter(product_id__in=replaced).delete()
+        ProductImage.objects.bulk_create(
+            ProductImage(product_id=products[sku].id, image=path, alt_text=alt_text, position=position)
+            for sku, row in rows.items()
+            if row.images
+            for position, (path, alt_text) in enumerate(row.images)
+        )
+
+
+def _export_record(product: Product) -> dict:
+    return {
+        "sku": product.sku,
+        "name": product.name,
+        "slug": product.slug,
+        "description": product.description,
+        "category": product.category.slug,
+        "brand": product.brand.slug,
+        "price": str(product.price),
+        "currency": product.currency,
+        "status": product.status,
+        "is_published": product.is_published,
+        "stock": product.stock,
+        "weight_grams": product.weight_grams,
+        "attributes": product.attributes,
+        "sizes": [
+            {
+                "size": item.size.code,
+                "size_type": item.size.size_type,
+                "stock": item.stock,
+                "price_modifier": str(item.price_modifier),
+            }
+            for item in product.productsize_set.all()
+        ],
+        "images": [{"image": image.image.name, "alt_text": image.alt_text} for image in product.images.all()],
+    }
+
+
+class _Echo:
+    def write(self, value: str) -> str:
+        return value
+
+
+def export_products(queryset, fmt: str, chunk_size: int = 2000) -> Iterator[str]:
+    """Stream products in the import format, one chunk of rows in memory at a time."""
+    products = (
+        queryset.select_related("category", "brand")
+        .prefetch_related("productsize_set__size", "images")
+        .defer("search_vector")
+        .order_by("id")
+        .iterator(chunk_size=chunk_size)
+    )
+    if fmt == "jsonl":
+        for product in products:
+            yield json.dumps(_export_record(product), ensure_ascii=False) + "\n"
+        return
+
+    writer = csv.DictWriter(_Echo(), fieldnames=CSV_COLUMNS)
+    yield writer.writeheader()
+    for product in products:
+        record = _export_record(product)
+        record["attributes"] = json.dumps(record["attributes"], ensure_ascii=False) if record["attributes"] else ""
+        record["sizes"] = ";".join(
+            f"{item['size']}:{item['stock']}:{item['price_modifier']}:{item['size_type']}" for item in record["sizes"]
+        )
+        record["images"] = ";".join(f"{item['image']}|{item['alt_text']}" for item in record["images"])
+        yield writer.writerow(record)
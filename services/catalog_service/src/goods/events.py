@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import logging
+from typing import Dict, Iterable, List
+
+from django.conf import settings
+
+from ferrum_common.outbox.services import enqueue_events
+
+from .models import Product
+from .snapshots import schedule_snapshot_refresh
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_AGGREGATE = "product"
+
+
+def product_event_payload(product: Product, deleted: bool = False) -> Dict[str, str]:
+    return {
+        "product_id": str(product.id),
+        "slug": product.slug,
+        "name": product.name,
+        "sku": product.sku,
+        "price": str(product.price),
+        "currency": product.currency,
+        "category_id": str(product.category_id),
+        "is_published": "true" if product.is_published and not deleted else "false",
+        "deleted": "true" if deleted else "false",
+    }
+
+
+def publish_product_events(products: Iterable[Product], deleted: bool = False) -> List[Product]:
+    """
+    Record outbox events for products with a single INSERT.
+
+    Call inside the transaction that saved (or is about to delete) the
+    products. Unpublished and deleted products are sent too, with
+    ``is_published=false``, so read models hide them. The outbox relay
+    pushes the events to ``PRODUCT_STREAM`` and stores the stream id in
+    ``meta["last_stream_id"]``.
+    """
+    stream = getattr(settings, "PRODUCT_STREAM", None)
+    products = list(products)
+    if not stream or not products:
+        return []
+    enqueue_events(
+        (stream, PRODUCT_AGGREGATE, product.pk, product_event_payload(product, deleted=deleted))
+        for product in products
+    )
+    return products
+
+
+def store_stream_ids(events) -> None:
+    """Copy relayed stream ids into ``Product.meta`` with one ``bulk_update``."""
+    stream_ids: Dict[int, str] = {
+        int(event.aggregate_id): event.stream_id for event in events if event.aggregate_type == PRODUCT_AGGREGATE
+    }
+    if not stream_ids:
+        return
+    products = list(Product.objects.filter(pk__in=stream_ids).only("id", "meta"))
+    for product in products:
+        product.meta = {**(product.meta or {}), "last_stream_id": stream_ids[product.pk]}
+    Product.objects.bulk_update(products, ["meta"])
+    schedule_snapshot_refresh(stream_ids)
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import time
+from decimal import Decimal
+from typing import Dict, List, Optional, Sequence
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, QuerySet
+
+from .models import ProductSize
+
+logger = logging.getLogger(__name__)
+
+FACETS_VERSION_KEY = "catalog:facets:version"
+FACETS_KEY = "catalog:facets:{version}:{digest}"
+
+
+def _new_version() -> int:
+    return int(time.time() * 1000)
+
+
+def bump_facets_version() -> None:
+    try:
+        try:
+            cache.incr(FACETS_VERSION_KEY)
+        except ValueError:
+            cache.set(FACETS_VERSION_KEY, _new_version(), timeout=None)
+    except Exception as exc:  # pragma: no cover - network errors
+        logger.warning("Failed to bump facets version: %s", exc)
+
+
+def price_buckets(bounds: Sequence) -> List[dict]:
+    edges = [None, *(Decimal(str(bound)) for bound in bounds), None]
+    return [{"from": low, "to": high} for low, high in zip(edges, edges[1:])]
+
+
+def _bucket_key(bucket: dict) -> str:
+    low = "" if bucket["from"] is None else str(bucket["from"])
+    high = "" if bucket["to"] is None else str(bucket["to"])
+    return f"{low}-{high}"
+
+
+def compute_facets(queryset: QuerySet) -> Dict[str, list]:
+    """
+    Count the products of ``queryset`` per brand, category, status, size and price bucket.
+
+    Each facet is one grouped aggregate over the already filtered queryset;
+    price buckets are counted with conditional aggregates in a single query.
+    """
+    base = queryset.order_by()
+    brands = base.values("brand_id", "brand__name").annotate(count=Count("id", distinct=True)).order_by("-count")
+    categories = (
+        base.values("category_id", "category__name").annotate(count=Count("id", distinct=True)).order_by("-count")
+    )
+    statuses = base.values("status").annotate(count=Count("id", distinct=True)).order_by("-count")
+    sizes = (
+        ProductSize.objects.filter(product__in=base.values("id"))
+        .values("size_id", "size__name", "size__code")
+        .annotate(count=Count("product_id", distinct=True))
+        .order_by("-count")
+    )
+
+    buckets = price_buckets(getattr(settings, "PRODUCT_PRICE_BUCKETS", ()))
+    bucket_counts = {}
+    for bucket in buckets:
+        condition = Q()
+        if bucket["from"] is not None:
+            condition &= Q(price__gte=bucket["from"])
+        if bucket["to"] is not None:
+            condition &= Q(price__lt=bucket["to"])
+        bucket_counts[_bucket_key(bucket)] = Count("id", filter=condition, distinct=True)
+    price_counts = base.aggregate(**bucket_counts) if bucket_counts else {}
+
+    return {
+        "brand": [
+            {"id": row["brand_id"], "name": row["brand__name"], "count": row["count"]} for row in brands
+        ],
+        "category": [
+            {"id": row["category_id"], "name": row["category__name"], "count": row["count"]} for row in categories
+        ],
+        "status": [{"value": row["status"], "count": row["count"]} for row in statuses],
+        "size": [
+            {"id": row["size_id"], "name": row["size__name"], "code": row["size__code"], "count": row["count"]}
+            for row in sizes
+        ],
+        "price": [
+            {
+                "from": None if bucket["from"] is None else str(bucket["from"]),
+                "to": None if bucket["to"] is None else str(bucket["to"]),
+                "count": price_counts[_bucket_key(bucket)],
+            }
+            for bucket in buckets
+        ],
+    }
+
+
+def get_facets(queryset: QuerySet, cache_key: str) -> Dict[str, list]:
+    """
+    Return facets for ``queryset``, memoized per filter set until the catalog changes.
+
+    ``cache_key`` must identify the filter set (e.g. normalized query params);
+    any product write bumps the facets version and retires all cached entries.
+    """
+    try:
+        version = cache.get_or_set(FACETS_VERSION_KEY, _new_version, timeout=None)
+    except Exception as exc:  # pragma: no cover - network errors
+        logger.warning("Failed to read facets version: %s", exc)
+        version = None
+    if version is None:
+        return compute_facets(queryset)
+
+    key = FACETS_KEY.format(version=version, digest=hashlib.sha1(cache_key.encode()).hexdigest())
+    facets: Optional[dict] = None
+    try:
+        facets = cache.get(key)
+    except Exception as exc:  # pragma: no cover - network errors
+        logger.warning("Failed to read cached facets: %s", exc)
+    if facets is None:
+        facets = compute_facets(queryset)
+        try:
+            cache.set(key, facets, timeout=getattr(settings, "PRODUCT_FACETS_CACHE_TIMEOUT", 300))
+        except Exception as exc:  # pragma: no cover - network errors
+            logger.warning("Failed to store facets: %s", exc)
+    return facets
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+import sys
+
+from django.core.management.base import BaseCommand
+
+from goods.bulk import export_products
+from goods.models import Product
+
+
+class Command(BaseCommand):
+    help = "Потоковый экспорт товаров в CSV/JSONL в формате импорта."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", default="-", help="Путь к файлу или '-' для stdout.")
+        parser.add_argument("--format", choices=("csv", "jsonl"), default="jsonl")
+        parser.add_argument("--published-only", action="store_true")
+
+    def handle(self, *args, **options):
+        queryset = Product.objects.all()
+        if options["published_only"]:
+            queryset = queryset.filter(is_published=True)
+        rows = export_products(queryset, options["format"])
+        if options["path"] == "-":
+            sys.stdout.writelines(rows)
+            return
+        with open(options["path"], "w", encoding="utf-8", newline="") as output:
+            output.writelines(rows)
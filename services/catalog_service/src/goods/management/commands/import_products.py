@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from goods.bulk import ImportFormatError, ProductImporter, detect_format, iter_records
+
+
+class Command(BaseCommand):
+    help = "Импорт товаров из CSV/JSONL с пакетным upsert по SKU."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Путь к файлу или '-' для stdin.")
+        parser.add_argument("--format", choices=("csv", "jsonl"), help="Формат файла (по умолчанию по расширению).")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+        parser.add_argument("--no-publish", action="store_true", help="Не публиковать события в Redis Streams.")
+        parser.add_argument("--report", help="Сохранить отчёт об ошибках в JSON-файл.")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        try:
+            fmt = detect_format(path, options["format"])
+        except ImportFormatError as exc:
+            raise CommandError(str(exc)) from exc
+
+        importer = ProductImporter(chunk_size=options["chunk_size"], publish=not options["no_publish"])
+        if path == "-":
+            report = importer.run(iter_records(sys.stdin, fmt))
+        else:
+            with open(path, encoding="utf-8", newline="") as stream:
+                report = importer.run(iter_records(stream, fmt))
+
+        if options["report"]:
+            with open(options["report"], "w", encoding="utf-8") as output:
+                json.dump(report.as_dict(), output, ensure_ascii=False, indent=2)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Обработано: {report.processed}, сохранено: {report.upserted}, "
+                f"ошибок: {report.failed}, опубликовано: {report.published}"
+            )
+        )
@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from goods.models import Product
+from goods.snapshots import refresh_product_snapshots
+
+
+class Command(BaseCommand):
+    help = "Перестраивает JSON-снимки карточек товаров в Redis и таблице ProductSnapshot."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=500)
+        parser.add_argument("--published-only", action="store_true")
+
+    def handle(self, *args, **options):
+        queryset = Product.objects.order_by("pk")
+        if options["published_only"]:
+            queryset = queryset.filter(is_published=True)
+        rendered = refresh_product_snapshots(queryset.values_list("pk", flat=True), chunk_size=options["chunk_size"])
+        self.stdout.write(f"Снимков перестроено: {rendered}")
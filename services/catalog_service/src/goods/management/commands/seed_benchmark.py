@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+from decimal import Decimal
+from typing import Dict, List, Optional
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework_simplejwt.tokens import AccessToken
+
+from catalog.models import Category
+from goods.models import Brand, Product, ProductSize, Size
+from orders.models import BasketItem, DeliveryMethod, PaymentMethod
+
+PREFIX = "bench"
+
+
+def seed_categories(depth: int, fanout: int) -> List[int]:
+    """A full ``fanout``-ary tree of ``depth`` levels; returns the ids of the leaves."""
+    level: List[Optional[int]] = [None]
+    for depth_index in range(depth):
+        created = Category.objects.bulk_create(
+            [
+                Category(
+                    name=f"Категория {depth_index}.{parent_index}.{child}",
+                    slug=f"{PREFIX}-{depth_index}-{parent_index}-{child}",
+                    parent_id=parent_id,
+                    position=child,
+                )
+                for parent_index, parent_id in enumerate(level)
+                for child in range(fanout)
+            ],
+            batch_size=1000,
+        )
+        level = [category.pk for category in created]
+    return level
+
+
+def seed_products(count: int, leaves: List[int], brands: int = 50, batch_size: int = 2000) -> Dict[str, int]:
+    brand_ids = [
+        brand.pk
+        for brand in Brand.objects.bulk_create(
+            [Brand(name=f"Бренд {index}", slug=f"{PREFIX}-brand-{index}") for index in range(brands)]
+        )
+    ]
+    size_ids = [
+        Size.objects.get_or_create(code=code, size_type=Size.SizeType.CLOTHES, defaults={"name": code})[0].pk
+        for code in ("XS", "S", "M", "L", "XL")
+    ]
+    created = 0
+    for start in range(0, count, batch_size):
+        products = Product.objects.bulk_create(
+            [
+                Product(
+                    name=f"Товар {index}",
+                    slug=f"{PREFIX}-product-{index}",
+                    description="Описание товара для нагрузочного теста. " * 4,
+                    category_id=leaves[index % len(leaves)],
+                    brand_id=brand_ids[index % len(brand_ids)],
+                    sku=f"{PREFIX.upper()}-{index:07d}",
+                    price=Decimal(100 + index % 9000),
+                    stock=1_000_000,
+                    is_published=True,
+                    attributes={"color": ("black", "white", "red")[index % 3]},
+                )
+                for index in range(start, min(start + batch_size, count))
+            ]
+        )
+        ProductSize.objects.bulk_create(
+            [
+                ProductSize(product_id=product.pk, size_id=size_id, stock=1_000_000)
+                for product in products
+                for size_id in size_ids[: 1 + product.pk % len(size_ids)]
+            ]
+        )
+        created += len(products)
+    return {"products": created, "brands": len(brand_ids), "sizes": len(size_ids)}
+
+
+def seed_baskets(users: int, items: int) -> List[int]:
+    """``users`` buyers with ``items`` basket lines each; returns the user ids."""
+    User = get_user_model()
+    user_ids = []
+    product_ids = list(Product.objects.order_by("pk").values_list("pk", "price")[: max(items * 4, items)])
+    for index in range(users):
+        user = User.objects.create_user(username=f"{PREFIX}-buyer-{index}", email=f"buyer{index}@bench.local")
+        user_ids.append(user.pk)
+        BasketItem.objects.bulk_create(
+            [
+                BasketItem(user_id=user.pk, product_id=product_id, count=1 + line % 3, price=price)
+                for line, (product_id, price) in enumerate(product_ids[index % 4 :: 4][:items])
+            ]
+        )
+    PaymentMethod.objects.get_or_create(code=f"{PREFIX}-yookassa", defaults={"name": "YooKassa"})
+    DeliveryMethod.objects.get_or_create(
+        code=f"{PREFIX}-courier", defaults={"name": "Курьер", "base_price": Decimal("250.00")}
+    )
+    return user_ids
+
+
+class Command(BaseCommand):
+    help = "Заполняет базу синтетическими данными для бенчмарков: дерево категорий, товары, корзины."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=100_000)
+        parser.add_argument("--category-depth", type=int, default=6)
+        parser.add_argument("--category-fanout", type=int, default=4)
+        parser.add_argument("--basket-users", type=int, default=20)
+        parser.add_argument("--basket-items", type=int, default=50)
+        parser.add_argument(
+            "--tokens",
+            action="store_true",
+            help="Вывести JWT покупателей (по одному в строке) для services/loadtest.py.",
+        )
+
+    def handle(self, *args, **options):
+        if options["tokens"]:
+            for user in get_user_model().objects.filter(username__startswith=f"{PREFIX}-buyer-").order_by("pk"):
+                self.stdout.write(str(AccessToken.for_user(user)))
+            return
+        if Category.objects.filter(slug__startswith=f"{PREFIX}-").exists():
+            self.stdout.write("Данные для бенчмарков уже загружены.")
+            return
+        with transaction.atomic():
+            leaves = seed_categories(options["category_depth"], options["category_fanout"])
+            counts = seed_products(options["products"], leaves)
+            users = seed_baskets(options["basket_users"], options["basket_items"])
+        self.stdout.write(
+            f"Категорий-листьев: {len(leaves)}, товаров: {counts['products']}, "
+            f"корзин: {len(users)} по {options['basket_items']} позиций"
+        )
@@ -0,0 +1,28 @@
+from __future__ import annotations
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("goods", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="product",
+            options={
+                "ordering": ("-created_at", "-id"),
+                "verbose_name": "Товар",
+                "verbose_name_plural": "Товары",
+            },
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["-created_at", "-id"], name="goods_product_created_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="product",
+            index=models.Index(fields=["price", "id"], name="goods_product_price_idx"),
+        ),
+    ]
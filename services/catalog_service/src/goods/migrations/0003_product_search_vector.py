@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import django.contrib.postgres.search
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+SEARCH_INDEX_SQL = (
+    "CREATE INDEX IF NOT EXISTS goods_product_search_idx ON goods_product USING gin (search_vector)",
+    "CREATE INDEX IF NOT EXISTS goods_product_name_trgm_idx ON goods_product USING gin (name gin_trgm_ops)",
+)
+
+BACKFILL_SQL = """
+UPDATE goods_product AS p SET search_vector =
+    setweight(to_tsvector('simple', coalesce(p.sku, '')), 'A')
+    || setweight(to_tsvector('russian', coalesce(p.name, '')), 'A')
+    || setweight(to_tsvector('english', coalesce(p.name, '')), 'A')
+    || setweight(to_tsvector('russian', coalesce(b.name, '')), 'B')
+    || setweight(to_tsvector('english', coalesce(b.name, '')), 'B')
+    || setweight(to_tsvector('russian', coalesce(p.description, '')), 'C')
+    || setweight(to_tsvector('english', coalesce(p.description, '')), 'C')
+    || setweight(jsonb_to_tsvector('russian', coalesce(p.attributes, '{}'::jsonb), '["string", "numeric"]'), 'D')
+FROM goods_brand AS b
+WHERE b.id = p.brand_id
+"""
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for statement in SEARCH_INDEX_SQL:
+        schema_editor.execute(statement)
+    schema_editor.execute(BACKFILL_SQL)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS goods_product_name_trgm_idx")
+    schema_editor.execute("DROP INDEX IF EXISTS goods_product_search_idx")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("goods", "0002_product_keyset_indexes"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name="product",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,35 @@
+from __future__ import annotations
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("goods", "0003_product_search_vector"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductSnapshot",
+            fields=[
+                (
+                    "product",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="snapshot",
+                        serialize=False,
+                        to="goods.product",
+                    ),
+                ),
+                ("body", models.BinaryField()),
+                ("etag", models.CharField(max_length=40)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Снимок товара",
+                "verbose_name_plural": "Снимки товаров",
+            },
+        ),
+    ]
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from decimal import Decimal
 
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 
 from catalog.models import Category
@@ -72,9 +73,14 @@ class Product(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     sizes = models.ManyToManyField(Size, through="ProductSize", blank=True, related_name="products")
+    search_vector = SearchVectorField(null=True, editable=False)
 
     class Meta:
-        ordering = ("-created_at",)
+        ordering = ("-created_at", "-id")
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="goods_product_created_idx"),
+            models.Index(fields=["price", "id"], name="goods_product_price_idx"),
+        ]
         verbose_name = "Товар"
         verbose_name_plural = "Товары"
 
@@ -106,3 +112,14 @@ class ProductImage(models.Model):
         verbose_name_plural = "Изображения товаров"
 
 
+class ProductSnapshot(models.Model):
+    """Rendered product detail document, the durable copy of the Redis snapshot."""
+
+    product = models.OneToOneField(Product, primary_key=True, related_name="snapshot", on_delete=models.CASCADE)
+    body = models.BinaryField()
+    etag = models.CharField(max_length=40)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Снимок товара"
+        verbose_name_plural = "Снимки товаров"
@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+import re
+from typing import Iterable, Optional
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import connection
+from django.db.models import DecimalField, F, QuerySet
+from django.db.models.functions import Cast
+
+from .models import Brand, Product
+
+SEARCH_CONFIGS = ("russian", "english")
+SEARCH_RANK_FIELD = "search_rank"
+# Fields feeding the search document; saves touching only other columns skip the refresh.
+SEARCH_SOURCE_FIELDS = frozenset({"name", "sku", "description", "attributes", "brand", "brand_id"})
+
+_SKU_RE = re.compile(r"^[\w.\-/]{2,64}$")
+
+_REFRESH_SQL = """
+UPDATE {product} AS p SET search_vector =
+    setweight(to_tsvector('simple', coalesce(p.sku, '')), 'A')
+    || setweight(to_tsvector('russian', coalesce(p.name, '')), 'A')
+    || setweight(to_tsvector('english', coalesce(p.name, '')), 'A')
+    || setweight(to_tsvector('russian', coalesce(b.name, '')), 'B')
+    || setweight(to_tsvector('english', coalesce(b.name, '')), 'B')
+    || setweight(to_tsvector('russian', coalesce(p.description, '')), 'C')
+    || setweight(to_tsvector('english', coalesce(p.description, '')), 'C')
+    || setweight(jsonb_to_tsvector('russian', coalesce(p.attributes, '{{}}'::jsonb), '["string", "numeric"]'), 'D')
+FROM {brand} AS b
+WHERE b.id = p.brand_id AND {condition}
+"""
+
+
+def is_full_text_available() -> bool:
+    return connection.vendor == "postgresql"
+
+
+def _refresh(condition: str, params: list) -> None:
+    if not is_full_text_available():
+        return
+    sql = _REFRESH_SQL.format(
+        product=connection.ops.quote_name(Product._meta.db_table),
+        brand=connection.ops.quote_name(Brand._meta.db_table),
+        condition=condition,
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+
+
+def refresh_search_vectors(product_ids: Iterable[int]) -> None:
+    """Rebuild the ``tsvector`` document of the given products in one UPDATE."""
+    ids = list(product_ids)
+    if ids:
+        _refresh("p.id = ANY(%s)", [ids])
+
+
+def refresh_brand_search_vectors(brand_id: int) -> None:
+    _refresh("p.brand_id = %s", [brand_id])
+
+
+def find_by_sku(queryset: QuerySet, query: str) -> Optional[QuerySet]:
+    """Exact SKU lookup served by the unique index; ``None`` if ``query`` is not a SKU."""
+    if not _SKU_RE.match(query):
+        return None
+    matches = queryset.filter(sku=query)
+    return matches if matches.exists() else None
+
+
+def search_products(queryset: QuerySet, query: str) -> QuerySet:
+    """
+    Rank ``queryset`` against ``query`` using the PostgreSQL search document.
+
+    Falls back to trigram similarity on the product name (``pg_trgm``'s ``%``
+    operator, served by the trigram GIN index) when the full-text query
+    matches nothing, which covers typos. Results are annotated with a
+    fixed-scale ``search_rank`` so keyset pagination can page through them.
+    """
+    ts_query = None
+    for config in SEARCH_CONFIGS:
+        part = SearchQuery(query, config=config, search_type="websearch")
+        ts_query = part if ts_query is None else ts_query | part
+    rank_field = DecimalField(max_digits=12, decimal_places=6)
+
+    matches = queryset.filter(search_vector=ts_query).annotate(
+        **{SEARCH_RANK_FIELD: Cast(SearchRank(F("search_vector"), ts_query), rank_field)}
+    )
+    if matches.exists():
+        return matches.order_by(f"-{SEARCH_RANK_FIELD}", "-id")
+
+    return (
+        queryset.filter(name__trigram_similar=query)
+        .annotate(**{SEARCH_RANK_FIELD: Cast(TrigramSimilarity("name", query), rank_field)})
+        .order_by(f"-{SEARCH_RANK_FIELD}", "-id")
+    )
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from ferrum_common.outbox.signals import events_published
+
+from .events import store_stream_ids
+from .facets import bump_facets_version
+from .models import Brand, Product, ProductImage, ProductSize, Size
+from .search import SEARCH_SOURCE_FIELDS, refresh_brand_search_vectors, refresh_search_vectors
+from .snapshots import schedule_snapshot_refresh
+
+
+@receiver(post_save, sender=Product)
+def sync_product_search_vector(sender, instance: Product, update_fields=None, **kwargs):
+    if update_fields is not None and not SEARCH_SOURCE_FIELDS.intersection(update_fields):
+        return
+    refresh_search_vectors([instance.pk])
+
+
+@receiver(post_save, sender=Brand)
+def sync_brand_search_vectors(sender, instance: Brand, created: bool, update_fields=None, **kwargs):
+    if created or (update_fields is not None and "name" not in update_fields):
+        return
+    refresh_brand_search_vectors(instance.pk)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductSize)
+@receiver(post_delete, sender=ProductSize)
+@receiver(post_save, sender=Brand)
+def invalidate_facets(sender, **kwargs):
+    transaction.on_commit(bump_facets_version)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def refresh_product_snapshot(sender, instance: Product, **kwargs):
+    schedule_snapshot_refresh([instance.pk])
+
+
+@receiver(post_save, sender=ProductSize)
+@receiver(post_delete, sender=ProductSize)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+def refresh_product_snapshot_for_child(sender, instance, **kwargs):
+    schedule_snapshot_refresh([instance.product_id])
+
+
+@receiver(post_save, sender=Brand)
+def refresh_brand_product_snapshots(sender, instance: Brand, created: bool, **kwargs):
+    if not created:
+        schedule_snapshot_refresh(instance.products.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=Size)
+def refresh_size_product_snapshots(sender, instance: Size, created: bool, **kwargs):
+    if not created:
+        schedule_snapshot_refresh(instance.productsize_set.values_list("product_id", flat=True))
+
+
+@receiver(events_published)
+def store_product_stream_ids(sender, events, **kwargs):
+    store_stream_ids(events)
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from ferrum_common.metrics import get_redis_connection
+from ferrum_common.renderers import dumps
+
+from .models import Product, ProductSnapshot
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_SNAPSHOT_KEY = "catalog:product-snapshot:{id}"
+# Products whose stock changed since the last ``refresh_stale_stock_snapshots`` run.
+STALE_STOCK_KEY = "catalog:product-snapshot:stale-stock"
+
+
+@dataclass(frozen=True)
+class ProductDocument:
+    body: bytes
+    etag: str
+
+
+# JSON members of the product document holding media URLs (product images, brand logo).
+_MEDIA_MEMBERS = (b'"image":"', b'"logo":"')
+
+
+def _key(product_id: int) -> str:
+    return PRODUCT_SNAPSHOT_KEY.format(id=product_id)
+
+
+def _chunks(values: List[int], size: int) -> Iterable[List[int]]:
+    for start in range(0, len(values), size):
+        yield values[start : start + size]
+
+
+def render_products(product_ids: Iterable[int]) -> Dict[int, ProductDocument]:
+    """Render product detail documents as the retrieve endpoint would, with media URLs left relative."""
+    # The API layer owns the document shape; imported lazily to keep goods importable without it.
+    from api.goods import ProductSerializer
+
+    queryset = (
+        Product.objects.filter(pk__in=list(product_ids))
+        .select_related("brand")
+        .prefetch_related("images", "productsize_set__size")
+        .defer("search_vector")
+    )
+    documents = {}
+    for product in queryset:
+        body = dumps(ProductSerializer(product).data)
+        documents[product.pk] = ProductDocument(body=body, etag=hashlib.sha1(body).hexdigest())
+    return documents
+
+
+def absolute_media_urls(body: bytes, request) -> bytes:
+    """
+    Make the media URLs of a rendered document absolute for ``request``.
+
+    Documents are rendered without a request and keep ``MEDIA_URL`` paths, so
+    one stored document serves every host; the host is added here, the way
+    the serializers do it for the list endpoint.
+    """
+    media_url = settings.MEDIA_URL
+    if not media_url.startswith("/"):
+        return body
+    path = media_url.encode()
+    absolute = request.build_absolute_uri(media_url).encode()
+    for member in _MEDIA_MEMBERS:
+        body = body.replace(member + path, member + absolute)
+    return body
+
+
+def _cache_documents(documents: Dict[int, ProductDocument]) -> None:
+    try:
+        cache.set_many(
+            {_key(product_id): (document.etag, document.body) for product_id, document in documents.items()},
+            timeout=getattr(settings, "PRODUCT_SNAPSHOT_CACHE_TIMEOUT", 86400),
+        )
+    except Exception as exc:  # pragma: no cover - network errors
+        logger.warning("Failed to store product snapshots: %s", exc)
+
+
+def _store_documents(documents: Dict[int, ProductDocument]) -> None:
+    if not documents:
+        return
+    if getattr(settings, "PRODUCT_SNAPSHOT_STORE_DB", True):
+        ProductSnapshot.objects.bulk_create(
+            [
+                ProductSnapshot(product_id=product_id, body=document.body, etag=document.etag)
+                for product_id, document in documents.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["product"],
+            update_fields=["body", "etag", "updated_at"],
+        )
+    _cache_documents(documents)
+
+
+def refresh_product_snapshots(product_ids: Iterable[int], chunk_size: int = 500) -> int:
+    """
+    Re-render the given products into Redis and ``ProductSnapshot``.
+
+    Ids of deleted products are dropped from Redis (their table rows cascade).
+    Returns the number of rendered documents.
+    """
+    ids = sorted({int(product_id) for product_id in product_ids})
+    rendered = 0
+    for chunk in _chunks(ids, chunk_size):
+        documents = render_products(chunk)
+        _store_documents(documents)
+        gone = [product_id for product_id in chunk if product_id not in documents]
+        if gone:
+            try:
+                cache.delete_many([_key(product_id) for product_id in gone])
+            except Exception as exc:  # pragma: no cover - network errors
+                logger.warning("Failed to drop product snapshots: %s", exc)
+        rendered += len(documents)
+    return rendered
+
+
+def get_product_document(product_id: int) -> Optional[ProductDocument]:
+    """
+    Return the rendered detail document of a product, or ``None`` if it does not exist.
+
+    Lookup order is Redis, then the ``ProductSnapshot`` table (backfilling
+    Redis), then a fresh render.
+    """
+    try:
+        cached = cache.get(_key(product_id))
+    except Exception as exc:  # pragma: no cover - network errors
+        logger.warning("Failed to read product snapshot: %s", exc)
+        cached = None
+    if cached is not None:
+        etag, body = cached
+        return ProductDocument(body=body, etag=etag)
+
+    if getattr(settings, "PRODUCT_SNAPSHOT_STORE_DB", True):
+        stored = ProductSnapshot.objects.filter(pk=product_id).values_list("body", "etag").first()
+        if stored is not None:
+            document = ProductDocument(body=bytes(stored[0]), etag=stored[1])
+            _cache_documents({product_id: document})
+            return document
+
+    documents = render_products([product_id])
+    _store_documents(documents)
+    return documents.get(product_id)
+
+
+class _PendingRefresh(threading.local):
+    def __init__(self):
+        self.product_ids: Set[int] = set()
+
+
+_pending = _PendingRefresh()
+
+
+def _flush_pending() -> None:
+    product_ids, _pending.product_ids = _pending.product_ids, set()
+    if product_ids:
+        refresh_product_snapshots(product_ids)
+
+
+def schedule_snapshot_refresh(product_ids: Iterable[int]) -> None:
+    """
+    Re-render products once the current transaction commits.
+
+    Ids collected during one transaction are rendered together by the first
+    commit callback; ids left over from a rolled back transaction are simply
+    refreshed with the next one.
+    """
+    ids = {int(product_id) for product_id in product_ids if product_id is not None}
+    if not ids:
+        return
+    _pending.product_ids.update(ids)
+    transaction.on_commit(_flush_pending, robust=True)
+
+
+def _mark_stock_stale(product_ids: Set[int]) -> None:
+    try:
+        get_redis_connection("default").sadd(STALE_STOCK_KEY, *product_ids)
+    except Exception as exc:  # pragma: no cover - network errors
+        logger.warning("Failed to queue stock snapshot refresh: %s", exc)
+
+
+def schedule_stock_refresh(product_ids: Iterable[int]) -> None:
+    """
+    Queue products whose stock changed for ``refresh_stale_stock_snapshots``.
+
+    Reservations run inside checkout requests on the hottest products, so
+    instead of rendering there the ids only go to a Redis set after commit.
+    The periodic task renders each queued product once per run, however
+    many checkouts touched it; stock in the detail document lags by at most
+    ``PRODUCT_SNAPSHOT_STOCK_REFRESH_INTERVAL`` seconds.
+    """
+    ids = {int(product_id) for product_id in product_ids if product_id is not None}
+    if ids:
+        transaction.on_commit(lambda: _mark_stock_stale(ids), robust=True)
+
+
+def refresh_stale_stock_snapshots() -> int:
+    """Re-render the products queued by ``schedule_stock_refresh``; returns the number of rendered documents."""
+    pipeline = get_redis_connection("default").pipeline()
+    pipeline.smembers(STALE_STOCK_KEY)
+    pipeline.delete(STALE_STOCK_KEY)
+    product_ids, _deleted = pipeline.execute()
+    return refresh_product_snapshots(int(product_id) for product_id in product_ids)
@@ -0,0 +1,11 @@
+from __future__ import annotations
+
+from celery import shared_task
+
+from .snapshots import refresh_stale_stock_snapshots
+
+
+@shared_task
+def refresh_stock_snapshots() -> int:
+    """Periodic re-render of products whose stock changed through checkouts."""
+    return refresh_stale_stock_snapshots()
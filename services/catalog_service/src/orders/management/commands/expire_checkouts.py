@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from orders.services import expire_checkouts
+
+
+class Command(BaseCommand):
+    help = "Отменяет неоплаченные чекауты с истёкшим резервом и возвращает товар на склад."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=500)
+
+    def handle(self, *args, **options):
+        expired = expire_checkouts(limit=options["limit"])
+        self.stdout.write(f"Отменено чекаутов: {expired}")
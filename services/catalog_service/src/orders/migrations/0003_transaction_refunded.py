@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0002_stockreservation"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="transaction",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("initiated", "Инициирована"),
+                    ("succeeded", "Успешна"),
+                    ("failed", "Ошибочна"),
+                    ("refunded", "Возвращена"),
+                ],
+                default="initiated",
+                max_length=32,
+            ),
+        ),
+    ]
@@ -6,7 +6,7 @@ from django.conf import settings
 from django.db import models
 from django.utils import timezone
 
-from goods.models import Product
+from goods.models import Product, Size
 
 
 class PaymentMethod(models.Model):
@@ -130,6 +130,7 @@ class Transaction(models.Model):
         INITIATED = "initiated", "Инициирована"
         SUCCEEDED = "succeeded", "Успешна"
         FAILED = "failed", "Ошибочна"
+        REFUNDED = "refunded", "Возвращена"
 
     checkout = models.ForeignKey(Checkout, related_name="transactions", on_delete=models.CASCADE)
     provider = models.CharField(max_length=64, default="yookassa")
@@ -144,3 +145,32 @@ class Transaction(models.Model):
         verbose_name_plural = "Транзакции"
 
 
+class StockReservation(models.Model):
+    """Товар, списанный с остатка под чекаут до оплаты или истечения срока."""
+
+    class Status(models.TextChoices):
+        ACTIVE = "active", "Активен"
+        COMMITTED = "committed", "Выкуплен"
+        RELEASED = "released", "Снят"
+
+    checkout = models.ForeignKey(Checkout, related_name="reservations", on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, related_name="reservations", on_delete=models.PROTECT)
+    size = models.ForeignKey(Size, null=True, blank=True, on_delete=models.PROTECT)
+    quantity = models.PositiveIntegerField()
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.ACTIVE)
+    expires_at = models.DateTimeField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["expires_at"],
+                name="orders_reservation_active_idx",
+                condition=models.Q(status="active"),
+            ),
+        ]
+        verbose_name = "Резерв товара"
+        verbose_name_plural = "Резервы товаров"
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"{self.product_id} x{self.quantity} -> {self.checkout_id}"
@@ -1,25 +1,30 @@
 from __future__ import annotations
 
-import base64
 import logging
 import uuid
+from typing import Optional
 
-import requests
 from django.conf import settings
 
-from .models import Checkout
+from ferrum_common.tracing import traced
+
+from .models import Checkout, Transaction
+from .yookassa import YooKassaError, get_client
 
 logger = logging.getLogger(__name__)
 
 
-def _auth_header() -> str:
-    token = f"{settings.YOOKASSA_SHOP_ID}:{settings.YOOKASSA_API_KEY}"
-    return base64.b64encode(token.encode()).decode()
+class PaymentError(Exception):
+    """Payment provider could not create the payment."""
 
 
-def create_payment(checkout: Checkout, return_url: str) -> dict:
+@traced()
+def create_payment(checkout: Checkout, return_url: str, idempotence_key: Optional[str] = None) -> dict:
     """
     Create YooKassa payment. Falls back to mock payload if credentials are missing.
+
+    Pass a stable ``idempotence_key`` to make repeated calls for the same
+    checkout return the same payment.
     """
     if not settings.YOOKASSA_SHOP_ID or not settings.YOOKASSA_API_KEY:
         logger.warning("YOOKASSA credentials not configured, returning mock payment payload.")
@@ -38,15 +43,31 @@ def create_payment(checkout: Checkout, return_url: str) -> dict:
         "description": f"Checkout #{checkout.id}",
         "metadata": {"checkout_id": checkout.id},
     }
-    headers = {
-        "Idempotence-Key": str(uuid.uuid4()),
-        "Authorization": f"Basic {_auth_header()}",
-        "Content-Type": "application/json",
-    }
-    response = requests.post("https://api.yookassa.ru/v3/payments", json=payload, headers=headers, timeout=30)
-    response.raise_for_status()
-    data = response.json()
+    try:
+        data = get_client().create_payment(payload, idempotence_key=idempotence_key or str(uuid.uuid4()))
+    except YooKassaError as exc:
+        raise PaymentError(str(exc)) from exc
     data["provider"] = "yookassa"
+    confirmation_url = (data.get("confirmation") or {}).get("confirmation_url")
+    if confirmation_url:
+        data.setdefault("confirmation_url", confirmation_url)
     return data
 
 
+@traced()
+def refund_payment(payment: Transaction, idempotence_key: str) -> dict:
+    """Refund the full amount of ``payment``; a stable ``idempotence_key`` makes retries return the same refund."""
+    checkout = payment.checkout
+    if not settings.YOOKASSA_SHOP_ID or not settings.YOOKASSA_API_KEY:
+        logger.warning("YOOKASSA credentials not configured, returning mock refund payload.")
+        return {"id": f"mock-refund-{payment.external_id}", "status": "succeeded"}
+
+    payload = {
+        "payment_id": payment.external_id,
+        "amount": {"value": str(checkout.total_amount), "currency": checkout.currency},
+        "description": f"Checkout #{checkout.id} was cancelled before the payment succeeded",
+    }
+    try:
+        return get_client().create_refund(payload, idempotence_key=idempotence_key)
+    except YooKassaError as exc:
+        raise PaymentError(str(exc)) from exc
@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import logging
+from collections import Counter
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from ferrum_common.metrics import get_redis_connection
+from goods.models import Product, ProductSize
+from goods.snapshots import schedule_stock_refresh
+
+from .models import Checkout, StockReservation
+
+logger = logging.getLogger(__name__)
+
+# (product_id, size_id or None) -> quantity
+StockKey = Tuple[int, Optional[int]]
+
+
+class OutOfStock(Exception):
+    """Some lines cannot be reserved; nothing was reserved."""
+
+    def __init__(self, keys: Sequence[StockKey]):
+        super().__init__(f"Insufficient stock for {list(keys)}")
+        self.keys = list(keys)
+
+
+def _aggregate(lines: Iterable[Tuple[int, Optional[int], int]]) -> Dict[StockKey, int]:
+    totals: Counter = Counter()
+    for product_id, size_id, quantity in lines:
+        totals[(product_id, size_id)] += quantity
+    return dict(totals)
+
+
+def _values(rows: List[tuple]) -> Tuple[str, list]:
+    placeholders = ", ".join("(" + ", ".join(["%s"] * len(rows[0])) + ")" for _ in rows)
+    return placeholders, [value for row in rows for value in row]
+
+
+def _apply_delta(totals: Dict[StockKey, int], sign: int) -> List[StockKey]:
+    """
+    Add ``sign * quantity`` to stock for every key in one statement per table.
+
+    Decrements are conditional (``stock >= quantity``), so each row is
+    checked and updated atomically under its own row lock, without a prior
+    ``SELECT ... FOR UPDATE``. Returns the keys that were updated.
+    """
+    updated: List[StockKey] = []
+    # Sorted rows keep the lock order stable between concurrent checkouts.
+    plain = sorted((product_id, quantity) for (product_id, size_id), quantity in totals.items() if size_id is None)
+    sized = sorted(
+        (product_id, size_id, quantity)
+        for (product_id, size_id), quantity in totals.items()
+        if size_id is not None
+    )
+    op = "-" if sign < 0 else "+"
+    guard = "AND t.stock >= req.qty" if sign < 0 else ""
+    with connection.cursor() as cursor:
+        if plain:
+            values, params = _values(plain)
+            cursor.execute(
+                f"WITH req(pid, qty) AS (VALUES {values}) "
+                f"UPDATE {connection.ops.quote_name(Product._meta.db_table)} AS t "
+                f"SET stock = t.stock {op} req.qty FROM req "
+                f"WHERE t.id = req.pid {guard} RETURNING id",
+                params,
+            )
+            updated.extend((row[0], None) for row in cursor.fetchall())
+        if sized:
+            values, params = _values(sized)
+            cursor.execute(
+                f"WITH req(pid, sid, qty) AS (VALUES {values}) "
+                f"UPDATE {connection.ops.quote_name(ProductSize._meta.db_table)} AS t "
+                f"SET stock = t.stock {op} req.qty FROM req "
+                f"WHERE t.product_id = req.pid AND t.size_id = req.sid {guard} "
+                f"RETURNING product_id, size_id",
+                params,
+            )
+            updated.extend((row[0], row[1]) for row in cursor.fetchall())
+    # Stock is part of the product detail document; it is re-rendered out of band.
+    schedule_stock_refresh(product_id for product_id, _size_id in updated)
+    return updated
+
+
+class StockGate:
+    """
+    Redis counters in front of the database for hot SKUs.
+
+    A Lua script checks and decrements the counters of all lines at once, so
+    buyers of a sold-out item are rejected without touching PostgreSQL. The
+    database stays the source of truth: a counter is seeded from it only when
+    the script reports it missing, and expires after ``ttl`` seconds, which
+    also bounds the drift left by transactions rolled back after the counters
+    were taken.
+    """
+
+    # Returns {'missing', i...} for counters that must be seeded first,
+    # {'short', i} for the first line without enough stock, {'ok'} otherwise.
+    SCRIPT = """
+    local missing = {'missing'}
+    for i, key in ipairs(KEYS) do
+        if redis.call('EXISTS', key) == 0 then
+            table.insert(missing, i)
+        end
+    end
+    if #missing > 1 then
+        return missing
+    end
+    for i, key in ipairs(KEYS) do
+        if tonumber(redis.call('GET', key)) < tonumber(ARGV[i]) then
+            return {'short', i}
+        end
+    end
+    for i, key in ipairs(KEYS) do
+        redis.call('DECRBY', key, ARGV[i])
+    end
+    return {'ok'}
+    """
+
+    def __init__(self, connection, ttl: int = 60, prefix: str = "catalog:stock"):
+        self.connection = connection
+        self.ttl = ttl
+        self.prefix = prefix
+        self._script = connection.register_script(self.SCRIPT)
+
+    def key(self, stock_key: StockKey) -> str:
+        product_id, size_id = stock_key
+        return f"{self.prefix}:{product_id}:{size_id or 0}"
+
+    def acquire(self, totals: Dict[StockKey, int]) -> Optional[StockKey]:
+        """
+        Take ``totals`` from the counters; returns the first short key, or ``None`` on success.
+
+        Live counters are decremented without a database query. Counters that
+        expired are seeded from the database and the script is run again;
+        if one keeps disappearing, the gate steps aside and lets the
+        database decide.
+        """
+        keys = sorted(totals, key=lambda stock_key: (stock_key[0], stock_key[1] or 0))
+        redis_keys = [self.key(stock_key) for stock_key in keys]
+        quantities = [totals[stock_key] for stock_key in keys]
+        for _attempt in range(2):
+            outcome, *indexes = self._script(keys=redis_keys, args=quantities)
+            outcome = outcome.decode() if isinstance(outcome, bytes) else outcome
+            if outcome == "ok":
+                return None
+            if outcome == "short":
+                return keys[int(indexes[0]) - 1]
+            self._seed([keys[int(index) - 1] for index in indexes])
+        return None
+
+    def _seed(self, keys: Sequence[StockKey]) -> None:
+        current = _current_stock(keys)
+        pipeline = self.connection.pipeline(transaction=False)
+        for stock_key in keys:
+            # NX: a counter seeded concurrently by another buyer is not reset.
+            pipeline.set(self.key(stock_key), current.get(stock_key, 0), nx=True, ex=self.ttl)
+        pipeline.execute()
+
+    def release(self, totals: Dict[StockKey, int]) -> None:
+        pipeline = self.connection.pipeline(transaction=False)
+        for stock_key, quantity in totals.items():
+            # Only top up live counters; missing ones are re-seeded from the database.
+            pipeline.eval(
+                "if redis.call('EXISTS', KEYS[1]) == 1 then return redis.call('INCRBY', KEYS[1], ARGV[1]) end",
+                1,
+                self.key(stock_key),
+                quantity,
+            )
+        pipeline.execute()
+
+
+def _current_stock(keys: Sequence[StockKey]) -> Dict[StockKey, int]:
+    product_ids = [product_id for product_id, size_id in keys if size_id is None]
+    sized = [key for key in keys if key[1] is not None]
+    current: Dict[StockKey, int] = {
+        (product_id, None): stock
+        for product_id, stock in Product.objects.filter(id__in=product_ids).values_list("id", "stock")
+    }
+    if sized:
+        rows = ProductSize.objects.filter(
+            product_id__in={product_id for product_id, _ in sized}, size_id__in={size_id for _, size_id in sized}
+        ).values_list("product_id", "size_id", "stock")
+        current.update({(product_id, size_id): stock for product_id, size_id, stock in rows})
+    return current
+
+
+def get_stock_gate() -> Optional[StockGate]:
+    if not getattr(settings, "STOCK_REDIS_GATE", False):
+        return None
+    try:
+        return StockGate(get_redis_connection("default"), ttl=getattr(settings, "STOCK_REDIS_GATE_TTL", 60))
+    except Exception as exc:  # pragma: no cover - network errors
+        logger.warning("Stock gate unavailable: %s", exc)
+        return None
+
+
+def reserve_stock(
+    checkout: Checkout, lines: Iterable[Tuple[int, Optional[int], int]], gate: Optional[StockGate] = None
+) -> List[StockReservation]:
+    """
+    Decrement stock for all ``(product_id, size_id, quantity)`` lines and record reservations.
+
+    Must run inside the transaction that creates ``checkout``: if any line is
+    short, ``OutOfStock`` is raised and the caller's rollback undoes the other
+    decrements. Lines with a size reserve ``ProductSize.stock``, the rest
+    ``Product.stock``.
+    """
+    totals = _aggregate(lines)
+    if not totals:
+        return []
+    gate = gate if gate is not None else get_stock_gate()
+    if gate is not None:
+        try:
+            short = gate.acquire(totals)
+        except Exception as exc:  # pragma: no cover - network errors
+            logger.warning("Stock gate failed, falling back to the database: %s", exc)
+            gate, short = None, None
+        if short is not None:
+            raise OutOfStock([short])
+
+    updated = set(_apply_delta(totals, sign=-1))
+    missing = [key for key in totals if key not in updated]
+    if missing:
+        if gate is not None:
+            gate.release(totals)
+        raise OutOfStock(missing)
+
+    expires_at = timezone.now() + timedelta(seconds=getattr(settings, "STOCK_RESERVATION_TTL", 900))
+    return StockReservation.objects.bulk_create(
+        [
+            StockReservation(
+                checkout=checkout,
+                product_id=product_id,
+                size_id=size_id,
+                quantity=quantity,
+                expires_at=expires_at,
+            )
+            for (product_id, size_id), quantity in totals.items()
+        ]
+    )
+
+
+def _finish(checkout_ids: Sequence[int], status: str, restock: bool) -> int:
+    with transaction.atomic():
+        reservations = list(
+            StockReservation.objects.select_for_update()
+            .filter(checkout_id__in=checkout_ids, status=StockReservation.Status.ACTIVE)
+            .order_by("id")
+        )
+        if not reservations:
+            return 0
+        totals = _aggregate((item.product_id, item.size_id, item.quantity) for item in reservations)
+        if restock:
+            _apply_delta(totals, sign=1)
+        StockReservation.objects.filter(id__in=[item.id for item in reservations]).update(status=status)
+    if restock:
+        gate = get_stock_gate()
+        if gate is not None:
+            try:
+                gate.release(totals)
+            except Exception as exc:  # pragma: no cover - network errors
+                logger.warning("Failed to release stock gate counters: %s", exc)
+    return len(reservations)
+
+
+def release_reservations(checkout: Checkout) -> int:
+    """Return the checkout's reserved stock; safe to call repeatedly."""
+    return _finish([checkout.pk], StockReservation.Status.RELEASED, restock=True)
+
+
+def commit_reservations(checkout: Checkout) -> int:
+    """Mark the reservations of a paid checkout as sold."""
+    return _finish([checkout.pk], StockReservation.Status.COMMITTED, restock=False)
+
+
+def expired_checkout_ids(limit: int = 500) -> List[int]:
+    return list(
+        StockReservation.objects.filter(status=StockReservation.Status.ACTIVE, expires_at__lte=timezone.now())
+        .order_by()
+        .values_list("checkout_id", flat=True)
+        .distinct()[:limit]
+    )
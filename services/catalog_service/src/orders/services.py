@@ -1,16 +1,26 @@
 from __future__ import annotations
 
 import logging
+from decimal import Decimal
+from typing import Optional
 
 from django.conf import settings
-from django_redis import get_redis_connection
+from django.db import transaction
 
-from .models import Checkout
+from ferrum_common.outbox.services import enqueue_event
+from ferrum_common.tracing import traced
+from goods.models import Product
+
+from .models import BasketItem, Checkout, Transaction
+from .payments import PaymentError, create_payment, refund_payment
+from .reservations import commit_reservations, expired_checkout_ids, release_reservations
 
 logger = logging.getLogger(__name__)
 
 
+@traced()
 def publish_checkout_event(checkout: Checkout) -> None:
+    """Record a checkout status event in the outbox; call inside the transaction changing the status."""
     stream = getattr(settings, "CHECKOUT_STREAM", None)
     if not stream:
         return
@@ -20,10 +30,184 @@ def publish_checkout_event(checkout: Checkout) -> None:
         "status": checkout.status,
         "total": str(checkout.total_amount),
     }
+    enqueue_event(stream, "checkout", checkout.pk, payload)
+
+
+def payment_idempotence_key(checkout: Checkout) -> str:
+    # Stable per checkout: retries and duplicate tasks hit the same YooKassa payment.
+    return f"checkout-{checkout.pk}"
+
+
+def restore_basket(checkout: Checkout) -> None:
+    """Put the lines of a checkout back into the user's basket; lines the user re-added meanwhile are kept."""
+    lines = checkout.items_snapshot or []
+    existing = set(Product.objects.filter(pk__in=[line["product_id"] for line in lines]).values_list("pk", flat=True))
+    BasketItem.objects.bulk_create(
+        [
+            BasketItem(
+                user_id=checkout.user_id,
+                product_id=line["product_id"],
+                count=line["count"],
+                price=Decimal(line["unit_price"]),
+                currency=checkout.currency,
+                variant_key=line.get("variant_key", ""),
+                variant_data=line.get("variant") or {},
+            )
+            for line in lines
+            if line["product_id"] in existing
+        ],
+        ignore_conflicts=True,
+    )
+
+
+@transaction.atomic
+def mark_checkout_failed(checkout: Checkout) -> None:
+    """Fail a checkout whose payment could not be created; its stock and basket lines are returned."""
+    checkout.status = Checkout.Status.FAILED
+    checkout.save(update_fields=["status", "updated_at"])
+    release_reservations(checkout)
+    restore_basket(checkout)
+    publish_checkout_event(checkout)
+
+
+def cancel_checkout(checkout: Checkout) -> bool:
+    """Cancel an unpaid checkout and return its reserved stock; ``False`` if it is already final."""
+    with transaction.atomic():
+        locked = Checkout.objects.select_for_update().get(pk=checkout.pk)
+        if locked.status not in (Checkout.Status.DRAFT, Checkout.Status.PENDING):
+            return False
+        locked.status = Checkout.Status.CANCELLED
+        locked.save(update_fields=["status", "updated_at"])
+        release_reservations(locked)
+        publish_checkout_event(locked)
+    checkout.status = locked.status
+    return True
+
+
+def expire_checkouts(limit: int = 500) -> int:
+    """Cancel unpaid checkouts whose stock reservations outlived ``STOCK_RESERVATION_TTL``."""
+    expired = 0
+    for checkout in Checkout.objects.filter(pk__in=expired_checkout_ids(limit)):
+        if cancel_checkout(checkout):
+            expired += 1
+        else:
+            # Final checkouts keep no active reservations: paid ones are sold, the rest go back.
+            with transaction.atomic():
+                if checkout.status == Checkout.Status.PAID:
+                    commit_reservations(checkout)
+                else:
+                    release_reservations(checkout)
+    return expired
+
+
+@transaction.atomic
+def record_payment(checkout: Checkout, payment_payload: dict) -> Transaction:
+    """Store the provider payment for ``checkout`` and move it to ``pending``; safe to repeat."""
+    payment, _created = Transaction.objects.get_or_create(
+        external_id=payment_payload["id"],
+        defaults={
+            "checkout": checkout,
+            "provider": payment_payload.get("provider", "yookassa"),
+            "status": Transaction.Status.INITIATED,
+            "payload": payment_payload,
+        },
+    )
+    if checkout.status == Checkout.Status.DRAFT:
+        checkout.status = Checkout.Status.PENDING
+        checkout.save(update_fields=["status", "updated_at"])
+        publish_checkout_event(checkout)
+    return payment
+
+
+def attach_payment(checkout: Checkout, return_url: str) -> Transaction:
+    """
+    Second phase of checkout: create the provider payment and record it.
+
+    Runs outside the transaction that wrote the checkout, so a slow provider
+    never holds a DB connection or row locks. On failure the checkout is
+    marked as failed and ``PaymentError`` is re-raised.
+    """
     try:
-        conn = get_redis_connection("default")
-        conn.xadd(stream, payload)
-    except Exception as exc:  # pragma: no cover
-        logger.warning("Failed to push checkout event: %s", exc)
+        payment_payload = create_payment(
+            checkout, return_url=return_url, idempotence_key=payment_idempotence_key(checkout)
+        )
+    except PaymentError:
+        mark_checkout_failed(checkout)
+        raise
+    return record_payment(checkout, payment_payload)
+
+
+# YooKassa payment status -> (Transaction.status, Checkout.status); None leaves the checkout as is.
+_NOTIFICATION_STATUSES = {
+    "pending": (Transaction.Status.INITIATED, None),
+    "waiting_for_capture": (Transaction.Status.INITIATED, None),
+    "succeeded": (Transaction.Status.SUCCEEDED, Checkout.Status.PAID),
+    "canceled": (Transaction.Status.FAILED, Checkout.Status.FAILED),
+}
+_FINAL_TRANSACTION_STATUSES = {Transaction.Status.SUCCEEDED, Transaction.Status.FAILED, Transaction.Status.REFUNDED}
+_FINAL_CHECKOUT_STATUSES = {Checkout.Status.PAID, Checkout.Status.FAILED, Checkout.Status.CANCELLED}
+
+
+def apply_payment_status(external_id: str, provider_status: str, payload: dict) -> Optional[Checkout]:
+    """
+    Apply a provider payment status to the transaction and its checkout.
+
+    Idempotent: rows are locked, repeated or out-of-order notifications for a
+    checkout that already reached a final status are ignored, and so are
+    statuses YooKassa does not document. A payment that succeeds after its
+    checkout was cancelled or failed is refunded (see ``refund_late_payment``).
+    Returns the checkout if its status changed.
+    """
+    if provider_status not in _NOTIFICATION_STATUSES:
+        logger.warning("Ignoring unknown YooKassa status %r for payment %s", provider_status, external_id)
+        return None
+    transaction_status, checkout_status = _NOTIFICATION_STATUSES[provider_status]
+    changed: Optional[Checkout] = None
+    with transaction.atomic():
+        payment = (
+            Transaction.objects.select_for_update()
+            .select_related("checkout")
+            .filter(external_id=external_id)
+            .first()
+        )
+        if payment is None:
+            logger.warning("Payment notification for unknown transaction %s", external_id)
+            return None
+        checkout = Checkout.objects.select_for_update().get(pk=payment.checkout_id)
+        if payment.status != transaction_status and payment.status not in _FINAL_TRANSACTION_STATUSES:
+            payment.status = transaction_status
+            payment.payload = {**payment.payload, "notification": payload}
+            payment.save(update_fields=["status", "payload"])
+        late = payment.status == Transaction.Status.SUCCEEDED and checkout.status in (
+            Checkout.Status.FAILED,
+            Checkout.Status.CANCELLED,
+        )
+        if checkout_status is not None and checkout.status not in _FINAL_CHECKOUT_STATUSES:
+            checkout.status = checkout_status
+            checkout.save(update_fields=["status", "updated_at"])
+            if checkout_status == Checkout.Status.PAID:
+                commit_reservations(checkout)
+            else:
+                release_reservations(checkout)
+            publish_checkout_event(checkout)
+            changed = checkout
+    if late:
+        refund_late_payment(payment)
+    return changed
+
 
+def refund_late_payment(payment: Transaction) -> None:
+    """
+    Refund a payment that succeeded after its checkout was cancelled or failed.
 
+    YooKassa cannot cancel a pending auto-capture payment, so a buyer may
+    still pay once the checkout expired and its stock went back on sale; the
+    money is returned rather than re-reserving stock that may be sold.
+    Raises ``PaymentError`` so the notification is redelivered; the refund
+    idempotence key keeps retries to a single refund.
+    """
+    refund = refund_payment(payment, idempotence_key=f"refund-{payment.external_id}")
+    payment.status = Transaction.Status.REFUNDED
+    payment.payload = {**payment.payload, "refund": refund}
+    payment.save(update_fields=["status", "payload"])
+    logger.info("Refunded payment %s of closed checkout %s", payment.external_id, payment.checkout_id)
@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+import logging
+
+from celery import shared_task
+
+from .models import Checkout
+from .payments import PaymentError, create_payment
+from .services import expire_checkouts, mark_checkout_failed, payment_idempotence_key, record_payment
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, acks_late=True, max_retries=5, default_retry_delay=5)
+def create_checkout_payment(self, checkout_id: int, return_url: str) -> None:
+    """
+    Create the YooKassa payment for a checkout accepted in async mode.
+
+    The idempotence key is derived from the checkout, so retries and duplicate
+    deliveries resolve to the same provider payment and the same ``Transaction``.
+    """
+    checkout = Checkout.objects.filter(pk=checkout_id).first()
+    if checkout is None or checkout.status != Checkout.Status.PENDING or checkout.transactions.exists():
+        return
+    try:
+        payment_payload = create_payment(
+            checkout, return_url=return_url, idempotence_key=payment_idempotence_key(checkout)
+        )
+    except PaymentError as exc:
+        if self.request.retries >= self.max_retries:
+            logger.warning("Giving up on payment for checkout %s: %s", checkout_id, exc)
+            mark_checkout_failed(checkout)
+            return
+        raise self.retry(exc=exc, countdown=self.default_retry_delay * 2**self.request.retries)
+    record_payment(checkout, payment_payload)
+
+
+@shared_task
+def expire_stale_checkouts(limit: int = 500) -> int:
+    """Periodic sweep returning stock held by abandoned checkouts."""
+    return expire_checkouts(limit=limit)
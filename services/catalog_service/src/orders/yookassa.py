@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from ferrum_common import tracing
+from ferrum_common.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+PROVIDER_LATENCY = Histogram(
+    "payment_provider_request_duration_seconds",
+    "Latency of payment provider calls including retries, by operation and outcome.",
+    ("provider", "operation", "outcome"),
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 40.0),
+)
+
+
+class YooKassaError(Exception):
+    """Request to YooKassa failed."""
+
+
+class CircuitOpenError(YooKassaError):
+    """YooKassa is considered degraded; the request was not sent."""
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    After ``failure_threshold`` failures in a row the circuit opens and calls
+    fail fast for ``reset_timeout`` seconds; then a single trial call is let
+    through and its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_flight or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.warning("YooKassa circuit opened after %s failures", self._failures)
+                self._opened_at = self._clock()
+            self._trial_in_flight = False
+
+
+class YooKassaClient:
+    """
+    Thin YooKassa API client on top of a pooled keep-alive ``requests.Session``.
+
+    Connection errors, read timeouts and 429/5xx responses are retried by
+    urllib3 with backoff. Retries resend the very same request, so the
+    ``Idempotence-Key`` header is reused and YooKassa never creates a second
+    payment. Each logical call (after retries) feeds the circuit breaker.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        shop_id: str,
+        api_key: str,
+        *,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 15.0,
+        max_retries: int = 2,
+        backoff_factor: float = 0.3,
+        pool_size: int = 10,
+        breaker: Optional[CircuitBreaker] = None,
+    ):
+        self.base_url = base_url.rstrip("/") + "/"
+        self.timeout = (connect_timeout, read_timeout)
+        self.breaker = breaker or CircuitBreaker()
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"GET", "POST"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        self.session = requests.Session()
+        self.session.auth = (shop_id, api_key)
+        self.session.headers.update({"Content-Type": "application/json"})
+        self.session.mount(self.base_url, HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry))
+
+    def create_payment(self, payload: dict, idempotence_key: str) -> dict:
+        return self._timed(
+            "create_payment", "POST", "payments", json=payload, headers={"Idempotence-Key": idempotence_key}
+        )
+
+    def get_payment(self, payment_id: str) -> dict:
+        return self._timed("get_payment", "GET", f"payments/{payment_id}")
+
+    def create_refund(self, payload: dict, idempotence_key: str) -> dict:
+        return self._timed(
+            "create_refund", "POST", "refunds", json=payload, headers={"Idempotence-Key": idempotence_key}
+        )
+
+    def close(self) -> None:
+        self.session.close()
+
+    def _timed(self, operation: str, method: str, path: str, **kwargs) -> dict:
+        started = time.perf_counter()
+        outcome = "error"
+        attributes = {"http.request.method": method, "url.full": self.base_url + path, "peer.service": "yookassa"}
+        with tracing.span(f"yookassa {operation}", kind=tracing.SpanKind.CLIENT, attributes=attributes) as span:
+            try:
+                data = self._request(method, path, **kwargs)
+                outcome = "ok"
+                return data
+            except CircuitOpenError:
+                outcome = "circuit_open"
+                raise
+            finally:
+                span.set_attribute("yookassa.outcome", outcome)
+                PROVIDER_LATENCY.observe(time.perf_counter() - started, "yookassa", operation, outcome)
+
+    def _request(self, method: str, path: str, **kwargs) -> dict:
+        if not self.breaker.allow():
+            raise CircuitOpenError("YooKassa is unavailable, circuit is open.")
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+        except requests.RequestException as exc:
+            self.breaker.record_failure()
+            raise YooKassaError(str(exc)) from exc
+        tracing.current_span().set_attribute("http.response.status_code", response.status_code)
+
+        if response.status_code in RETRY_STATUSES:
+            self.breaker.record_failure()
+            raise YooKassaError(f"YooKassa responded with {response.status_code}")
+        # 4xx means the provider is healthy but rejected the request.
+        self.breaker.record_success()
+        if response.status_code >= 400:
+            raise YooKassaError(f"YooKassa rejected the request ({response.status_code}): {response.text[:500]}")
+        try:
+            return response.json()
+        except ValueError as exc:
+            raise YooKassaError("YooKassa returned malformed JSON") from exc
+
+
+_client: Optional[YooKassaClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> YooKassaClient:
+    """Return the process-wide client, built from settings on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = YooKassaClient(
+                    settings.YOOKASSA_API_URL,
+                    settings.YOOKASSA_SHOP_ID,
+                    settings.YOOKASSA_API_KEY,
+                    connect_timeout=settings.YOOKASSA_CONNECT_TIMEOUT,
+                    read_timeout=settings.YOOKASSA_READ_TIMEOUT,
+                    max_retries=settings.YOOKASSA_MAX_RETRIES,
+                    pool_size=settings.YOOKASSA_POOL_SIZE,
+                    breaker=CircuitBreaker(
+                        failure_threshold=settings.YOOKASSA_BREAKER_THRESHOLD,
+                        reset_timeout=settings.YOOKASSA_BREAKER_RESET_TIMEOUT,
+                    ),
+                )
+    return _client
+
+
+def reset_client() -> None:
+    """Drop the shared client so the next call picks up changed settings."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = None
@@ -1,3 +1,5 @@
+import io
+
 import pytest
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
@@ -70,6 +72,284 @@ def test_product_creation_and_public_listing():
     client.force_authenticate(user=None)
     list_resp = client.get("/api/v1/goods/?is_published=true")
     assert list_resp.status_code == 200
-    assert list_resp.data[0]["slug"] == "tee-ferrum"
+    assert list_resp.data["results"][0]["slug"] == "tee-ferrum"
+
+
+@pytest.fixture
+def locmem_cache(settings):
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_category_tree_is_cached_and_supports_etag(locmem_cache, django_assert_num_queries):
+    root = Category.objects.create(name="Одежда", slug="clothes")
+    Category.objects.create(name="Футболки", slug="tshirts", parent=root, position=2)
+    Category.objects.create(name="Худи", slug="hoodies", parent=root, position=1)
+
+    client = APIClient()
+    first = client.get("/api/v1/categories/?tree=true")
+    assert first.status_code == 200
+    assert [child["slug"] for child in first.data[0]["children"]] == ["hoodies", "tshirts"]
+    assert first.data[0]["children"][0]["children"] == []
+
+    with django_assert_num_queries(0):
+        cached = client.get("/api/v1/categories/?tree=true")
+    assert cached.data == first.data
+
+    not_modified = client.get("/api/v1/categories/?tree=true", HTTP_IF_NONE_MATCH=first["ETag"])
+    assert not_modified.status_code == 304
+
+    Category.objects.create(name="Обувь", slug="shoes", position=5)
+    refreshed = client.get("/api/v1/categories/?tree=true", HTTP_IF_NONE_MATCH=first["ETag"])
+    assert refreshed.status_code == 200
+    assert [node["slug"] for node in refreshed.data] == ["clothes", "shoes"]
+
+
+@pytest.mark.django_db
+def test_product_listing_uses_keyset_pagination():
+    category = Category.objects.create(name="Одежда", slug="clothes")
+    brand = Brand.objects.create(name="Ferrum", slug="ferrum")
+    for index, price in enumerate(["500.00", "300.00", "300.00", "100.00", "900.00"]):
+        Product.objects.create(
+            name=f"Товар {index}", slug=f"item-{index}", category=category, brand=brand, sku=f"SKU{index}", price=price
+        )
+
+    client = APIClient()
+    seen, url = [], "/api/v1/goods/?ordering=price&page_size=2"
+    while url:
+        page = client.get(url)
+        assert page.status_code == 200
+        assert len(page.data["results"]) <= 2
+        seen.extend(item["slug"] for item in page.data["results"])
+        url = page.data["next"]
+    assert seen == ["item-3", "item-1", "item-2", "item-0", "item-4"]
+
+    first = client.get("/api/v1/goods/?page_size=2")
+    assert first.data["previous"] is None
+    assert [item["slug"] for item in first.data["results"]] == ["item-4", "item-3"]
+    second = client.get(first.data["next"])
+    assert [item["slug"] for item in second.data["results"]] == ["item-2", "item-1"]
+    back = client.get(second.data["previous"])
+    assert [item["slug"] for item in back.data["results"]] == ["item-4", "item-3"]
+    assert back.data["previous"] is None
+
+    assert client.get("/api/v1/goods/?cursor=garbage").status_code == 404
+
+
+@pytest.mark.django_db
+def test_product_search_prefers_exact_sku_and_falls_back_on_sqlite():
+    category = Category.objects.create(name="Одежда", slug="clothes")
+    brand = Brand.objects.create(name="Ferrum", slug="ferrum")
+    Product.objects.create(name="Футболка", slug="tee", category=category, brand=brand, sku="TEE-1", price="990.00")
+    Product.objects.create(name="Худи TEE-1", slug="hoodie", category=category, brand=brand, sku="HD-1", price="1990.00")
+
+    client = APIClient()
+    by_sku = client.get("/api/v1/goods/?search=TEE-1")
+    assert [item["slug"] for item in by_sku.data["results"]] == ["tee"]
+
+    fallback = client.get("/api/v1/goods/?search=hoodie")
+    assert [item["slug"] for item in fallback.data["results"]] == ["hoodie"]
+
+
+@pytest.mark.django_db
+def test_product_listing_returns_facets_and_filters_category_subtree():
+    clothes = Category.objects.create(name="Одежда", slug="clothes")
+    tees = Category.objects.create(name="Футболки", slug="tshirts", parent=clothes)
+    shoes = Category.objects.create(name="Обувь", slug="shoes")
+    ferrum = Brand.objects.create(name="Ferrum", slug="ferrum")
+    other = Brand.objects.create(name="Other", slug="other")
+    size_m = Size.objects.create(name="M", code="M")
+    tee = Product.objects.create(name="Футболка", slug="tee", category=tees, brand=ferrum, sku="S1", price="900.00")
+    Product.objects.create(name="Рубашка", slug="shirt", category=clothes, brand=other, sku="S2", price="3500.00")
+    Product.objects.create(name="Кеды", slug="sneakers", category=shoes, brand=ferrum, sku="S3", price="12000.00")
+    tee.productsize_set.create(size=size_m, stock=3)
+
+    client = APIClient()
+    response = client.get(f"/api/v1/goods/?category_tree={clothes.id}&facets=true")
+    assert response.status_code == 200
+    assert {item["slug"] for item in response.data["results"]} == {"tee", "shirt"}
+
+    facets = response.data["facets"]
+    assert {row["name"]: row["count"] for row in facets["brand"]} == {"Ferrum": 1, "Other": 1}
+    assert {row["name"]: row["count"] for row in facets["category"]} == {"Футболки": 1, "Одежда": 1}
+    assert facets["size"] == [{"id": size_m.id, "name": "M", "code": "M", "count": 1}]
+    assert [bucket["count"] for bucket in facets["price"]] == [1, 0, 1, 0, 0]
+
+    by_size = client.get(f"/api/v1/goods/?size={size_m.id}")
+    assert [item["slug"] for item in by_size.data["results"]] == ["tee"]
+
+
+@pytest.mark.django_db
+def test_admin_bulk_import_upserts_products_and_reports_errors():
+    from django.core.files.uploadedfile import SimpleUploadedFile
+
+    User = get_user_model()
+    admin = User.objects.create_superuser(username="admin", email="admin@example.com", password="pass1234")
+    client = APIClient()
+    client.force_authenticate(user=admin)
 
+    category = Category.objects.create(name="Одежда", slug="clothes")
+    brand = Brand.objects.create(name="Ferrum", slug="ferrum")
+    size = Size.objects.create(name="M", code="M")
+    Product.objects.create(name="Старое имя", slug="tee", category=category, brand=brand, sku="SKU1", price="100.00")
+
+    feed = "\n".join(
+        [
+            '{"sku": "SKU1", "name": "Футболка", "slug": "tee", "category": "clothes", "brand": "ferrum",'
+            ' "price": "990.00", "is_published": true, "sizes": [{"size": "M", "stock": 7}],'
+            ' "images": [{"image": "products/tee.jpg", "alt_text": "Футболка"}]}',
+            '{"sku": "SKU2", "name": "Худи", "category": "clothes", "brand": "ferrum", "price": "2990.00"}',
+            '{"sku": "SKU3", "name": "Кеды", "category": "missing", "brand": "ferrum", "price": "-1"}',
+            "not json",
+        ]
+    )
+    upload = SimpleUploadedFile("feed.jsonl", feed.encode(), content_type="application/x-ndjson")
+    resp = client.post("/api/v1/goods/import/", {"file": upload}, format="multipart")
+
+    assert resp.status_code == 200
+    assert resp.data["processed"] == 4
+    assert resp.data["upserted"] == 2
+    assert resp.data["failed"] == 2
+    assert set(resp.data["errors"][0]["errors"]) == {"category", "price"}
+    assert resp.data["errors"][1]["line"] == 4
+
+    tee = Product.objects.get(sku="SKU1")
+    assert tee.name == "Футболка"
+    assert tee.productsize_set.get(size=size).stock == 7
+    assert tee.images.get().image.name == "products/tee.jpg"
+    assert Product.objects.filter(sku="SKU2").exists()
+
+    export = client.get("/api/v1/goods/export/?file_format=csv")
+    assert export.status_code == 200
+    lines = b"".join(export.streaming_content).decode().splitlines()
+    assert lines[0].startswith("sku,name,slug")
+    assert any(line.startswith("SKU1,Футболка,tee") and "M:7:0.00" in line for line in lines[1:])
+
+
+@pytest.mark.django_db
+def test_bulk_import_validates_sizes_and_round_trips_shared_codes():
+    from goods.bulk import ProductImporter, export_products, iter_records
+
+    category = Category.objects.create(name="Одежда", slug="clothes")
+    Brand.objects.create(name="Ferrum", slug="ferrum")
+    clothes = Size.objects.create(name="M", code="M", size_type=Size.SizeType.CLOTHES)
+    shoes = Size.objects.create(name="M", code="M", size_type=Size.SizeType.SHOES)
+    base = '"category": "clothes", "brand": "ferrum", "price": "990.00"'
+    feed = "\n".join(
+        [
+            f'{{"sku": "SKU1", "name": "Футболка", {base}, "sizes": ['
+            '{"size": "M", "size_type": "clothes", "stock": 3}, {"size": "M", "size_type": "shoes", "stock": 5}]}',
+            f'{{"sku": "SKU2", "name": "Худи", {base}, "sizes": [{{"size": "M", "stock": 1}}]}}',
+            f'{{"sku": "SKU3", "name": "Кеды", {base}, "sizes": [{{"size": "M", "size_type": "shoes", "stock": -2}}]}}',
+        ]
+    )
+
+    report = ProductImporter().run(iter_records(io.StringIO(feed), "jsonl"))
+
+    assert (report.upserted, report.failed) == (1, 2)
+    assert "size_type" in report.errors[0]["errors"]["sizes"]
+    assert "неотрицательным" in report.errors[1]["errors"]["sizes"]
+    product = Product.objects.get(sku="SKU1")
+    expected = {(clothes.id, 3), (shoes.id, 5)}
+    assert {(item.size_id, item.stock) for item in product.productsize_set.all()} == expected
+
+    # Both sizes survive an export/import round trip in either format.
+    for fmt in ("csv", "jsonl"):
+        exported = "".join(export_products(Product.objects.all(), fmt))
+        product.productsize_set.all().delete()
+        assert ProductImporter().run(iter_records(io.StringIO(exported), fmt)).failed == 0
+        assert {(item.size_id, item.stock) for item in product.productsize_set.all()} == expected
+
+
+@pytest.mark.django_db(transaction=True)
+def test_product_detail_is_served_from_snapshot(locmem_cache, django_assert_num_queries):
+    from goods.models import ProductSnapshot
+
+    category = Category.objects.create(name="Одежда", slug="clothes")
+    brand = Brand.objects.create(name="Ferrum", slug="ferrum")
+    product = Product.objects.create(
+        name="Футболка", slug="tee", sku="SKU1", category=category, brand=brand, price="1990.00", stock=3
+    )
+
+    client = APIClient()
+    with django_assert_num_queries(0):
+        first = client.get(f"/api/v1/goods/{product.id}/")
+    assert first.status_code == 200
+    assert first["Content-Type"] == "application/json"
+    assert first.json()["brand"]["name"] == "Ferrum"
+    assert ProductSnapshot.objects.filter(pk=product.pk).exists()
+
+    assert client.get(f"/api/v1/goods/{product.id}/", HTTP_IF_NONE_MATCH=first["ETag"]).status_code == 304
+
+    brand.name = "Ferrum Lab"
+    brand.save()
+    refreshed = client.get(f"/api/v1/goods/{product.id}/")
+    assert refreshed.json()["brand"]["name"] == "Ferrum Lab"
+    assert refreshed["ETag"] != first["ETag"]
+
+    product.delete()
+    assert client.get(f"/api/v1/goods/{product.id}/").status_code == 404
+
+
+@pytest.mark.django_db(transaction=True)
+def test_product_snapshot_media_urls_match_the_list_endpoint(locmem_cache):
+    from goods.models import ProductImage, ProductSnapshot
+
+    category = Category.objects.create(name="Одежда", slug="clothes")
+    brand = Brand.objects.create(name="Ferrum", slug="ferrum", logo="brands/ferrum.png")
+    product = Product.objects.create(
+        name="Футболка",
+        slug="tee",
+        sku="SKU1",
+        description='"image":"/media/ is not a URL',
+        category=category,
+        brand=brand,
+        price="1990.00",
+        is_published=True,
+    )
+    ProductImage.objects.create(product=product, image="products/tee.png")
+
+    client = APIClient()
+    detail = client.get(f"/api/v1/goods/{product.id}/").json()
+    listed = client.get("/api/v1/goods/").json()["results"][0]
+    assert detail["images"][0]["image"] == listed["images"][0]["image"] == "http://testserver/media/products/tee.png"
+    assert detail["brand"]["logo"] == listed["brand"]["logo"] == "http://testserver/media/brands/ferrum.png"
+    assert detail["description"] == '"image":"/media/ is not a URL'
+    # The stored document stays host-independent.
+    assert b'"image":"/media/products/tee.png"' in bytes(ProductSnapshot.objects.get(pk=product.pk).body)
+
+
+@pytest.mark.django_db
+def test_compiled_serializer_output_is_byte_identical_to_drf():
+    from rest_framework.renderers import JSONRenderer
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from api.goods import BrandSerializer, ProductSerializer
+    from common.fast_serializers import compile_serializer
+    from ferrum_common.renderers import dumps
+    from goods.models import ProductImage, ProductSize
+
+    category = Category.objects.create(name="Одежда", slug="clothes")
+    brand = Brand.objects.create(name="Ferrum", slug="ferrum", logo="brands/ferrum.png")
+    Brand.objects.create(name="Без логотипа", slug="plain")
+    size = Size.objects.create(name="M", code="M", measurements={"chest": 96.5})
+    product = Product.objects.create(
+        name="Футболка «Ferrum»",
+        slug="tee",
+        sku="SKU1",
+        category=category,
+        brand=brand,
+        price="1990.5",
+        attributes={"состав": "хлопок 100%", "вес": 0.25},
+    )
+    Product.objects.create(name="Худи", slug="hoodie", sku="SKU2", category=category, brand=brand, price="10")
+    ProductImage.objects.create(product=product, image="products/b.png", position=2)
+    ProductImage.objects.create(product=product, image="products/a.png", position=1, alt_text="Спереди")
+    ProductSize.objects.create(product=product, size=size, price_modifier="150", stock=4)
 
+    context = {"request": Request(APIRequestFactory().get("/api/v1/goods/"))}
+    for serializer_class, queryset in ((ProductSerializer, Product.objects.all()), (BrandSerializer, Brand.objects.all())):
+        expected = JSONRenderer().render(serializer_class(queryset, many=True, context=context).data)
+        compiled = compile_serializer(serializer_class)
+        assert dumps(compiled.serialize(compiled.project(queryset), context)) == expected
@@ -0,0 +1,62 @@
+import threading
+
+import fakeredis
+import pytest
+from rest_framework.test import APIClient
+
+from ferrum_common import metrics
+
+
+@pytest.fixture(autouse=True)
+def clean_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+@pytest.mark.django_db
+def test_requests_are_measured_by_route_and_exposed():
+    client = APIClient()
+
+    assert client.get("/api/v1/categories/").status_code == 200
+
+    assert metrics.sample("http_request_duration_seconds", "GET", "category-list", "200") == 1
+    assert metrics.sample("http_request_db_queries", "GET", "category-list") == 1
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    body = response.content.decode()
+    assert 'http_request_duration_seconds_count{method="GET",route="category-list",status="200"} 1.0' in body
+    assert "http_request_db_duration_seconds_bucket" in body
+    # the scrape itself is not recorded
+    assert 'route="metrics"' not in body
+
+
+def test_redis_commands_and_pipelines_are_timed():
+    redis = metrics.instrument_redis(fakeredis.FakeRedis())
+    assert metrics.instrument_redis(redis) is redis
+
+    redis.set("key", "value")
+    with redis.pipeline(transaction=False) as pipeline:
+        pipeline.get("key")
+        pipeline.xadd("stream", {"a": 1})
+        assert pipeline.execute()[0] == b"value"
+
+    assert metrics.sample("redis_command_duration_seconds", "SET") == 1
+    assert metrics.sample("redis_command_duration_seconds", "PIPELINE") == 1
+    assert metrics.sample("redis_command_duration_seconds", "XADD") is None
+
+
+def test_samples_of_finished_threads_are_kept():
+    counter = metrics.Counter("test_thread_events_total", "Events counted by worker threads.", ("worker",))
+    try:
+        workers = [threading.Thread(target=lambda: counter.inc("pool", amount=2)) for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        counter.inc("pool")
+
+        assert metrics.sample("test_thread_events_total", "pool") == 9
+        assert metrics.sample("test_thread_events_total", "pool") == 9
+    finally:
+        del metrics._metrics["test_thread_events_total"]
@@ -3,8 +3,32 @@ from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 
 from catalog.models import Category
+from catalog_service.celery import app
 from goods.models import Brand, Product
-from orders.models import BasketItem, DeliveryMethod, PaymentMethod
+from api import orders as orders_api
+from orders import payments, services
+from orders.models import BasketItem, Checkout, CheckoutItem, DeliveryMethod, PaymentMethod
+from orders.payments import PaymentError
+
+
+def fake_provider(settings, monkeypatch, statuses):
+    """Configure YooKassa credentials and answer payment lookups from ``statuses`` (id -> status)."""
+    settings.YOOKASSA_SHOP_ID = "shop"
+    settings.YOOKASSA_API_KEY = "secret"
+
+    refunds = []
+
+    class FakeClient:
+        def get_payment(self, payment_id):
+            return {"id": payment_id, "status": statuses[payment_id]}
+
+        def create_refund(self, payload, idempotence_key):
+            refunds.append((payload["payment_id"], idempotence_key))
+            return {"id": f"refund-{len(refunds)}", "status": "succeeded"}
+
+    monkeypatch.setattr(orders_api, "get_client", FakeClient)
+    monkeypatch.setattr(payments, "get_client", FakeClient)
+    return refunds
 
 
 @pytest.mark.django_db
@@ -55,3 +79,187 @@ def test_user_checkout_flow_creates_transaction(monkeypatch):
     assert data["items"][0]["sku"] == "SKU1"
 
 
+@pytest.mark.django_db
+def test_checkout_marks_failed_when_payment_provider_is_down(monkeypatch):
+    def fail_payment(checkout, return_url, idempotence_key=None):
+        raise PaymentError("connection refused")
+
+    monkeypatch.setattr(services, "create_payment", fail_payment)
+
+    client = APIClient()
+    User = get_user_model()
+    user = User.objects.create_user(username="buyer", email="buyer@example.com", password="pass1234")
+    client.force_authenticate(user=user)
+
+    category = Category.objects.create(name="Обувь", slug="shoes")
+    brand = Brand.objects.create(name="Ferrum", slug="ferrum")
+    products = [
+        Product.objects.create(
+            name=f"Кеды {index}",
+            slug=f"sneakers-{index}",
+            category=category,
+            brand=brand,
+            sku=f"SNK{index}",
+            price="1990.00",
+            stock=10,
+        )
+        for index in range(3)
+    ]
+    basket_ids = [
+        BasketItem.objects.create(user_id=user.id, product=product, count=1, price=product.price).id
+        for product in products
+    ]
+    payment = PaymentMethod.objects.create(name="YooKassa", code="yookassa")
+    delivery = DeliveryMethod.objects.create(name="CDEK", code="cdek", base_price="250.00")
+
+    response = client.post(
+        "/api/v1/checkouts/",
+        {"payment_method": payment.id, "delivery_method": delivery.id, "basket_item_ids": basket_ids},
+        format="json",
+    )
+    assert response.status_code == 502
+
+    checkout = Checkout.objects.get(user_id=user.id)
+    assert checkout.status == Checkout.Status.FAILED
+    assert CheckoutItem.objects.filter(checkout=checkout).count() == 3
+    assert not checkout.transactions.exists()
+    restored = BasketItem.objects.filter(user_id=user.id)
+    assert sorted(restored.values_list("product_id", "count")) == [(product.id, 1) for product in products]
+
+
+@pytest.mark.django_db
+def test_async_checkout_creates_payment_in_task_and_webhook_is_idempotent(
+    settings, monkeypatch, django_capture_on_commit_callbacks
+):
+    settings.CHECKOUT_PAYMENT_MODE = "async"
+    monkeypatch.setitem(app.conf, "CELERY_TASK_ALWAYS_EAGER", True)
+
+    client = APIClient()
+    User = get_user_model()
+    user = User.objects.create_user(username="async", email="async@example.com", password="pass1234")
+    client.force_authenticate(user=user)
+    category = Category.objects.create(name="Одежда", slug="clothes")
+    brand = Brand.objects.create(name="Ferrum", slug="ferrum")
+    product = Product.objects.create(
+        name="Худи", slug="hoodie", category=category, brand=brand, sku="HOOD1", price="3990.00", stock=5
+    )
+    basket = BasketItem.objects.create(user_id=user.id, product=product, count=1, price=product.price)
+    payment = PaymentMethod.objects.create(name="YooKassa", code="yookassa")
+    delivery = DeliveryMethod.objects.create(name="CDEK", code="cdek", base_price="250.00")
+
+    with django_capture_on_commit_callbacks(execute=True):
+        response = client.post(
+            "/api/v1/checkouts/",
+            {"payment_method": payment.id, "delivery_method": delivery.id, "basket_item_ids": [basket.id]},
+            format="json",
+        )
+    assert response.status_code == 201
+    assert response.data["status"] == Checkout.Status.PENDING
+    assert response.data["payment_confirmation"] is None
+
+    polled = client.get(f"/api/v1/checkouts/{response.data['id']}/")
+    assert polled.data["payment_confirmation"]["provider"] == "yookassa"
+    external_id = polled.data["transactions"][0]["external_id"]
+    fake_provider(settings, monkeypatch, {external_id: "succeeded"})
+
+    notification = {
+        "type": "notification",
+        "event": "payment.succeeded",
+        "object": {"id": external_id, "status": "succeeded"},
+    }
+    anonymous = APIClient()
+    for _ in range(2):
+        hook = anonymous.post("/api/v1/payments/yookassa/webhook/", notification, format="json")
+        assert hook.status_code == 200
+    late = {"event": "payment.canceled", "object": {"id": external_id, "status": "canceled"}}
+    assert anonymous.post("/api/v1/payments/yookassa/webhook/", late, format="json").status_code == 200
+
+    checkout = Checkout.objects.get(pk=response.data["id"])
+    assert checkout.status == Checkout.Status.PAID
+    assert checkout.transactions.get().status == "succeeded"
+
+
+@pytest.mark.django_db
+def test_webhook_never_trusts_the_notification_body(settings, monkeypatch):
+    user = get_user_model().objects.create_user(username="buyer", email="buyer@example.com", password="pass1234")
+    checkout = Checkout.objects.create(
+        user_id=user.id,
+        status=Checkout.Status.PENDING,
+        payment_method=PaymentMethod.objects.create(name="YooKassa", code="yookassa"),
+        delivery_method=DeliveryMethod.objects.create(name="CDEK", code="cdek"),
+        total_amount="100.00",
+    )
+    checkout.transactions.create(external_id="pay-1")
+    url = "/api/v1/payments/yookassa/webhook/"
+    forged = {"event": "payment.succeeded", "object": {"id": "pay-1", "status": "succeeded"}}
+    anonymous = APIClient()
+
+    assert anonymous.post(url, forged, format="json").status_code == 403
+    fake_provider(settings, monkeypatch, {"pay-1": "pending"})
+    assert anonymous.post(url, {"object": {"id": "pay-1"}}, format="json").status_code == 400
+    assert anonymous.post(url, forged, format="json").status_code == 200
+    checkout.refresh_from_db()
+    assert checkout.status == Checkout.Status.PENDING
+    assert checkout.transactions.get().status == "initiated"
+
+    fake_provider(settings, monkeypatch, {"pay-1": "refunded_somehow"})
+    assert anonymous.post(url, forged, format="json").status_code == 200
+    assert checkout.transactions.get().status == "initiated"
+
+
+@pytest.mark.django_db
+def test_payment_succeeding_after_cancel_is_refunded(settings, monkeypatch):
+    user = get_user_model().objects.create_user(username="buyer", email="buyer@example.com", password="pass1234")
+    checkout = Checkout.objects.create(
+        user_id=user.id,
+        status=Checkout.Status.CANCELLED,
+        payment_method=PaymentMethod.objects.create(name="YooKassa", code="yookassa"),
+        delivery_method=DeliveryMethod.objects.create(name="CDEK", code="cdek"),
+        total_amount="100.00",
+    )
+    checkout.transactions.create(external_id="pay-1")
+    refunds = fake_provider(settings, monkeypatch, {"pay-1": "succeeded"})
+    notification = {"event": "payment.succeeded", "object": {"id": "pay-1", "status": "succeeded"}}
+
+    for _ in range(2):
+        assert APIClient().post("/api/v1/payments/yookassa/webhook/", notification, format="json").status_code == 200
+
+    checkout.refresh_from_db()
+    assert checkout.status == Checkout.Status.CANCELLED
+    assert checkout.transactions.get().status == "refunded"
+    assert refunds == [("pay-1", "refund-pay-1")]
+
+
+@pytest.mark.django_db
+def test_webhook_rejects_unknown_source(settings):
+    settings.YOOKASSA_WEBHOOK_ALLOWED_IPS = ["185.71.76.0/27"]
+    response = APIClient().post(
+        "/api/v1/payments/yookassa/webhook/", {"object": {"id": "x", "status": "succeeded"}}, format="json"
+    )
+    assert response.status_code == 403
+
+
+@pytest.mark.django_db
+def test_checkout_list_fits_query_budget_without_n_plus_one(query_budget):
+    from orders.models import Transaction
+
+    user = get_user_model().objects.create_user(username="buyer", email="buyer@example.com", password="pass1234")
+    payment = PaymentMethod.objects.create(name="YooKassa", code="yookassa")
+    delivery = DeliveryMethod.objects.create(name="CDEK", code="cdek")
+    for index in range(4):
+        checkout = Checkout.objects.create(
+            user_id=user.id, payment_method=payment, delivery_method=delivery, total_amount="100.00"
+        )
+        Transaction.objects.create(
+            checkout=checkout, external_id=f"pay-{index}", payload={"confirmation_url": f"https://pay/{index}"}
+        )
+    client = APIClient()
+    client.force_authenticate(user=user)
+
+    with query_budget(4):
+        response = client.get("/api/v1/checkouts/")
+
+    assert response.status_code == 200
+    assert [item["payment_confirmation"]["confirmation_url"] for item in response.data] == [
+        f"https://pay/{index}" for index in reversed(range(4))
+    ]
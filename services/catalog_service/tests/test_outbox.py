@@ -0,0 +1,98 @@
+import fakeredis
+import pytest
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+from catalog.models import Category
+from ferrum_common.outbox.models import OutboxEvent
+from ferrum_common.outbox.relay import outbox_stats, relay_batch
+from ferrum_common.outbox.services import enqueue_event
+from goods.models import Brand, Product
+
+
+@pytest.mark.django_db
+def test_product_event_goes_through_outbox(settings, django_capture_on_commit_callbacks):
+    settings.PRODUCT_STREAM = "catalog:product"
+    admin = get_user_model().objects.create_superuser(username="admin", email="admin@example.com", password="pass")
+    client = APIClient()
+    client.force_authenticate(user=admin)
+    category = Category.objects.create(name="Одежда", slug="clothes")
+    brand = Brand.objects.create(name="Ferrum", slug="ferrum")
+
+    response = client.post(
+        "/api/v1/goods/",
+        {
+            "name": "Футболка",
+            "slug": "tee",
+            "category": category.id,
+            "brand_id": brand.id,
+            "sku": "TEE-1",
+            "price": "990.00",
+            "is_published": True,
+        },
+        format="json",
+    )
+    assert response.status_code == 201
+    event = OutboxEvent.objects.get()
+    assert event.status == OutboxEvent.Status.PENDING
+    assert event.payload["sku"] == "TEE-1"
+
+    redis = fakeredis.FakeRedis()
+    with django_capture_on_commit_callbacks(execute=True):
+        result = relay_batch(connection=redis)
+    assert result.published == 1
+
+    event.refresh_from_db()
+    assert event.status == OutboxEvent.Status.PUBLISHED
+    [(stream_id, fields)] = redis.xrange("catalog:product")
+    assert stream_id.decode() == event.stream_id
+    assert fields[b"sku"] == b"TEE-1"
+    assert Product.objects.get(sku="TEE-1").meta["last_stream_id"] == event.stream_id
+
+
+@pytest.mark.django_db
+def test_unpublish_and_delete_emit_product_events(settings):
+    settings.PRODUCT_STREAM = "catalog:product"
+    admin = get_user_model().objects.create_superuser(username="admin", email="admin@example.com", password="pass")
+    client = APIClient()
+    client.force_authenticate(user=admin)
+    product = Product.objects.create(
+        name="Футболка",
+        slug="tee",
+        category=Category.objects.create(name="Одежда", slug="clothes"),
+        brand=Brand.objects.create(name="Ferrum", slug="ferrum"),
+        sku="TEE-1",
+        price="990.00",
+        is_published=True,
+    )
+
+    assert client.patch(f"/api/v1/goods/{product.id}/", {"is_published": False}, format="json").status_code == 200
+    assert client.delete(f"/api/v1/goods/{product.id}/").status_code == 204
+
+    events = OutboxEvent.objects.order_by("id")
+    assert {event.aggregate_id for event in events} == {str(product.id)}
+    assert [(event.payload["is_published"], event.payload["deleted"]) for event in events] == [
+        ("false", "false"),
+        ("false", "true"),
+    ]
+
+
+@pytest.mark.django_db
+def test_failed_event_blocks_later_events_of_same_aggregate():
+    redis = fakeredis.FakeRedis()
+    redis.set("broken", "not a stream")
+    first = enqueue_event("broken", "product", 1, {"n": "1"})
+    second = enqueue_event("products", "product", 1, {"n": "2"})
+    other = enqueue_event("products", "product", 2, {"n": "3"})
+
+    result = relay_batch(connection=redis)
+
+    assert (result.published, result.retried) == (1, 1)
+    statuses = dict(OutboxEvent.objects.values_list("id", "status"))
+    assert statuses[other.id] == OutboxEvent.Status.PUBLISHED
+    assert statuses[first.id] == statuses[second.id] == OutboxEvent.Status.PENDING
+    assert [fields[b"n"] for _, fields in redis.xrange("products")] == [b"3"]
+
+    # Nothing is eligible while the head of aggregate 1 backs off.
+    assert not relay_batch(connection=redis)
+    assert outbox_stats()["pending"] == 2
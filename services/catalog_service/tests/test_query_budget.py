@@ -0,0 +1,42 @@
+import pytest
+from rest_framework.test import APIClient
+
+from catalog.models import Category
+from ferrum_common.query_budget import QueryBudgetExceeded, QueryRecorder, query_shape, view_stats
+
+
+def test_query_shape_collapses_parameter_lists():
+    assert query_shape('SELECT "id" FROM t WHERE "id" IN (%s, %s,\n %s)') == query_shape(
+        'SELECT "id"  FROM t WHERE "id" IN (%s, %s)'
+    )
+
+
+@pytest.mark.django_db
+def test_repeated_query_shapes_are_reported_as_n_plus_one(query_budget):
+    for index in range(3):
+        Category.objects.create(name=f"Категория {index}", slug=f"c-{index}")
+
+    with QueryRecorder() as report:
+        for category in Category.objects.all():
+            Category.objects.filter(pk=category.pk).exists()
+    [(shape, count)] = report.repeated().items()
+    assert count == 3 and report.origins[shape].startswith("tests/test_query_budget.py")
+
+    with pytest.raises(QueryBudgetExceeded):
+        with query_budget():
+            for category in Category.objects.all():
+                Category.objects.filter(pk=category.pk).exists()
+
+
+@pytest.mark.django_db
+def test_middleware_reports_query_counts_and_view_stats(settings):
+    settings.DEBUG = True
+    client = APIClient()
+    client.delete("/_debug/queries/")
+
+    response = client.get("/api/v1/categories/")
+
+    assert int(response["X-Query-Count"]) <= settings.QUERY_BUDGETS["GET category-list"]
+    stats = client.get("/_debug/queries/").json()
+    assert stats["GET category-list"]["requests"] == 1
+    assert view_stats.snapshot()["GET category-list"]["n_plus_one"] == 0
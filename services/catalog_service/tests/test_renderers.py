@@ -0,0 +1,46 @@
+import datetime
+import io
+import uuid
+from decimal import Decimal
+
+import pytest
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+
+from ferrum_common.parsers import ORJSONParser
+from ferrum_common.renderers import ORJSONRenderer, iter_json_array
+
+
+def test_orjson_renderer_matches_drf_json_renderer():
+    data = {
+        "price": Decimal("1990.50"),
+        "name": gettext_lazy("Товары"),
+        "created_at": datetime.datetime(2025, 1, 2, 3, 4, 5, 6000, tzinfo=datetime.timezone.utc),
+        "local": timezone.make_aware(
+            datetime.datetime(2025, 1, 2, 3, 4, 5), datetime.timezone(datetime.timedelta(hours=3))
+        ),
+        "day": datetime.date(2025, 1, 2),
+        "id": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        "counts": {1: 2},
+        "sizes": ("M", "L"),
+        "text": "строка\u2028",
+    }
+
+    assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+    assert ORJSONRenderer().render(data, "application/json; indent=2") == JSONRenderer().render(
+        data, "application/json; indent=2"
+    )
+    assert b"".join(iter_json_array(({"n": n} for n in range(5)), chunk_size=2)) == JSONRenderer().render(
+        [{"n": n} for n in range(5)]
+    )
+    assert b"".join(iter_json_array([])) == b"[]"
+
+
+def test_orjson_parser_reads_json_and_rejects_garbage():
+    parser = ORJSONParser()
+    body = io.BytesIO('{"name": "Футболка", "price": 1.5}'.encode())
+    assert parser.parse(body) == {"name": "Футболка", "price": 1.5}
+    with pytest.raises(ParseError):
+        parser.parse(io.BytesIO(b"{oops"))
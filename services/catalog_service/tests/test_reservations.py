@@ -0,0 +1,151 @@
+from datetime import timedelta
+
+import fakeredis
+import pytest
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from catalog.models import Category
+from goods.models import Brand, Product, ProductSize, ProductSnapshot, Size
+from goods.snapshots import STALE_STOCK_KEY, refresh_stale_stock_snapshots
+from orders.models import BasketItem, Checkout, DeliveryMethod, PaymentMethod, StockReservation
+from orders.reservations import OutOfStock, StockGate, release_reservations, reserve_stock
+from orders.services import expire_checkouts
+
+
+@pytest.fixture
+def catalog(db):
+    category = Category.objects.create(name="Одежда", slug="clothes")
+    brand = Brand.objects.create(name="Ferrum", slug="ferrum")
+    tee = Product.objects.create(
+        name="Футболка", slug="tee", category=category, brand=brand, sku="TEE", price="990.00", stock=3
+    )
+    hoodie = Product.objects.create(
+        name="Худи", slug="hoodie", category=category, brand=brand, sku="HOOD", price="3990.00", stock=0
+    )
+    size = Size.objects.create(name="M", code="M")
+    ProductSize.objects.create(product=hoodie, size=size, stock=2)
+    return {
+        "tee": tee,
+        "hoodie": hoodie,
+        "size": size,
+        "payment": PaymentMethod.objects.create(name="YooKassa", code="yookassa"),
+        "delivery": DeliveryMethod.objects.create(name="CDEK", code="cdek"),
+    }
+
+
+def make_checkout(catalog, user_id=1):
+    return Checkout.objects.create(
+        user_id=user_id,
+        payment_method=catalog["payment"],
+        delivery_method=catalog["delivery"],
+        total_amount="0.00",
+    )
+
+
+def stock(product, size=None):
+    if size is not None:
+        return ProductSize.objects.get(product=product, size=size).stock
+    return Product.objects.get(pk=product.pk).stock
+
+
+def test_reserve_is_all_or_nothing(catalog):
+    tee, hoodie, size = catalog["tee"], catalog["hoodie"], catalog["size"]
+    checkout = make_checkout(catalog)
+
+    reserve_stock(checkout, [(tee.id, None, 2), (hoodie.id, size.id, 1), (tee.id, None, 1)])
+    assert stock(tee) == 0
+    assert stock(hoodie, size) == 1
+    assert StockReservation.objects.get(checkout=checkout, product=tee).quantity == 3
+
+    with pytest.raises(OutOfStock) as exc:
+        reserve_stock(make_checkout(catalog), [(hoodie.id, size.id, 1), (tee.id, None, 1)])
+    assert exc.value.keys == [(tee.id, None)]
+
+    assert release_reservations(checkout) == 2
+    assert release_reservations(checkout) == 0
+    assert stock(tee) == 3
+
+
+def test_checkout_api_rejects_oversell_and_cancel_returns_stock(catalog):
+    tee = catalog["tee"]
+    client = APIClient()
+    user = get_user_model().objects.create_user(username="buyer", email="b@example.com", password="pass1234")
+    client.force_authenticate(user=user)
+
+    def checkout(count):
+        basket = BasketItem.objects.create(user_id=user.id, product=tee, count=count, price=tee.price)
+        return client.post(
+            "/api/v1/checkouts/",
+            {
+                "payment_method": catalog["payment"].id,
+                "delivery_method": catalog["delivery"].id,
+                "basket_item_ids": [basket.id],
+            },
+            format="json",
+        )
+
+    first = checkout(2)
+    assert first.status_code == 201
+    rejected = checkout(2)
+    assert rejected.status_code == 409
+    assert rejected.data["sku"] == ["TEE"]
+    # The rejected checkout is rolled back together with its basket deletion.
+    assert BasketItem.objects.filter(user_id=user.id).count() == 1
+    assert Checkout.objects.count() == 1
+
+    cancel = client.post(f"/api/v1/checkouts/{first.data['id']}/cancel/")
+    assert cancel.status_code == 200
+    assert cancel.data["status"] == Checkout.Status.CANCELLED
+    assert stock(tee) == 3
+    assert client.post(f"/api/v1/checkouts/{first.data['id']}/cancel/").status_code == 409
+
+
+def test_expired_reservations_cancel_checkout(catalog):
+    tee = catalog["tee"]
+    checkout = make_checkout(catalog)
+    reserve_stock(checkout, [(tee.id, None, 3)])
+    StockReservation.objects.update(expires_at=timezone.now() - timedelta(seconds=1))
+
+    assert expire_checkouts() == 1
+    checkout.refresh_from_db()
+    assert checkout.status == Checkout.Status.CANCELLED
+    assert stock(tee) == 3
+
+
+def test_reservations_refresh_product_snapshots_out_of_band(catalog, monkeypatch, django_capture_on_commit_callbacks):
+    tee, hoodie, size = catalog["tee"], catalog["hoodie"], catalog["size"]
+    redis = fakeredis.FakeRedis()
+    monkeypatch.setattr("goods.snapshots.get_redis_connection", lambda alias: redis)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        for _ in range(2):
+            reserve_stock(make_checkout(catalog), [(tee.id, None, 1), (hoodie.id, size.id, 1)])
+    # The checkouts only queue the products; nothing is rendered in the request.
+    assert not ProductSnapshot.objects.exists()
+    assert redis.smembers(STALE_STOCK_KEY) == {str(tee.id).encode(), str(hoodie.id).encode()}
+
+    assert refresh_stale_stock_snapshots() == 2
+    assert not redis.exists(STALE_STOCK_KEY)
+    assert b'"stock":1' in bytes(ProductSnapshot.objects.get(product=tee).body)
+
+
+def test_redis_gate_rejects_sold_out_sku_without_database_write(catalog, django_assert_num_queries):
+    tee = catalog["tee"]
+    gate = StockGate(fakeredis.FakeRedis(), ttl=60)
+    reserve_stock(make_checkout(catalog), [(tee.id, None, 3)], gate=gate)
+    assert gate.connection.get(gate.key((tee.id, None))) == b"0"
+
+    checkout = make_checkout(catalog)
+    # The counter is live: no seed SELECT and no UPDATE.
+    with django_assert_num_queries(0):
+        with pytest.raises(OutOfStock):
+            reserve_stock(checkout, [(tee.id, None, 1)], gate=gate)
+
+    # An expired counter is seeded once from the database.
+    gate.connection.delete(gate.key((tee.id, None)))
+    with django_assert_num_queries(1):
+        with pytest.raises(OutOfStock):
+            reserve_stock(checkout, [(tee.id, None, 1)], gate=gate)
+    assert gate.connection.ttl(gate.key((tee.id, None))) > 0
@@ -0,0 +1,83 @@
+import fakeredis
+import pytest
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+
+from catalog.models import Category
+from ferrum_common.outbox.models import OutboxEvent
+from ferrum_common.outbox.relay import relay_batch
+from goods.models import Brand
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+TRACEPARENT = f"00-{TRACE_ID}-00f067aa0ba902b7-01"
+
+
+def trace_id(span):
+    return format(span.context.trace_id, "032x")
+
+
+@pytest.mark.django_db
+def test_request_trace_covers_view_serializer_and_queries(settings, spans):
+    settings.PRODUCT_STREAM = "catalog:product"
+    admin = get_user_model().objects.create_superuser(username="admin", email="admin@example.com", password="pass")
+    client = APIClient()
+    client.force_authenticate(user=admin)
+    category = Category.objects.create(name="Одежда", slug="clothes")
+    brand = Brand.objects.create(name="Ferrum", slug="ferrum")
+
+    response = client.post(
+        "/api/v1/goods/",
+        {
+            "name": "Футболка",
+            "slug": "tee",
+            "category": category.id,
+            "brand_id": brand.id,
+            "sku": "TEE-1",
+            "price": "990.00",
+            "is_published": True,
+        },
+        format="json",
+        HTTP_TRACEPARENT=TRACEPARENT,
+    )
+
+    assert response.status_code == 201
+    assert response["X-Trace-Id"] == TRACE_ID
+    finished = {span.name: span for span in spans()}
+    server = finished["POST product-list"]
+    view = finished["view ProductViewSet.create"]
+    assert server.kind.name == "SERVER"
+    assert server.attributes["http.response.status_code"] == 201
+    assert format(server.parent.span_id, "016x") == "00f067aa0ba902b7"
+    assert view.parent.span_id == server.context.span_id
+    assert finished["validate ProductSerializer"].parent.span_id == view.context.span_id
+    assert finished["save ProductSerializer"].parent.span_id == view.context.span_id
+    db_spans = [span for span in spans() if span.name.startswith("db ")]
+    assert db_spans and all(span.attributes["db.query.count"] >= 1 for span in db_spans)
+    assert {trace_id(span) for span in spans()} == {TRACE_ID}
+    # The trace context is stored with the event for the consumers.
+    assert OutboxEvent.objects.get().payload["traceparent"].split("-")[1] == TRACE_ID
+
+
+@pytest.mark.django_db
+def test_relay_forwards_trace_context_to_the_stream(settings, spans, django_capture_on_commit_callbacks):
+    settings.PRODUCT_STREAM = "catalog:product"
+    OutboxEvent.objects.create(
+        stream="catalog:product", aggregate_type="product", aggregate_id="1", payload={"traceparent": TRACEPARENT}
+    )
+
+    redis = fakeredis.FakeRedis()
+    with django_capture_on_commit_callbacks(execute=True):
+        assert relay_batch(connection=redis).published == 1
+
+    [(_stream_id, fields)] = redis.xrange("catalog:product")
+    assert fields[b"traceparent"] == TRACEPARENT.encode()
+    [publish] = [span for span in spans() if span.name == "publish catalog:product"]
+    assert publish.kind.name == "PRODUCER"
+    assert [trace_id(link) for link in publish.links] == [TRACE_ID]
+
+
+def test_tracing_is_off_by_default():
+    from ferrum_common import tracing
+
+    assert not tracing.enabled()
+    assert tracing.inject_context() == {}
@@ -0,0 +1,108 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from orders.yookassa import CircuitBreaker, CircuitOpenError, YooKassaClient, YooKassaError
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        server.requests.append(
+            {
+                "path": self.path,
+                "idempotence_key": self.headers.get("Idempotence-Key"),
+                "peer": self.client_address,
+                "body": json.loads(body),
+            }
+        )
+        status = server.statuses.pop(0) if server.statuses else 200
+        payload = json.dumps({"id": "pay-1", "status": "pending"}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.requests = []
+    server.statuses = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_client(server, **kwargs):
+    host, port = server.server_address
+    kwargs.setdefault("backoff_factor", 0)
+    return YooKassaClient(f"http://{host}:{port}/v3/", "shop", "secret", **kwargs)
+
+
+def test_retries_reuse_idempotence_key_and_connection(stub_server):
+    stub_server.statuses = [503, 502]
+    client = make_client(stub_server, max_retries=2)
+
+    data = client.create_payment({"amount": {"value": "10.00"}}, idempotence_key="checkout-1")
+    client.create_payment({"amount": {"value": "20.00"}}, idempotence_key="checkout-2")
+
+    assert data["id"] == "pay-1"
+    keys = [request["idempotence_key"] for request in stub_server.requests]
+    assert keys == ["checkout-1", "checkout-1", "checkout-1", "checkout-2"]
+    assert {request["path"] for request in stub_server.requests} == {"/v3/payments"}
+    # Keep-alive: all calls went over one pooled connection.
+    assert len({request["peer"] for request in stub_server.requests}) == 1
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_circuit_opens_and_fails_fast(stub_server):
+    now = [0.0]
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+    client = make_client(stub_server, max_retries=0, breaker=breaker)
+    stub_server.statuses = [500, 500]
+
+    for _ in range(2):
+        with pytest.raises(YooKassaError):
+            client.create_payment({}, idempotence_key="k")
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        client.create_payment({}, idempotence_key="k")
+    assert len(stub_server.requests) == 2
+
+    now[0] = 11
+    assert client.create_payment({}, idempotence_key="k")["id"] == "pay-1"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_client_error_is_not_retried(stub_server):
+    stub_server.statuses = [400]
+    client = make_client(stub_server, max_retries=2)
+
+    with pytest.raises(YooKassaError):
+        client.create_payment({}, idempotence_key="k")
+    assert len(stub_server.requests) == 1
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_provider_calls_are_traced(stub_server, spans):
+    client = make_client(stub_server, max_retries=0)
+
+    client.create_payment({"amount": {"value": "10.00"}}, idempotence_key="checkout-1")
+
+    [span] = [span for span in spans() if span.name == "yookassa create_payment"]
+    assert span.kind.name == "CLIENT"
+    assert span.attributes["http.request.method"] == "POST"
+    assert span.attributes["http.response.status_code"] == 200
+    assert span.attributes["yookassa.outcome"] == "ok"
@@ -0,0 +1,44 @@
+import pytest
+from rest_framework.test import APIClient
+
+from news.models import NewsArticle
+from pages.models import Page
+
+pytestmark = pytest.mark.django_db
+
+
+def ok(response, status=200):
+    assert response.status_code == status, response.content[:500]
+    return response
+
+
+def slugs(count=100):
+    return iter(list(Page.objects.order_by("?").values_list("slug", flat=True)[:count]) * 10)
+
+
+def test_published_page_fetch(bench):
+    client = APIClient()
+    pages = slugs()
+    bench(lambda: ok(client.get(f"/api/v1/pages/published/{next(pages)}/")))
+
+
+def test_compiled_page_fetch_with_blocks(bench):
+    client = APIClient()
+    pages = slugs()
+    bench(lambda: ok(client.get(f"/api/v1/pages/compiled/{next(pages)}/", {"include": "blocks"})))
+
+
+def test_public_news_feed(bench):
+    client = APIClient()
+    bench(lambda: ok(client.get("/api/v1/public/news/")))
+
+
+def test_public_news_feed_by_tag(bench):
+    client = APIClient()
+    bench(lambda: ok(client.get("/api/v1/public/news/", {"tag": "релиз"})))
+
+
+def test_public_news_detail(bench):
+    client = APIClient()
+    ids = iter(list(NewsArticle.objects.order_by("?").values_list("pk", flat=True)[:100]) * 10)
+    bench(lambda: ok(client.get(f"/api/v1/public/news/{next(ids)}/")))
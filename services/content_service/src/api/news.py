@@ -3,13 +3,22 @@ from __future__ import annotations
 import logging
 
 from django.conf import settings
-from django_redis import get_redis_connection
+from django.db import transaction
 from rest_framework import filters, mixins, permissions, serializers, viewsets
+from rest_framework.response import Response
 
+from common.http_cache import HTTPCacheMixin, invalidate_collection
+from common.sparse_fields import SparseFieldsMixin
+from ferrum_common.outbox.services import enqueue_event
+from ferrum_common.pagination import KeysetPagination
+from ferrum_common.tracing import TracedViewMixin
 from news.models import NewsArticle, NewsChangelog, NewsEvent
+from news.search import filter_by_tags, is_full_text_available, search_news, tag_facets
 
 logger = logging.getLogger(__name__)
 
+NEWS_CACHE_COLLECTION = "news"
+
 
 class NewsChangelogSerializer(serializers.ModelSerializer):
     class Meta:
@@ -84,7 +93,8 @@ class PublicNewsSerializer(serializers.ModelSerializer):
 
 
 def publish_news_event(article: NewsArticle) -> None:
-    """Push publication event into Redis Streams for other services."""
+    """Record publication event in the outbox; the relay pushes it to Redis Streams."""
+    invalidate_collection(NEWS_CACHE_COLLECTION, [f"{NEWS_CACHE_COLLECTION}-{article.pk}"])
     stream = getattr(settings, "NEWS_STREAM", None)
     if not stream:
         return
@@ -96,50 +106,114 @@ def publish_news_event(article: NewsArticle) -> None:
         "published_at": article.published_at.isoformat() if article.published_at else "",
         "tags": ",".join(article.tags or []),
     }
-    try:
-        conn = get_redis_connection("default")
-        stream_id = conn.xadd(stream, payload)
-    except Exception as exc:  # pragma: no cover - network errors
-        logger.warning("Failed to push news event to redis: %s", exc)
-        stream_id = "offline"
-    NewsEvent.objects.create(article=article, stream_id=stream_id, payload=payload)
+    event = enqueue_event(stream, "news", article.pk, payload)
+    NewsEvent.objects.create(article=article, payload=payload, outbox_event=event)
+
+
+class NewsSearchFilter(filters.SearchFilter):
+    """
+    Full-text news search over the ``search_vector`` document.
+
+    Without PostgreSQL it degrades to the stock ``icontains`` search over
+    ``search_fields``.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, "").strip()
+        if not query:
+            return queryset
+        if not is_full_text_available():
+            return super().filter_queryset(request, queryset, view)
+        return search_news(queryset, query)
+
 
+class NewsTagFilter(filters.BaseFilterBackend):
+    """``?tag=a&tag=b`` keeps articles carrying all the given tags."""
 
-class NewsViewSet(viewsets.ModelViewSet):
+    def filter_queryset(self, request, queryset, view):
+        tags = request.query_params.getlist("tag")
+        return filter_by_tags(queryset, tags) if tags else queryset
+
+
+class NewsViewSet(TracedViewMixin, viewsets.ModelViewSet):
     """Административный CRUD по новостям и changelog."""
 
-    queryset = NewsArticle.objects.prefetch_related("changelog").all()
+    queryset = NewsArticle.objects.prefetch_related("changelog").defer("search_vector")
     serializer_class = NewsArticleSerializer
     permission_classes = (permissions.IsAdminUser,)
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ("title", "summary", "tags")
+    filter_backends = [NewsTagFilter, NewsSearchFilter, filters.OrderingFilter]
+    search_fields = ("title", "summary", "tag_index__tag")
     ordering_fields = ("published_at", "created_at")
 
+    @transaction.atomic
     def perform_create(self, serializer):
         article = serializer.save()
         if article.status == NewsArticle.Status.PUBLISHED:
             publish_news_event(article)
 
+    @transaction.atomic
     def perform_update(self, serializer):
+        was_published = serializer.instance.status == NewsArticle.Status.PUBLISHED
         article = serializer.save()
         if article.status == NewsArticle.Status.PUBLISHED:
             publish_news_event(article)
-
-
-class PublicNewsViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
-    """Публичный API списка новостей для клиентского фронтенда."""
-
+        elif was_published:
+            invalidate_collection(NEWS_CACHE_COLLECTION, [f"{NEWS_CACHE_COLLECTION}-{article.pk}"])
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        if instance.status == NewsArticle.Status.PUBLISHED:
+            invalidate_collection(NEWS_CACHE_COLLECTION, [f"{NEWS_CACHE_COLLECTION}-{instance.pk}"])
+        instance.delete()
+
+
+class NewsFeedPagination(KeysetPagination):
+    page_size = 20
+    max_page_size = 100
+
+
+class PublicNewsViewSet(
+    TracedViewMixin,
+    HTTPCacheMixin,
+    SparseFieldsMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    viewsets.GenericViewSet,
+):
+    """
+    Публичный API списка новостей для клиентского фронтенда.
+
+    Лента отдаётся страницами по курсору ``(published_at, id)`` в компактном
+    виде без ``body``; ``?fields=`` выбирает поля, ``?expand=changelog``
+    добавляет changelog. Детальная новость по умолчанию отдаётся целиком.
+    """
+
+    cache_collection = NEWS_CACHE_COLLECTION
     serializer_class = PublicNewsSerializer
     permission_classes = (permissions.AllowAny,)
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ("title", "summary", "tags")
+    pagination_class = NewsFeedPagination
+    filter_backends = [NewsTagFilter, NewsSearchFilter, filters.OrderingFilter]
+    search_fields = ("title", "summary", "tag_index__tag")
     ordering_fields = ("published_at",)
+    list_fields = ("id", "title", "slug", "summary", "cover_image", "published_at", "tags", "featured")
+    expandable_fields = {"changelog": ("changelog",)}
+    required_columns = ("id", "published_at", "updated_at")
 
     def get_queryset(self):
-        return (
-            NewsArticle.objects.filter(status=NewsArticle.Status.PUBLISHED)
-            .prefetch_related("changelog")
-            .order_by("-published_at")
+        return NewsArticle.objects.filter(status=NewsArticle.Status.PUBLISHED).order_by("-published_at")
+
+    def sparse_queryset(self, queryset):
+        # Tag facets only read article ids, so there is nothing to narrow or prefetch.
+        if self.action == "tags":
+            return queryset
+        return super().sparse_queryset(queryset)
+
+    def tags(self, request, *args, **kwargs):
+        """Tag counts of the published articles matching the other filters (``?search=``, ``?tag=``)."""
+        return self._cached(
+            request,
+            self.list_validators,
+            lambda: Response(tag_facets(self.filter_queryset(self.get_queryset()))),
         )
 
 
@@ -1,12 +1,40 @@
 from __future__ import annotations
 
 import logging
+import re
+from typing import Iterable, Iterator, Optional
 
 from django.conf import settings
-from django_redis import get_redis_connection
-from rest_framework import filters, mixins, permissions, serializers, viewsets
+from django.db import transaction
+from django.db.models import F
+from django.http import Http404, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.utils.http import quote_etag
+from rest_framework import filters, mixins, permissions, serializers, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
 
-from pages.models import Page, PageEvent, PageTemplate
+from common.http_cache import (
+    CachedResponse,
+    HTTPCacheMixin,
+    get_collection_version,
+    invalidate_collection,
+    object_validators,
+    queryset_validators,
+    request_digest,
+    response_key,
+    store_response,
+    tee_to_cache,
+)
+from ferrum_common.parsers import JSONPatchParser, ORJSONParser
+from ferrum_common.renderers import dumps, iter_json_array
+from ferrum_common.tracing import TracedViewMixin
+from pages.blocks import get_blocks
+from pages.events import PAGES_CACHE_COLLECTION, publish_page_events
+from pages.models import Page, PageTemplate
+from pages.patch import PatchError, VersionConflict, parse_operations, patch_page_blocks
 
 logger = logging.getLogger(__name__)
 
@@ -52,10 +80,11 @@ class PageSerializer(serializers.ModelSerializer):
             "template_id",
             "created_by",
             "updated_by",
+            "version",
             "created_at",
             "updated_at",
         ]
-        read_only_fields = ("published_at", "created_at", "updated_at")
+        read_only_fields = ("published_at", "version", "created_at", "updated_at")
 
 
 class PublishedPageSerializer(serializers.ModelSerializer):
@@ -74,26 +103,57 @@ class PublishedPageSerializer(serializers.ModelSerializer):
         ]
 
 
+class CompiledPageSerializer(serializers.ModelSerializer):
+    layout = serializers.JSONField(source="compiled.layout", read_only=True)
+    digest = serializers.CharField(source="compiled.digest", read_only=True)
+
+    class Meta:
+        model = Page
+        fields = [
+            "id",
+            "title",
+            "slug",
+            "locale",
+            "layout",
+            "digest",
+            "seo_title",
+            "seo_description",
+            "seo_keywords",
+            "published_at",
+        ]
+
+
 def publish_page_event(page: Page) -> None:
-    stream = getattr(settings, "PAGE_STREAM", None)
-    if not stream:
-        return
-    payload = {
-        "page_id": str(page.id),
-        "slug": page.slug,
-        "locale": page.locale,
-        "published_at": page.published_at.isoformat() if page.published_at else "",
-    }
+    publish_page_events([page])
+
+
+class PreconditionFailed(APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = "Страница изменилась, обновите её и повторите правку."
+    default_code = "precondition_failed"
+
+
+class PreconditionRequired(APIException):
+    status_code = status.HTTP_428_PRECONDITION_REQUIRED
+    default_detail = "Передайте версию страницы в заголовке If-Match."
+    default_code = "precondition_required"
+
+
+def requested_version(request) -> Optional[int]:
+    """Page version from ``If-Match: "<version>"``; ``None`` when the header is absent."""
+    header = request.headers.get("If-Match")
+    if not header:
+        return None
+    tag = header.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
     try:
-        conn = get_redis_connection("default")
-        stream_id = conn.xadd(stream, payload)
-    except Exception as exc:  # pragma: no cover
-        logger.warning("Failed to push page event to redis: %s", exc)
-        stream_id = "offline"
-    PageEvent.objects.create(page=page, stream_id=stream_id, payload=payload)
+        return int(tag.strip('"'))
+    except ValueError:
+        raise PreconditionFailed("Некорректный заголовок If-Match.") from None
 
 
-class PageTemplateViewSet(viewsets.ModelViewSet):
+class PageTemplateViewSet(TracedViewMixin, viewsets.ModelViewSet):
     queryset = PageTemplate.objects.all()
     serializer_class = PageTemplateSerializer
     permission_classes = (permissions.IsAdminUser,)
@@ -102,7 +162,7 @@ class PageTemplateViewSet(viewsets.ModelViewSet):
     ordering_fields = ("name", "created_at")
 
 
-class PageViewSet(viewsets.ModelViewSet):
+class PageViewSet(TracedViewMixin, viewsets.ModelViewSet):
     queryset = Page.objects.select_related("template").all()
     serializer_class = PageSerializer
     permission_classes = (permissions.IsAdminUser,)
@@ -111,28 +171,244 @@ class PageViewSet(viewsets.ModelViewSet):
     search_fields = ("title", "slug")
     ordering_fields = ("created_at", "updated_at")
 
+    @transaction.atomic
     def perform_create(self, serializer):
         page = serializer.save()
         if page.status == Page.Status.PUBLISHED:
             publish_page_event(page)
 
+    @transaction.atomic
     def perform_update(self, serializer):
-        page = serializer.save()
+        instance = serializer.instance
+        expected = requested_version(self.request)
+        if expected is not None and expected != instance.version:
+            raise PreconditionFailed()
+        # Claim the next version with a conditional UPDATE: it row-locks the page until commit, and a writer
+        # that read the same version finds no row and gets 412 instead of overwriting this edit.
+        claimed = Page.objects.filter(pk=instance.pk, version=instance.version).update(version=F("version") + 1)
+        if not claimed:
+            raise PreconditionFailed()
+        was_published = instance.status == Page.Status.PUBLISHED
+        page = serializer.save(version=instance.version + 1)
         if page.status == Page.Status.PUBLISHED:
             publish_page_event(page)
+        elif was_published:
+            invalidate_collection(PAGES_CACHE_COLLECTION, [f"{PAGES_CACHE_COLLECTION}-{page.pk}"])
+
+    @action(detail=True, methods=["patch"], parser_classes=[JSONPatchParser, ORJSONParser])
+    def blocks(self, request, pk=None):
+        """
+        Apply a JSON Patch to ``blocks`` without sending the whole document.
+
+        The body is an RFC 6902 operation list (operations may address a block
+        of ``blocks.sections`` with ``block``, see ``pages.patch``) and
+        ``If-Match`` carries the page ``version`` the edit was made against;
+        the response holds the new version and is answered with 412 if the
+        page changed meanwhile.
+        """
+        expected = requested_version(request)
+        if expected is None:
+            raise PreconditionRequired()
+        try:
+            operations = parse_operations(request.data)
+        except PatchError as exc:
+            raise ValidationError({"operations": [str(exc)]}) from None
+        try:
+            with transaction.atomic():
+                page = patch_page_blocks(int(pk), expected, operations)
+                if page.status == Page.Status.PUBLISHED:
+                    publish_page_event(page)
+        except Page.DoesNotExist:
+            raise Http404 from None
+        except VersionConflict:
+            raise PreconditionFailed() from None
+        except PatchError as exc:
+            raise ValidationError({"operations": [str(exc)]}) from None
+        response = Response({"id": page.pk, "version": page.version})
+        response["ETag"] = quote_etag(str(page.version))
+        return response
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        if instance.status == Page.Status.PUBLISHED:
+            invalidate_collection(PAGES_CACHE_COLLECTION, [f"{PAGES_CACHE_COLLECTION}-{instance.pk}"])
+        instance.delete()
+
+
+def published_pages():
+    return (
+        Page.objects.filter(status=Page.Status.PUBLISHED)
+        .only(
+            "id",
+            "slug",
+            "title",
+            "locale",
+            "blocks",
+            "seo_title",
+            "seo_description",
+            "seo_keywords",
+            "published_at",
+            "updated_at",
+        )
+        .order_by("slug")
+    )
 
 
-class PublishedPageViewSet(mixins.RetrieveModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet):
+def render_published_pages(pages) -> Iterator[bytes]:
+    """Encode published pages as a JSON array in chunks; their ``blocks`` can be large, so it is never built whole."""
+    return iter_json_array(PublishedPageSerializer(page).data for page in pages.iterator(chunk_size=200))
+
+
+class PublishedPageViewSet(
+    TracedViewMixin, HTTPCacheMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet
+):
     serializer_class = PublishedPageSerializer
+    cache_collection = PAGES_CACHE_COLLECTION
+    permission_classes = (permissions.AllowAny,)
+    lookup_field = "slug"
+    queryset = Page.objects.filter(status=Page.Status.PUBLISHED)
+
+    def get_queryset(self):
+        return published_pages()
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(request, self.list_validators, lambda: self.stream_list(request, *args, **kwargs))
+
+    def stream_list(self, request, *args, **kwargs):
+        if request.accepted_renderer.format != "json":
+            return mixins.ListModelMixin.list(self, request, *args, **kwargs)
+        pages = render_published_pages(self.filter_queryset(self.get_queryset()))
+        return StreamingHttpResponse(pages, content_type="application/json")
+
+
+class CompiledPageViewSet(
+    TracedViewMixin, HTTPCacheMixin, mixins.RetrieveModelMixin, mixins.ListModelMixin, viewsets.GenericViewSet
+):
+    """
+    Published pages as layouts referencing shared blocks.
+
+    ``layout.sections`` lists block digests; clients resolve them through
+    ``/pages/blocks/`` and keep the blocks they already have, since a digest
+    never changes its content. ``?include=blocks`` adds the referenced blocks
+    once per response under ``blocks``; a list response then becomes
+    ``{"pages": [...], "blocks": {...}}``.
+    """
+
+    serializer_class = CompiledPageSerializer
+    cache_collection = PAGES_CACHE_COLLECTION
     permission_classes = (permissions.AllowAny,)
     lookup_field = "slug"
     queryset = Page.objects.filter(status=Page.Status.PUBLISHED)
 
     def get_queryset(self):
         return (
-            Page.objects.filter(status=Page.Status.PUBLISHED)
-            .only("id", "slug", "title", "locale", "blocks", "seo_title", "seo_description", "seo_keywords", "published_at")
+            Page.objects.filter(status=Page.Status.PUBLISHED, compiled__isnull=False)
+            .select_related("compiled")
+            .only(
+                "id",
+                "slug",
+                "title",
+                "locale",
+                "seo_title",
+                "seo_description",
+                "seo_keywords",
+                "published_at",
+                "updated_at",
+                "compiled__layout",
+                "compiled__digest",
+                "compiled__block_digests",
+            )
             .order_by("slug")
         )
 
+    def include_blocks(self) -> bool:
+        return "blocks" in self.request.query_params.get("include", "").split(",")
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(request, self.list_validators, lambda: self.compiled_list(request))
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached(request, self.retrieve_validators, lambda: self.compiled_detail(request))
+
+    def compiled_list(self, request):
+        pages = list(self.filter_queryset(self.get_queryset()))
+        data = self.get_serializer(pages, many=True).data
+        if not self.include_blocks():
+            return Response(data)
+        digests = (digest for page in pages for digest in page.compiled.block_digests)
+        return Response({"pages": data, "blocks": get_blocks(digests)})
+
+    def compiled_detail(self, request):
+        page = self.get_object()
+        data = self.get_serializer(page).data
+        if self.include_blocks():
+            data["blocks"] = get_blocks(page.compiled.block_digests)
+        return Response(data)
+
+
+class ContentBlockViewSet(viewsets.ViewSet):
+    """Блоки опубликованных страниц по sha256; содержимое блока не меняется, ответы кэшируются навсегда."""
+
+    permission_classes = (permissions.AllowAny,)
+    lookup_field = "digest"
+    lookup_value_regex = "[0-9a-f]{64}"
+    max_digests = 200
 
+    def list(self, request):
+        digests = [value for value in request.query_params.get("digests", "").split(",") if value]
+        if not digests or len(digests) > self.max_digests:
+            raise ValidationError({"digests": f"Передайте от 1 до {self.max_digests} хэшей блоков."})
+        if not all(re.fullmatch(self.lookup_value_regex, digest) for digest in digests):
+            raise ValidationError({"digests": "Ожидается список sha256 через запятую."})
+        blocks = get_blocks(digests)
+        # A digest that is not published yet may appear later, so only complete answers are immutable.
+        return self._immutable(Response(blocks), complete=len(blocks) == len(set(digests)))
+
+    def retrieve(self, request, digest=None):
+        blocks = get_blocks([digest])
+        if digest not in blocks:
+            raise Http404
+        response = self._immutable(Response(blocks[digest]), complete=True)
+        response["ETag"] = quote_etag(digest)
+        return response
+
+    def _immutable(self, response, complete: bool):
+        if complete:
+            patch_cache_control(
+                response, public=True, max_age=getattr(settings, "CONTENT_BLOCK_MAX_AGE", 31536000), immutable=True
+            )
+        return response
+
+
+def warm_published_pages(slugs: Iterable[str]) -> int:
+    """
+    Fill the public page cache the way the first visitor would.
+
+    Stores the JSON responses of the published pages list and of each of
+    ``slugs`` under the keys ``PublishedPageViewSet`` reads, rendered by the
+    same helpers; returns the number of pages found.
+    """
+    version = get_collection_version(PAGES_CACHE_COLLECTION)
+    if version is None:
+        return 0
+    content_type = "application/json"
+    pages = published_pages()
+
+    digest = request_digest(reverse("published-page-list"), [], content_type)
+    validators = queryset_validators(PAGES_CACHE_COLLECTION, version, digest, pages)
+    for _chunk in tee_to_cache(
+        response_key(PAGES_CACHE_COLLECTION, version, digest), validators, content_type, render_published_pages(pages)
+    ):
+        pass
+
+    warmed = 0
+    for page in pages.filter(slug__in=list(slugs)):
+        digest = request_digest(reverse("published-page-detail", args=[page.slug]), [], content_type)
+        entry = CachedResponse(
+            validators=object_validators(PAGES_CACHE_COLLECTION, version, digest, page),
+            content_type=content_type,
+            body=dumps(PublishedPageSerializer(page).data),
+        )
+        store_response(response_key(PAGES_CACHE_COLLECTION, version, digest), entry)
+        warmed += 1
+    return warmed
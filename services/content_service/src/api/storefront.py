@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from rest_framework import mixins, permissions, serializers, viewsets
+from rest_framework.exceptions import ValidationError
+
+from ferrum_common.tracing import TracedViewMixin
+from storefront.models import ProductCard
+
+
+class ProductCardSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ProductCard
+        fields = ["product_id", "slug", "name", "sku", "price", "currency", "category_id", "updated_at"]
+
+
+class PublicProductCardViewSet(
+    TracedViewMixin, mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet
+):
+    """Карточки товаров для блоков витрины без обращения к catalog_service."""
+
+    serializer_class = ProductCardSerializer
+    permission_classes = (permissions.AllowAny,)
+    lookup_field = "slug"
+    max_ids = 100
+
+    def get_queryset(self):
+        queryset = ProductCard.objects.filter(is_visible=True)
+        if self.action != "list":
+            return queryset
+        raw_ids = self.request.query_params.get("ids", "")
+        try:
+            ids = [int(value) for value in raw_ids.split(",") if value]
+        except ValueError:
+            raise ValidationError({"ids": "Ожидается список id через запятую."}) from None
+        if not ids or len(ids) > self.max_ids:
+            raise ValidationError({"ids": f"Передайте от 1 до {self.max_ids} id товаров."})
+        return queryset.filter(product_id__in=ids)
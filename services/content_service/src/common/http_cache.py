@@ -0,0 +1,254 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max
+from django.dispatch import Signal
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+logger = logging.getLogger(__name__)
+
+COLLECTION_VERSION_KEY = "content:http-cache:{collection}:version"
+RESPONSE_KEY = "content:http-cache:{collection}:{version}:{digest}"
+
+# Sent after commit when a collection changed; ``surrogate_keys`` can be purged from a CDN.
+collection_invalidated = Signal()
+
+
+@dataclass(frozen=True)
+class Validators:
+    etag: str
+    last_modified: Optional[float]
+    surrogate_keys: Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class CachedResponse:
+    validators: Validators
+    content_type: str
+    body: bytes
+
+
+def _new_version() -> int:
+    # Millisecond timestamps keep versions unique even after Redis is flushed.
+    return int(time.time() * 1000)
+
+
+def get_collection_version(collection: str) -> Optional[int]:
+    try:
+        return cache.get_or_set(COLLECTION_VERSION_KEY.format(collection=collection), _new_version, timeout=None)
+    except Exception as exc:  # pragma: no cover - network errors
+        logger.warning("Failed to read %s cache version: %s", collection, exc)
+        return None
+
+
+def bump_collection_version(collection: str) -> None:
+    key = COLLECTION_VERSION_KEY.format(collection=collection)
+    try:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_version(), timeout=None)
+    except Exception as exc:  # pragma: no cover - network errors
+        logger.warning("Failed to bump %s cache version: %s", collection, exc)
+
+
+def invalidate_collection(collection: str, surrogate_keys: Iterable[str] = ()) -> None:
+    """Retire cached responses of ``collection`` once the current transaction commits."""
+    keys = [collection, *surrogate_keys]
+
+    def invalidate():
+        bump_collection_version(collection)
+        collection_invalidated.send(sender=None, collection=collection, surrogate_keys=keys)
+
+    transaction.on_commit(invalidate)
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[float]:
+    return value.timestamp() if value is not None else None
+
+
+def _digest(*parts) -> str:
+    return hashlib.sha1(":".join(str(part) for part in parts).encode()).hexdigest()
+
+
+def _tee(chunks: Iterable[bytes], store: Callable[[bytes], None], limit: int) -> Iterator[bytes]:
+    buffer: Optional[List[bytes]] = []
+    size = 0
+    for chunk in chunks:
+        if buffer is not None:
+            size += len(chunk)
+            if size <= limit:
+                buffer.append(chunk)
+            else:
+                buffer = None
+        yield chunk
+    if buffer is not None:
+        store(b"".join(buffer))
+
+
+def request_digest(path: str, query: List[Tuple[str, List[str]]], media_type: str) -> str:
+    """Identify a response by path, sorted ``query_params.lists()`` and negotiated media type."""
+    return _digest(path, query, media_type)
+
+
+def response_key(collection: str, version: int, digest: str) -> str:
+    return RESPONSE_KEY.format(collection=collection, version=version, digest=digest)
+
+
+def queryset_validators(
+    collection: str, version: Optional[int], digest: str, queryset, last_modified_field: str = "updated_at"
+) -> Validators:
+    """Validators of a list response: the newest ``last_modified_field`` and the row count, in one query."""
+    stats = queryset.order_by().aggregate(last=Max(last_modified_field), count=Count("pk"))
+    return Validators(
+        etag=_digest(collection, version, digest, stats["count"], _timestamp(stats["last"])),
+        last_modified=_timestamp(stats["last"]),
+        surrogate_keys=(collection,),
+    )
+
+
+def object_validators(
+    collection: str, version: Optional[int], digest: str, obj, last_modified_field: str = "updated_at"
+) -> Validators:
+    updated = getattr(obj, last_modified_field)
+    return Validators(
+        etag=_digest(collection, version, digest, obj.pk, _timestamp(updated)),
+        last_modified=_timestamp(updated),
+        surrogate_keys=(collection, f"{collection}-{obj.pk}"),
+    )
+
+
+def store_response(key: str, entry: CachedResponse) -> None:
+    try:
+        cache.set(key, entry, timeout=getattr(settings, "CONTENT_HTTP_CACHE_TIMEOUT", 300))
+    except Exception as exc:  # pragma: no cover - network errors
+        logger.warning("Failed to store cached response: %s", exc)
+
+
+def tee_to_cache(key: str, validators: Validators, content_type: str, chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Pass ``chunks`` through and store them once consumed, unless they exceed ``CONTENT_HTTP_CACHE_MAX_BYTES``."""
+
+    def store(body: bytes) -> None:
+        store_response(key, CachedResponse(validators=validators, content_type=content_type, body=body))
+
+    return _tee(chunks, store, getattr(settings, "CONTENT_HTTP_CACHE_MAX_BYTES", 1024 * 1024))
+
+
+class HTTPCacheMixin:
+    """
+    Conditional GET and a Redis response cache for public read-only viewsets.
+
+    Responses are stored under the collection version, so publishing anything
+    in ``cache_collection`` (see ``invalidate_collection``) retires them all at
+    once. A warm request is one cache GET; a cold one first answers
+    ``If-None-Match``/``If-Modified-Since`` from ``updated_at`` without
+    serializing, and only then renders and stores the body. JSON responses
+    are ``public`` and carry ``Surrogate-Key`` headers naming the collection
+    and the object for CDN purges; other renderings (the browsable API) are
+    ``private``. Every response varies on ``Accept``.
+    """
+
+    cache_collection: str = ""
+    last_modified_field = "updated_at"
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(
+            request, self.list_validators, lambda: super(HTTPCacheMixin, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached(
+            request, self.retrieve_validators, lambda: super(HTTPCacheMixin, self).retrieve(request, *args, **kwargs)
+        )
+
+    def list_validators(self, version: Optional[int], digest: str) -> Validators:
+        queryset = self.filter_queryset(self.get_queryset())
+        return queryset_validators(self.cache_collection, version, digest, queryset, self.last_modified_field)
+
+    def retrieve_validators(self, version: Optional[int], digest: str) -> Validators:
+        return object_validators(self.cache_collection, version, digest, self.get_object(), self.last_modified_field)
+
+    def get_object(self):
+        # Validators and the serializer share one lookup.
+        if not hasattr(self, "_cached_object"):
+            self._cached_object = super().get_object()
+        return self._cached_object
+
+    def _cached(self, request, validators_for: Callable[[Optional[int], str], Validators], render: Callable):
+        version = get_collection_version(self.cache_collection)
+        digest = request_digest(request.path, sorted(request.query_params.lists()), request.accepted_media_type)
+        key = response_key(self.cache_collection, version, digest)
+        # Only JSON is cached: the browsable API renders per-user HTML.
+        cacheable = version is not None and request.accepted_renderer.format == "json"
+        entry = self._read(key) if cacheable else None
+
+        if entry is not None:
+            validators = entry.validators
+        else:
+            validators = validators_for(version, digest)
+        not_modified = get_conditional_response(
+            request, etag=quote_etag(validators.etag), last_modified=validators.last_modified
+        )
+        if not_modified is not None:
+            return self._decorate(request, not_modified, validators)
+        if entry is not None:
+            return self._decorate(request, HttpResponse(entry.body, content_type=entry.content_type), validators)
+
+        response = render()
+        if response.status_code != 200:
+            return response
+        streaming = isinstance(response, StreamingHttpResponse)
+        if not streaming:
+            self._render(response)
+        if cacheable:
+            content_type = response["Content-Type"]
+            if streaming:
+                response.streaming_content = tee_to_cache(key, validators, content_type, response.streaming_content)
+            else:
+                store_response(
+                    key, CachedResponse(validators=validators, content_type=content_type, body=response.content)
+                )
+        return self._decorate(request, response, validators)
+
+    def _render(self, response) -> None:
+        # DRF renders in finalize_response; the cache needs the bytes now.
+        response.accepted_renderer = self.request.accepted_renderer
+        response.accepted_media_type = self.request.accepted_media_type
+        response.renderer_context = self.get_renderer_context()
+        response.render()
+
+    def _decorate(self, request, response, validators: Validators):
+        response["ETag"] = quote_etag(validators.etag)
+        if validators.last_modified is not None:
+            response["Last-Modified"] = http_date(validators.last_modified)
+        # The same URL renders JSON or per-user HTML depending on Accept.
+        patch_vary_headers(response, ["Accept"])
+        if request.accepted_renderer.format != "json":
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        response["Surrogate-Key"] = " ".join(validators.surrogate_keys)
+        patch_cache_control(
+            response,
+            public=True,
+            max_age=getattr(settings, "CONTENT_HTTP_CACHE_MAX_AGE", 60),
+            stale_while_revalidate=getattr(settings, "CONTENT_HTTP_CACHE_STALE_WHILE_REVALIDATE", 300),
+        )
+        return response
+
+    def _read(self, key: str) -> Optional[CachedResponse]:
+        try:
+            return cache.get(key)
+        except Exception as exc:  # pragma: no cover - network errors
+            logger.warning("Failed to read cached response: %s", exc)
+            return None
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from typing import Dict, List, Sequence
+
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework.exceptions import ValidationError
+
+
+class SparseFieldsMixin:
+    """
+    ``?fields=a,b`` and ``?expand=relation`` for read-only viewsets.
+
+    Lists render ``list_fields`` by default, details every field of the
+    serializer; ``expandable_fields`` (relation name -> prefetch lookups) are
+    only rendered and prefetched when named in ``expand`` (details include
+    them unless ``fields`` is given). Fields that are not rendered are not
+    selected either: ``filter_queryset`` narrows the queryset with ``only()``
+    to the columns behind the chosen fields plus ``required_columns``.
+    """
+
+    fields_param = "fields"
+    expand_param = "expand"
+    list_fields: Sequence[str] = ()
+    expandable_fields: Dict[str, Sequence[str]] = {}
+    required_columns: Sequence[str] = ("id",)
+
+    def _query_list(self, param: str) -> List[str]:
+        return [value.strip() for value in self.request.query_params.get(param, "").split(",") if value.strip()]
+
+    def selected_fields(self) -> List[str]:
+        if hasattr(self, "_selected_fields"):
+            return self._selected_fields
+        available = list(self.get_serializer_class().Meta.fields)
+        plain = [name for name in available if name not in self.expandable_fields]
+        requested = self._query_list(self.fields_param)
+        expand = self._query_list(self.expand_param)
+        unknown = [name for name in requested if name not in plain]
+        if unknown:
+            raise ValidationError({self.fields_param: f"Неизвестные поля: {', '.join(unknown)}."})
+        unknown = [name for name in expand if name not in self.expandable_fields]
+        if unknown:
+            raise ValidationError({self.expand_param: f"Нельзя раскрыть: {', '.join(unknown)}."})
+
+        if requested:
+            selected = requested
+        elif self.action == "list" and self.list_fields:
+            selected = list(self.list_fields)
+        else:
+            selected = plain
+            if self.action != "list" and not self.request.query_params.get(self.expand_param):
+                expand = list(self.expandable_fields)
+        wanted = {*selected, *expand}
+        self._selected_fields = [name for name in available if name in wanted]
+        return self._selected_fields
+
+    def filter_queryset(self, queryset):
+        return self.sparse_queryset(super().filter_queryset(queryset))
+
+    def sparse_queryset(self, queryset):
+        selected = self.selected_fields()
+        model = queryset.model
+        fields = self.get_serializer_class()().fields
+        columns = list(self.required_columns)
+        for name in selected:
+            if name in self.expandable_fields:
+                queryset = queryset.prefetch_related(*self.expandable_fields[name])
+                continue
+            source = fields[name].source
+            try:
+                field = model._meta.get_field(source)
+            except FieldDoesNotExist:
+                continue
+            if field.concrete and field.attname not in columns:
+                columns.append(field.attname)
+        return queryset.only(*columns)
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        target = getattr(serializer, "child", serializer)
+        selected = set(self.selected_fields())
+        for name in list(target.fields):
+            if name not in selected:
+                target.fields.pop(name)
+        return serializer
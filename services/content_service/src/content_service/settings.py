@@ -20,14 +20,21 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
     "rest_framework",
     "django_filters",
     "drf_spectacular",
     "news",
     "pages",
+    "ferrum_common.outbox",
+    "streams",
+    "storefront",
 ]
 
 MIDDLEWARE = [
+    "ferrum_common.metrics.MetricsMiddleware",
+    "ferrum_common.tracing.TracingMiddleware",
+    "ferrum_common.query_budget.QueryBudgetMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -75,6 +82,15 @@ CACHES = {
 
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_RENDERER_CLASSES": (
+        "ferrum_common.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "ferrum_common.parsers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
     "DEFAULT_AUTHENTICATION_CLASSES": ("rest_framework_simplejwt.authentication.JWTAuthentication",),
     "DEFAULT_FILTER_BACKENDS": [
@@ -106,6 +122,26 @@ MEDIA_ROOT = os.getenv("DJANGO_MEDIA_ROOT", str(BASE_DIR / "media"))
 REDIS_STREAM_PREFIX = os.getenv("REDIS_STREAM_PREFIX", "content")
 NEWS_STREAM = f"{REDIS_STREAM_PREFIX}:news"
 PAGE_STREAM = f"{REDIS_STREAM_PREFIX}:page"
+CATALOG_PRODUCT_STREAM = os.getenv("CATALOG_PRODUCT_STREAM", "catalog:product")
+# Streams are shared between services, so they may live in another Redis than the cache.
+STREAMS_REDIS_URL = os.getenv("STREAMS_REDIS_URL", os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+STREAMS_WORKERS = int(os.getenv("STREAMS_WORKERS", 1))
+STREAMS_BATCH_SIZE = int(os.getenv("STREAMS_BATCH_SIZE", 100))
+STREAMS_BLOCK_MS = int(os.getenv("STREAMS_BLOCK_MS", 5000))
+STREAMS_CLAIM_IDLE_MS = int(os.getenv("STREAMS_CLAIM_IDLE_MS", 60000))
+STREAMS_MAX_DELIVERIES = int(os.getenv("STREAMS_MAX_DELIVERIES", 5))
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 500))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 10))
+OUTBOX_RETRY_BACKOFF = int(os.getenv("OUTBOX_RETRY_BACKOFF", 5))
+OUTBOX_STREAM_MAXLEN = int(os.getenv("OUTBOX_STREAM_MAXLEN", 0)) or None
+PAGE_SCHEDULER_BATCH_SIZE = int(os.getenv("PAGE_SCHEDULER_BATCH_SIZE", 200))
+
+CONTENT_HTTP_CACHE_TIMEOUT = int(os.getenv("CONTENT_HTTP_CACHE_TIMEOUT", 300))
+CONTENT_HTTP_CACHE_MAX_AGE = int(os.getenv("CONTENT_HTTP_CACHE_MAX_AGE", 60))
+CONTENT_HTTP_CACHE_STALE_WHILE_REVALIDATE = int(os.getenv("CONTENT_HTTP_CACHE_STALE_WHILE_REVALIDATE", 300))
+CONTENT_HTTP_CACHE_MAX_BYTES = int(os.getenv("CONTENT_HTTP_CACHE_MAX_BYTES", 1024 * 1024))
+CONTENT_BLOCK_CACHE_TIMEOUT = int(os.getenv("CONTENT_BLOCK_CACHE_TIMEOUT", 30 * 86400))
+CONTENT_BLOCK_MAX_AGE = int(os.getenv("CONTENT_BLOCK_MAX_AGE", 365 * 86400))
 
 STORAGES = {
     "default": {
@@ -116,4 +152,23 @@ STORAGES = {
     },
 }
 
+# Query budgets per "<METHOD> <url name>", enforced by ferrum_common.query_budget.QueryBudgetMiddleware in tests.
+QUERY_BUDGET_ENABLED = os.getenv("QUERY_BUDGET_ENABLED", str(DEBUG)).lower() == "true"
+QUERY_BUDGET_N_PLUS_ONE_THRESHOLD = int(os.getenv("QUERY_BUDGET_N_PLUS_ONE_THRESHOLD", 3))
+QUERY_BUDGETS = {
+    "GET published-page-list": 2,
+    "GET published-page-detail": 2,
+    "GET compiled-page-list": 3,
+    "GET compiled-page-detail": 3,
+    "GET content-block-list": 1,
+    "GET public-news-list": 3,
+    "GET public-news-detail": 3,
+    "GET public-news-tags": 2,
+    "PATCH page-blocks": 8,
+}
 
+# OpenTelemetry tracing (ferrum_common.tracing): "memory", "console", "file" (JSON lines in TRACING_FILE_PATH)
+# or a dotted path to an exporter class, e.g. the OTLP one. Empty disables tracing.
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "")
+TRACING_FILE_PATH = os.getenv("TRACING_FILE_PATH", str(BASE_DIR / "traces.jsonl"))
+TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "content_service")
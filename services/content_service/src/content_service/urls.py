@@ -8,20 +8,33 @@ from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
 from rest_framework.routers import DefaultRouter
 
 from api.news import NewsViewSet, PublicNewsViewSet
-from api.pages import PageTemplateViewSet, PageViewSet, PublishedPageViewSet
+from api.pages import (
+    CompiledPageViewSet,
+    ContentBlockViewSet,
+    PageTemplateViewSet,
+    PageViewSet,
+    PublishedPageViewSet,
+)
+from api.storefront import PublicProductCardViewSet
+from ferrum_common.metrics import metrics_view
 
 router = DefaultRouter()
 router.register(r"news", NewsViewSet, basename="news")
 router.register(r"pages", PageViewSet, basename="page")
 router.register(r"pages/templates", PageTemplateViewSet, basename="page-template")
 router.register(r"pages/published", PublishedPageViewSet, basename="published-page")
+router.register(r"pages/compiled", CompiledPageViewSet, basename="compiled-page")
+router.register(r"pages/blocks", ContentBlockViewSet, basename="content-block")
+router.register(r"public/products", PublicProductCardViewSet, basename="public-product")
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("metrics", metrics_view, name="metrics"),
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path("api/docs/", SpectacularSwaggerView.as_view(url_name="schema"), name="docs"),
     path("api/v1/", include(router.urls)),
     path("api/v1/public/news/", PublicNewsViewSet.as_view({"get": "list"}), name="public-news-list"),
+    path("api/v1/public/news/tags/", PublicNewsViewSet.as_view({"get": "tags"}), name="public-news-tags"),
     path(
         "api/v1/public/news/<int:pk>/",
         PublicNewsViewSet.as_view({"get": "retrieve"}),
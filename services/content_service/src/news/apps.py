@@ -8,4 +8,5 @@ class NewsConfig(AppConfig):
     name = "news"
     verbose_name = "Новости"
 
-
+    def ready(self) -> None:
+        from . import signals  # noqa: F401
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("news", "0001_initial"),
+        ("outbox", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="newsevent",
+            name="outbox_event",
+            field=models.OneToOneField(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="outbox.outboxevent",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="newsevent",
+            name="stream_id",
+            field=models.CharField(blank=True, max_length=128),
+        ),
+    ]
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+SEARCH_INDEX_SQL = "CREATE INDEX IF NOT EXISTS news_article_search_idx ON news_newsarticle USING gin (search_vector)"
+
+BACKFILL_SQL = """
+UPDATE news_newsarticle SET search_vector =
+    setweight(to_tsvector('russian', coalesce(title, '')), 'A')
+    || setweight(to_tsvector('simple', coalesce(tags, '[]'::jsonb)::text), 'A')
+    || setweight(to_tsvector('russian', coalesce(summary, '')), 'B')
+    || setweight(to_tsvector('russian', coalesce(body, '')), 'C')
+"""
+
+
+def backfill_tags(apps, schema_editor):
+    NewsArticle = apps.get_model("news", "NewsArticle")
+    NewsTag = apps.get_model("news", "NewsTag")
+    rows = []
+    for article_id, tags in NewsArticle.objects.values_list("id", "tags").iterator():
+        seen = set()
+        for tag in tags or ():
+            value = tag.strip().lower()[:64] if isinstance(tag, str) else ""
+            if value and value not in seen:
+                seen.add(value)
+                rows.append(NewsTag(article_id=article_id, tag=value))
+    NewsTag.objects.bulk_create(rows, batch_size=1000)
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute(SEARCH_INDEX_SQL)
+    schema_editor.execute(BACKFILL_SQL)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS news_article_search_idx")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("news", "0002_newsevent_outbox_event"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="newsarticle",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name="NewsTag",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("tag", models.CharField(max_length=64)),
+                (
+                    "article",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="tag_index",
+                        to="news.newsarticle",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Тег новости",
+                "verbose_name_plural": "Теги новостей",
+                "constraints": [
+                    models.UniqueConstraint(fields=("tag", "article"), name="news_tag_article_uniq"),
+                ],
+            },
+        ),
+        migrations.RunPython(backfill_tags, migrations.RunPython.noop),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("news", "0003_newstag_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="newsarticle",
+            index=models.Index(fields=["status", "-published_at", "-id"], name="news_article_feed_idx"),
+        ),
+    ]
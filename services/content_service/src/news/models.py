@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
 from django.utils import timezone
 
@@ -25,11 +26,15 @@ class NewsArticle(models.Model):
     seo_description = models.CharField(max_length=512, blank=True)
     tags = models.JSONField(default=list, blank=True)
     featured = models.BooleanField(default=False)
+    search_vector = SearchVectorField(null=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ("-published_at", "-created_at")
+        indexes = [
+            models.Index(fields=["status", "-published_at", "-id"], name="news_article_feed_idx"),
+        ]
         verbose_name = "Новость"
         verbose_name_plural = "Новости"
 
@@ -48,6 +53,23 @@ class NewsArticle(models.Model):
         return self.title
 
 
+class NewsTag(models.Model):
+    """Нормализованный индекс тегов новости (источник — ``NewsArticle.tags``)."""
+
+    article = models.ForeignKey(NewsArticle, related_name="tag_index", on_delete=models.CASCADE)
+    tag = models.CharField(max_length=64)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["tag", "article"], name="news_tag_article_uniq"),
+        ]
+        verbose_name = "Тег новости"
+        verbose_name_plural = "Теги новостей"
+
+    def __str__(self) -> str:  # pragma: no cover
+        return self.tag
+
+
 class NewsChangelog(models.Model):
     """Изменения по выпуску/фиче внутри новости."""
 
@@ -79,7 +101,10 @@ class NewsEvent(models.Model):
     """Лог передачи события о публикации в внешние системы через Redis Streams."""
 
     article = models.ForeignKey(NewsArticle, related_name="events", on_delete=models.CASCADE)
-    stream_id = models.CharField(max_length=128)
+    stream_id = models.CharField(max_length=128, blank=True)
+    outbox_event = models.OneToOneField(
+        "outbox.OutboxEvent", null=True, blank=True, on_delete=models.SET_NULL, related_name="+"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     payload = models.JSONField()
 
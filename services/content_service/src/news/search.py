@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, List
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import Count, Exists, F, FloatField, OuterRef, QuerySet
+from django.db.models.functions import Cast
+
+from .models import NewsArticle, NewsTag
+
+SEARCH_CONFIG = "russian"
+SEARCH_RANK_FIELD = "search_rank"
+MAX_TAG_LENGTH = 64
+# Fields feeding the search document and the tag index; saves touching only other columns skip the refresh.
+SEARCH_SOURCE_FIELDS = frozenset({"title", "summary", "body", "tags"})
+
+_REFRESH_SQL = """
+UPDATE {article} SET search_vector =
+    setweight(to_tsvector('russian', coalesce(title, '')), 'A')
+    || setweight(to_tsvector('simple', coalesce(tags, '[]'::jsonb)::text), 'A')
+    || setweight(to_tsvector('russian', coalesce(summary, '')), 'B')
+    || setweight(to_tsvector('russian', coalesce(body, '')), 'C')
+WHERE id = ANY(%s)
+"""
+
+
+def is_full_text_available() -> bool:
+    return connection.vendor == "postgresql"
+
+
+def normalize_tags(tags: Iterable) -> List[str]:
+    """Lower-cased, stripped, de-duplicated tags in their original order."""
+    normalized = []
+    for tag in tags or ():
+        if not isinstance(tag, str):
+            continue
+        value = tag.strip().lower()[:MAX_TAG_LENGTH]
+        if value and value not in normalized:
+            normalized.append(value)
+    return normalized
+
+
+def refresh_search_vectors(article_ids: Iterable[int]) -> None:
+    """Rebuild the ``tsvector`` document of the given articles in one UPDATE."""
+    ids = list(article_ids)
+    if not ids or not is_full_text_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(_REFRESH_SQL.format(article=connection.ops.quote_name(NewsArticle._meta.db_table)), [ids])
+
+
+def sync_tags(article: NewsArticle) -> None:
+    """Bring ``NewsTag`` rows of ``article`` in line with ``article.tags``."""
+    tags = normalize_tags(article.tags)
+    NewsTag.objects.filter(article=article).exclude(tag__in=tags).delete()
+    NewsTag.objects.bulk_create([NewsTag(article=article, tag=tag) for tag in tags], ignore_conflicts=True)
+
+
+def filter_by_tags(queryset: QuerySet, tags: Iterable[str]) -> QuerySet:
+    """Articles carrying every tag of ``tags``, looked up through the ``(tag, article)`` index."""
+    for tag in normalize_tags(tags):
+        queryset = queryset.filter(Exists(NewsTag.objects.filter(article=OuterRef("pk"), tag=tag)))
+    return queryset
+
+
+def tag_facets(queryset: QuerySet) -> List[Dict[str, object]]:
+    """Tag counts over the articles of ``queryset`` in one grouped query, most used first."""
+    return list(
+        NewsTag.objects.filter(article__in=queryset.order_by().values("pk"))
+        .values("tag")
+        .annotate(count=Count("article_id"))
+        .order_by("-count", "tag")
+    )
+
+
+def search_news(queryset: QuerySet, query: str) -> QuerySet:
+    """
+    Rank ``queryset`` against ``query`` with Russian stemming.
+
+    Matches are served by the GIN index on ``search_vector``; the title and
+    tags weigh more than the summary, the summary more than the body.
+    """
+    ts_query = SearchQuery(query, config=SEARCH_CONFIG, search_type="websearch")
+    return (
+        queryset.filter(search_vector=ts_query)
+        .annotate(**{SEARCH_RANK_FIELD: Cast(SearchRank(F("search_vector"), ts_query), FloatField())})
+        .order_by(f"-{SEARCH_RANK_FIELD}", "-published_at", "-id")
+    )
@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from django.db.models import OuterRef, Subquery
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from ferrum_common.outbox.models import OutboxEvent
+from ferrum_common.outbox.signals import events_published
+
+from .models import NewsArticle, NewsEvent
+from .search import SEARCH_SOURCE_FIELDS, refresh_search_vectors, sync_tags
+
+
+@receiver(post_save, sender=NewsArticle)
+def sync_search_index(sender, instance: NewsArticle, update_fields=None, **kwargs):
+    if update_fields is not None and not SEARCH_SOURCE_FIELDS.intersection(update_fields):
+        return
+    sync_tags(instance)
+    refresh_search_vectors([instance.pk])
+
+
+@receiver(events_published)
+def store_stream_ids(sender, events, **kwargs):
+    """Copy stream ids of relayed events into the news event log with one UPDATE."""
+    NewsEvent.objects.filter(outbox_event_id__in=[event.pk for event in events]).update(
+        stream_id=Subquery(OutboxEvent.objects.filter(pk=OuterRef("outbox_event_id")).values("stream_id")[:1])
+    )
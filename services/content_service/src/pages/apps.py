@@ -8,4 +8,5 @@ class PagesConfig(AppConfig):
     name = "pages"
     verbose_name = "Конструктор страниц"
 
-
+    def ready(self) -> None:
+        from . import signals  # noqa: F401
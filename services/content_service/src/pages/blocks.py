@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Tuple
+
+import orjson
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from .models import CompiledPage, ContentBlock, Page
+
+logger = logging.getLogger(__name__)
+
+BLOCK_KEY = "content:block:{digest}"
+
+
+def block_digest(body: Any) -> str:
+    """SHA-256 of the canonical JSON of ``body``: equal content, equal digest."""
+    return hashlib.sha256(orjson.dumps(body, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)).hexdigest()
+
+
+def compile_layout(blocks: Any) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Split ``Page.blocks`` into a layout and the sections it references.
+
+    Every item of ``blocks["sections"]`` is replaced by its digest; the rest
+    of the document (page ``props`` and any other keys) stays in the layout.
+    Returns the layout and the sections by digest.
+    """
+    if not isinstance(blocks, dict) or not isinstance(blocks.get("sections"), list):
+        return blocks, {}
+    sections: Dict[str, Any] = {}
+    digests = []
+    for section in blocks["sections"]:
+        digest = block_digest(section)
+        sections.setdefault(digest, section)
+        digests.append(digest)
+    return {**blocks, "sections": digests}, sections
+
+
+def compile_pages(page_ids: Iterable[int]) -> int:
+    """
+    Compile pages into ``CompiledPage`` rows and the shared ``ContentBlock`` store.
+
+    A section shared by thousands of landing pages is stored once; compiling
+    it again only refreshes ``referenced_at``, which keeps it from being
+    pruned. Returns the number of compiled pages.
+    """
+    rows = Page.objects.filter(pk__in=list(page_ids)).values_list("pk", "blocks")
+    compiled: List[CompiledPage] = []
+    store: Dict[str, Any] = {}
+    for page_id, blocks in rows:
+        layout, sections = compile_layout(blocks)
+        store.update(sections)
+        compiled.append(
+            CompiledPage(
+                page_id=page_id,
+                layout=layout,
+                block_digests=list(sections),
+                digest=block_digest(layout),
+            )
+        )
+    if not compiled:
+        return 0
+    ContentBlock.objects.bulk_create(
+        [ContentBlock(digest=digest, body=body) for digest, body in store.items()],
+        update_conflicts=True,
+        unique_fields=["digest"],
+        update_fields=["referenced_at"],
+    )
+    CompiledPage.objects.bulk_create(
+        compiled,
+        update_conflicts=True,
+        unique_fields=["page"],
+        update_fields=["layout", "block_digests", "digest", "compiled_at"],
+    )
+    return len(compiled)
+
+
+def get_blocks(digests: Iterable[str]) -> Dict[str, Any]:
+    """Block bodies by digest from Redis, then the database; unknown digests are left out."""
+    digests = list(dict.fromkeys(digests))
+    if not digests:
+        return {}
+    try:
+        cached = cache.get_many([BLOCK_KEY.format(digest=digest) for digest in digests])
+    except Exception as exc:  # pragma: no cover - network errors
+        logger.warning("Failed to read content blocks: %s", exc)
+        cached = {}
+    found = {}
+    for digest in digests:
+        key = BLOCK_KEY.format(digest=digest)
+        if key in cached:
+            found[digest] = cached[key]
+    missing = [digest for digest in digests if digest not in found]
+    if missing:
+        loaded = dict(ContentBlock.objects.filter(digest__in=missing).values_list("digest", "body"))
+        if loaded:
+            try:
+                # Blocks never change, only the cache size bounds how long they stay.
+                cache.set_many(
+                    {BLOCK_KEY.format(digest=digest): body for digest, body in loaded.items()},
+                    timeout=getattr(settings, "CONTENT_BLOCK_CACHE_TIMEOUT", None),
+                )
+            except Exception as exc:  # pragma: no cover - network errors
+                logger.warning("Failed to store content blocks: %s", exc)
+        found.update(loaded)
+    return {digest: found[digest] for digest in digests if digest in found}
+
+
+def prune_blocks(grace: timedelta = timedelta(days=1), chunk_size: int = 1000) -> Tuple[int, int]:
+    """
+    Drop compiled copies of unpublished pages and blocks no compiled page references.
+
+    Blocks compiled within ``grace`` are kept, so a page compiled in a
+    transaction that has not committed yet never loses its sections.
+    Returns ``(pages, blocks)`` removed.
+    """
+    cutoff = timezone.now() - grace
+    pages, _ = CompiledPage.objects.exclude(page__status=Page.Status.PUBLISHED).delete()
+    referenced = set()
+    for digests in CompiledPage.objects.values_list("block_digests", flat=True).iterator(chunk_size=chunk_size):
+        referenced.update(digests)
+    orphans = [
+        digest
+        for digest in ContentBlock.objects.filter(referenced_at__lt=cutoff).values_list("digest", flat=True)
+        if digest not in referenced
+    ]
+    for start in range(0, len(orphans), chunk_size):
+        ContentBlock.objects.filter(digest__in=orphans[start : start + chunk_size], referenced_at__lt=cutoff).delete()
+    return pages, len(orphans)
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, List
+
+from django.conf import settings
+
+from common.http_cache import invalidate_collection
+from ferrum_common.outbox.services import enqueue_events
+
+from .blocks import compile_pages
+from .models import Page, PageEvent
+
+PAGE_AGGREGATE = "page"
+PAGES_CACHE_COLLECTION = "pages"
+
+
+def page_event_payload(page: Page) -> Dict[str, str]:
+    return {
+        "page_id": str(page.id),
+        "slug": page.slug,
+        "locale": page.locale,
+        "published_at": page.published_at.isoformat() if page.published_at else "",
+    }
+
+
+def publish_page_events(pages: Iterable[Page]) -> List[PageEvent]:
+    """
+    Record publication events for ``pages`` with one INSERT per table.
+
+    Call inside the transaction that published the pages: the pages are
+    compiled into the block store, the outbox relay pushes the events to
+    ``PAGE_STREAM`` in one pipeline, and the public page cache is
+    invalidated once for the whole batch after commit.
+    """
+    pages = list(pages)
+    if not pages:
+        return []
+    compile_pages(page.pk for page in pages)
+    invalidate_collection(PAGES_CACHE_COLLECTION, [f"{PAGES_CACHE_COLLECTION}-{page.pk}" for page in pages])
+    stream = getattr(settings, "PAGE_STREAM", None)
+    if not stream:
+        return []
+    payloads = [page_event_payload(page) for page in pages]
+    events = enqueue_events(
+        (stream, PAGE_AGGREGATE, page.pk, payload) for page, payload in zip(pages, payloads)
+    )
+    return PageEvent.objects.bulk_create(
+        PageEvent(page=page, payload=payload, outbox_event=event)
+        for page, payload, event in zip(pages, payloads, events)
+    )
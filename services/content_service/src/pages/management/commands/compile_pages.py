@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from pages.blocks import compile_pages, prune_blocks
+from pages.models import Page
+
+
+class Command(BaseCommand):
+    help = "Компилирует опубликованные страницы в общее хранилище блоков."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument("--prune", action="store_true", help="Удалить блоки, на которые не ссылается ни одна страница.")
+        parser.add_argument("--grace-hours", type=float, default=24.0, help="Не удалять блоки моложе, ч.")
+
+    def handle(self, *args, **options):
+        ids = list(Page.objects.filter(status=Page.Status.PUBLISHED).order_by("pk").values_list("pk", flat=True))
+        compiled = 0
+        for start in range(0, len(ids), options["batch_size"]):
+            compiled += compile_pages(ids[start : start + options["batch_size"]])
+        self.stdout.write(f"Скомпилировано страниц: {compiled}")
+        if options["prune"]:
+            pages, blocks = prune_blocks(timedelta(hours=options["grace_hours"]))
+            self.stdout.write(f"Удалено скомпилированных страниц: {pages}, блоков: {blocks}")
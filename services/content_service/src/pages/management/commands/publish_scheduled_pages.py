@@ -0,0 +1,29 @@
+from __future__ import annotations
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from api.pages import warm_published_pages
+from pages.scheduler import publish_due_pages
+
+
+class Command(BaseCommand):
+    help = "Публикует страницы, у которых наступило время publish_at."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument("--loop", action="store_true", help="Работать постоянно, проверяя расписание.")
+        parser.add_argument("--interval", type=float, default=5.0, help="Пауза между проверками, сек.")
+        parser.add_argument("--no-warm", action="store_true", help="Не прогревать кэш опубликованных страниц.")
+
+    def handle(self, *args, **options):
+        while True:
+            pages = publish_due_pages(options["batch_size"])
+            if pages:
+                warmed = 0 if options["no_warm"] else warm_published_pages(page.slug for page in pages)
+                self.stdout.write(f"Опубликовано страниц: {len(pages)}, прогрето: {warmed}")
+            if not options["loop"] and not pages:
+                return
+            if not pages:
+                time.sleep(options["interval"])
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from news.models import NewsArticle, NewsTag
+from news.search import normalize_tags, refresh_search_vectors
+from pages.blocks import compile_pages
+from pages.models import Page
+
+PREFIX = "bench"
+TAGS = ("релиз", "магазин", "доставка", "оплата", "конструктор", "seo", "api", "акции")
+
+
+def page_blocks(index: int, sections: int) -> dict:
+    # Landing pages share most of their sections, like pages built from one template.
+    return {
+        "props": {"theme": ("light", "dark")[index % 2]},
+        "sections": [
+            {
+                "type": ("hero", "gallery", "text", "products", "faq")[section % 5],
+                "props": {
+                    "title": f"Секция {section}" if section % 3 else f"Секция {section} страницы {index}",
+                    "text": "Текст блока для нагрузочного теста. " * 8,
+                    "items": [{"id": item, "label": f"Элемент {item}"} for item in range(6)],
+                },
+            }
+            for section in range(sections)
+        ],
+    }
+
+
+def seed_pages(count: int, sections: int, batch_size: int = 500) -> int:
+    now = timezone.now()
+    created = 0
+    for start in range(0, count, batch_size):
+        pages = Page.objects.bulk_create(
+            [
+                Page(
+                    title=f"Страница {index}",
+                    slug=f"{PREFIX}-page-{index}",
+                    status=Page.Status.PUBLISHED,
+                    blocks=page_blocks(index, sections),
+                    seo_title=f"Страница {index}",
+                    published_at=now,
+                )
+                for index in range(start, min(start + batch_size, count))
+            ]
+        )
+        compile_pages([page.pk for page in pages])
+        created += len(pages)
+    return created
+
+
+def seed_news(count: int, batch_size: int = 500) -> int:
+    now = timezone.now()
+    created = 0
+    for start in range(0, count, batch_size):
+        articles = NewsArticle.objects.bulk_create(
+            [
+                NewsArticle(
+                    title=f"Обновление платформы {index}",
+                    slug=f"{PREFIX}-news-{index}",
+                    summary="Краткое описание обновления.",
+                    body="Подробности обновления платформы Ferrum. " * 40,
+                    status=NewsArticle.Status.PUBLISHED,
+                    published_at=now - timedelta(minutes=index),
+                    tags=[TAGS[index % len(TAGS)], TAGS[(index * 3 + 1) % len(TAGS)]],
+                )
+                for index in range(start, min(start + batch_size, count))
+            ]
+        )
+        NewsTag.objects.bulk_create(
+            [NewsTag(article=article, tag=tag) for article in articles for tag in normalize_tags(article.tags)],
+            ignore_conflicts=True,
+        )
+        refresh_search_vectors(article.pk for article in articles)
+        created += len(articles)
+    return created
+
+
+class Command(BaseCommand):
+    help = "Заполняет базу синтетическими данными для бенчмарков: опубликованные страницы и новости."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--pages", type=int, default=10_000)
+        parser.add_argument("--sections", type=int, default=12, help="Секций на страницу.")
+        parser.add_argument("--news", type=int, default=2_000)
+
+    def handle(self, *args, **options):
+        if Page.objects.filter(slug__startswith=f"{PREFIX}-").exists():
+            self.stdout.write("Данные для бенчмарков уже загружены.")
+            return
+        with transaction.atomic():
+            pages = seed_pages(options["pages"], options["sections"])
+            news = seed_news(options["news"])
+        self.stdout.write(f"Страниц: {pages}, новостей: {news}")
@@ -0,0 +1,16 @@
+from __future__ import annotations
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("pages", "0002_pageevent_outbox_event"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="page",
+            index=models.Index(fields=["status", "publish_at"], name="pages_page_schedule_idx"),
+        ),
+    ]
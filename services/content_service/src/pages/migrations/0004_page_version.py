@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("pages", "0003_page_schedule_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="page",
+            name="version",
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
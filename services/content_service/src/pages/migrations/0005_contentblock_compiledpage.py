@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("pages", "0004_page_version"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ContentBlock",
+            fields=[
+                ("digest", models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ("body", models.JSONField()),
+                ("referenced_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Блок контента",
+                "verbose_name_plural": "Блоки контента",
+            },
+        ),
+        migrations.CreateModel(
+            name="CompiledPage",
+            fields=[
+                (
+                    "page",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="compiled",
+                        serialize=False,
+                        to="pages.page",
+                    ),
+                ),
+                ("layout", models.JSONField()),
+                ("block_digests", models.JSONField(default=list)),
+                ("digest", models.CharField(max_length=64)),
+                ("compiled_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Скомпилированная страница",
+                "verbose_name_plural": "Скомпилированные страницы",
+            },
+        ),
+    ]
@@ -53,11 +53,15 @@ class Page(models.Model):
     published_at = models.DateTimeField(blank=True, null=True)
     created_by = models.CharField(max_length=128, blank=True)
     updated_by = models.CharField(max_length=128, blank=True)
+    version = models.PositiveIntegerField(default=1)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ("slug",)
+        indexes = [
+            models.Index(fields=["status", "publish_at"], name="pages_page_schedule_idx"),
+        ]
         verbose_name = "Страница"
         verbose_name_plural = "Страницы"
 
@@ -70,9 +74,44 @@ class Page(models.Model):
         return self.slug
 
 
+class ContentBlock(models.Model):
+    """Immutable section of published pages, stored once per distinct content."""
+
+    digest = models.CharField(primary_key=True, max_length=64)
+    body = models.JSONField()
+    referenced_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Блок контента"
+        verbose_name_plural = "Блоки контента"
+
+    def __str__(self) -> str:  # pragma: no cover
+        return self.digest
+
+
+class CompiledPage(models.Model):
+    """Published ``Page.blocks`` with sections replaced by ``ContentBlock`` digests."""
+
+    page = models.OneToOneField(Page, primary_key=True, on_delete=models.CASCADE, related_name="compiled")
+    layout = models.JSONField()
+    block_digests = models.JSONField(default=list)
+    digest = models.CharField(max_length=64)
+    compiled_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Скомпилированная страница"
+        verbose_name_plural = "Скомпилированные страницы"
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"{self.page_id} -> {self.digest}"
+
+
 class PageEvent(models.Model):
     page = models.ForeignKey(Page, related_name="events", on_delete=models.CASCADE)
-    stream_id = models.CharField(max_length=128)
+    stream_id = models.CharField(max_length=128, blank=True)
+    outbox_event = models.OneToOneField(
+        "outbox.OutboxEvent", null=True, blank=True, on_delete=models.SET_NULL, related_name="+"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     payload = models.JSONField()
 
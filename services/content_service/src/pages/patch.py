@@ -0,0 +1,303 @@
+from __future__ import annotations
+
+import copy
+import re
+from dataclasses import dataclass
+from typing import Any, List, Optional, Sequence, Tuple
+
+from django.db import DatabaseError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ferrum_common.renderers import dumps
+
+from .models import Page
+
+OPERATIONS = ("add", "remove", "replace", "move", "copy", "test")
+BLOCKS_POINTER = "/sections"
+# Pointer tokens PostgreSQL reads differently from RFC 6901: negative or zero-padded indices.
+_AMBIGUOUS_TOKEN = re.compile(r"-\d*|0\d+")
+_INDEX = re.compile(r"0|[1-9]\d*")
+
+
+class PatchError(ValueError):
+    """The patch is malformed or cannot be applied to the document."""
+
+
+class VersionConflict(Exception):
+    """The page changed since the version the client edited."""
+
+    def __init__(self, current: Optional[int]):
+        super().__init__(current)
+        self.current = current
+
+
+@dataclass(frozen=True)
+class Operation:
+    op: str
+    path: Tuple[str, ...]
+    value: Any = None
+    from_path: Tuple[str, ...] = ()
+
+
+def parse_pointer(pointer: Any) -> Tuple[str, ...]:
+    """Split an RFC 6901 JSON Pointer into unescaped reference tokens."""
+    if not isinstance(pointer, str) or (pointer and not pointer.startswith("/")):
+        raise PatchError(f"Некорректный JSON Pointer: {pointer!r}.")
+    if not pointer:
+        return ()
+    return tuple(token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/"))
+
+
+def _block_pointer(block: Any, pointer: Any) -> str:
+    if not (block == "-" or (isinstance(block, int) and not isinstance(block, bool) and block >= 0)):
+        raise PatchError(f"Некорректный номер блока: {block!r}.")
+    return f"{BLOCKS_POINTER}/{block}{pointer or ''}"
+
+
+def parse_operations(operations: Any) -> List[Operation]:
+    """
+    Validate a JSON Patch document.
+
+    Besides plain RFC 6902 operations, an operation may carry ``block`` (and
+    ``from_block``): an index in ``blocks.sections`` that its ``path``
+    (``from``) is relative to, e.g. ``{"op": "replace", "block": 3,
+    "path": "/props/title", "value": "..."}``.
+    """
+    if not isinstance(operations, list):
+        raise PatchError("Ожидается массив операций JSON Patch.")
+    parsed = []
+    for raw in operations:
+        if not isinstance(raw, dict) or raw.get("op") not in OPERATIONS:
+            raise PatchError(f"Неизвестная операция: {raw!r}.")
+        path = raw.get("path", "" if "block" in raw else None)
+        if "block" in raw:
+            path = _block_pointer(raw["block"], path)
+        if raw["op"] in ("add", "replace", "test") and "value" not in raw:
+            raise PatchError(f"Операции {raw['op']} нужно поле value.")
+        from_path: Tuple[str, ...] = ()
+        if raw["op"] in ("move", "copy"):
+            source = raw.get("from", "" if "from_block" in raw else None)
+            if "from_block" in raw:
+                source = _block_pointer(raw["from_block"], source)
+            from_path = parse_pointer(source)
+        parsed.append(Operation(raw["op"], parse_pointer(path), raw.get("value"), from_path))
+    return parsed
+
+
+def _index(container: list, token: str, allow_end: bool) -> int:
+    if allow_end and token == "-":
+        return len(container)
+    if not _INDEX.fullmatch(token):
+        raise PatchError(f"Некорректный индекс массива: {token!r}.")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise PatchError(f"Индекс {index} за пределами массива.")
+    return index
+
+
+def _resolve(document: Any, path: Sequence[str]) -> Any:
+    for token in path:
+        if isinstance(document, dict):
+            if token not in document:
+                raise PatchError(f"Путь /{'/'.join(path)} не найден.")
+            document = document[token]
+        elif isinstance(document, list):
+            document = document[_index(document, token, allow_end=False)]
+        else:
+            raise PatchError(f"Путь /{'/'.join(path)} не найден.")
+    return document
+
+
+def _add(document: Any, path: Sequence[str], value: Any) -> Any:
+    if not path:
+        return value
+    parent = _resolve(document, path[:-1])
+    if isinstance(parent, dict):
+        parent[path[-1]] = value
+    elif isinstance(parent, list):
+        parent.insert(_index(parent, path[-1], allow_end=True), value)
+    else:
+        raise PatchError(f"Путь /{'/'.join(path)} не найден.")
+    return document
+
+
+def _remove(document: Any, path: Sequence[str]) -> Tuple[Any, Any]:
+    if not path:
+        raise PatchError("Нельзя удалить весь документ.")
+    parent = _resolve(document, path[:-1])
+    if isinstance(parent, dict):
+        if path[-1] not in parent:
+            raise PatchError(f"Путь /{'/'.join(path)} не найден.")
+        return document, parent.pop(path[-1])
+    if isinstance(parent, list):
+        return document, parent.pop(_index(parent, path[-1], allow_end=False))
+    raise PatchError(f"Путь /{'/'.join(path)} не найден.")
+
+
+def apply_patch(document: Any, operations: Sequence[Operation]) -> Any:
+    """Apply RFC 6902 ``operations`` to ``document`` in place and return the result."""
+    for operation in operations:
+        path = operation.path
+        if operation.op == "add":
+            document = _add(document, path, copy.deepcopy(operation.value))
+        elif operation.op == "remove":
+            document, _ = _remove(document, path)
+        elif operation.op == "replace":
+            if path:
+                document, _ = _remove(document, path)
+            document = _add(document, path, copy.deepcopy(operation.value))
+        elif operation.op == "move":
+            if path[: len(operation.from_path)] == operation.from_path and path != operation.from_path:
+                raise PatchError("Нельзя переместить значение внутрь самого себя.")
+            document, value = _remove(document, operation.from_path)
+            document = _add(document, path, value)
+        elif operation.op == "copy":
+            document = _add(document, path, copy.deepcopy(_resolve(document, operation.from_path)))
+        elif operation.op == "test":
+            if not _equal(_resolve(document, path), operation.value):
+                raise PatchError(f"Проверка значения /{'/'.join(path)} не прошла.")
+    return document
+
+
+def _equal(left: Any, right: Any) -> bool:
+    # RFC 6902 compares numbers by value but never equates booleans with numbers.
+    if isinstance(left, bool) or isinstance(right, bool):
+        return type(left) is type(right) and left == right
+    if isinstance(left, dict) and isinstance(right, dict):
+        return left.keys() == right.keys() and all(_equal(left[key], right[key]) for key in left)
+    if isinstance(left, list) and isinstance(right, list):
+        return len(left) == len(right) and all(_equal(a, b) for a, b in zip(left, right))
+    numbers = isinstance(left, (int, float)) and isinstance(right, (int, float))
+    return (numbers or type(left) is type(right)) and left == right
+
+
+def _sql_step(operation: Operation) -> Optional[Tuple[str, List[Any]]]:
+    """
+    One ``jsonb`` expression over the previous document ``doc`` for ``operation``.
+
+    The expression is NULL when the operation does not apply, so a failed
+    step voids the whole UPDATE. Returns ``None`` for operations that are
+    left to the Python implementation.
+    """
+    path = list(operation.path)
+    tokens = path[:-1] if operation.op == "add" and path and path[-1] == "-" else path
+    if operation.op not in ("add", "remove", "replace", "test") or any(
+        _AMBIGUOUS_TOKEN.fullmatch(token) for token in tokens
+    ):
+        return None
+    value = None if operation.op == "remove" else _jsonb(operation.value)
+    if not path:
+        if operation.op == "add" or operation.op == "replace":
+            return "CASE WHEN doc IS NOT NULL THEN %s::jsonb END", [value]
+        if operation.op == "test":
+            return "CASE WHEN doc = %s::jsonb THEN doc END", [value]
+        return None
+    if operation.op == "replace":
+        return (
+            "CASE WHEN doc #> %s::text[] IS NOT NULL THEN jsonb_set(doc, %s::text[], %s::jsonb, false) END",
+            [path, path, value],
+        )
+    if operation.op == "remove":
+        return "CASE WHEN doc #> %s::text[] IS NOT NULL THEN doc #- %s::text[] END", [path, path]
+    if operation.op == "test":
+        return "CASE WHEN doc #> %s::text[] = %s::jsonb THEN doc END", [path, value]
+    parent, last = path[:-1], path[-1]
+    if last == "-":
+        array_insert = "jsonb_set(doc, %s::text[] || jsonb_array_length(doc #> %s::text[])::text, %s::jsonb, true)"
+        array_params = [parent, parent, value]
+    elif _INDEX.fullmatch(last):
+        array_insert = (
+            "CASE WHEN %s <= jsonb_array_length(doc #> %s::text[]) "
+            "THEN jsonb_insert(doc, %s::text[], %s::jsonb, false) END"
+        )
+        array_params = [int(last), parent, path, value]
+    else:
+        array_insert, array_params = "NULL", []
+    return (
+        "CASE jsonb_typeof(doc #> %s::text[]) WHEN 'object' THEN jsonb_set(doc, %s::text[], %s::jsonb, true) "
+        f"WHEN 'array' THEN {array_insert} END",
+        [parent, path, value, *array_params],
+    )
+
+
+def _jsonb(value: Any) -> str:
+    return dumps(value).decode()
+
+
+def _patch_sql(page_id: int, version: int, operations: Sequence[Operation]) -> Optional[Tuple[str, List[Any]]]:
+    steps = [_sql_step(operation) for operation in operations]
+    if any(step is None for step in steps):
+        return None
+    table = Page._meta.db_table
+    ctes = [f"s0 AS (SELECT blocks AS doc FROM {table} WHERE id = %s AND version = %s)"]
+    params: List[Any] = [page_id, version]
+    for number, (expression, step_params) in enumerate(steps, start=1):
+        ctes.append(f"s{number} AS (SELECT {expression} AS doc FROM s{number - 1})")
+        params.extend(step_params)
+    last = f"s{len(steps)}"
+    sql = (
+        f"WITH {', '.join(ctes)} "
+        f"UPDATE {table} SET blocks = {last}.doc, version = {table}.version + 1, updated_at = %s "
+        f"FROM {last} WHERE {table}.id = %s AND {table}.version = %s AND {last}.doc IS NOT NULL "
+        f"RETURNING {table}.version, {table}.status, {table}.slug, {table}.locale, {table}.published_at"
+    )
+    return sql, [*params, timezone.now(), page_id, version]
+
+
+def _patch_in_database(page_id: int, version: int, operations: Sequence[Operation]) -> Optional[Page]:
+    statement = _patch_sql(page_id, version, operations)
+    if statement is None:
+        return None
+    try:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(*statement)
+            row = cursor.fetchone()
+    except DatabaseError:
+        # Values PostgreSQL rejects (e.g. a non-integer index into an array) get the Python error message.
+        return None
+    if row is None:
+        return None
+    new_version, status, slug, locale, published_at = row
+    return Page(id=page_id, version=new_version, status=status, slug=slug, locale=locale, published_at=published_at)
+
+
+def _patch_in_python(page_id: int, version: int, operations: Sequence[Operation]) -> Page:
+    page = (
+        Page.objects.select_for_update()
+        .only("id", "version", "blocks", "status", "slug", "locale", "published_at")
+        .filter(pk=page_id)
+        .first()
+    )
+    if page is None:
+        raise Page.DoesNotExist
+    if page.version != version:
+        raise VersionConflict(page.version)
+    blocks = apply_patch(page.blocks, operations)
+    updated = Page.objects.filter(pk=page_id, version=version).update(
+        blocks=blocks, version=F("version") + 1, updated_at=timezone.now()
+    )
+    if not updated:
+        raise VersionConflict(None)
+    page.blocks = blocks
+    page.version = version + 1
+    return page
+
+
+def patch_page_blocks(page_id: int, version: int, operations: Sequence[Operation]) -> Page:
+    """
+    Apply ``operations`` to ``Page.blocks`` if the page is still at ``version``.
+
+    On PostgreSQL the patch becomes a single conditional UPDATE built from
+    ``jsonb_set``/``jsonb_insert``/``#-``, so only the operations travel to the
+    database; ``move``/``copy``, other backends and patches that do not apply
+    go through ``apply_patch`` on the row locked with ``SELECT ... FOR UPDATE``,
+    which also produces the error message. Returns the page with ``version``,
+    ``status``, ``slug``, ``locale`` and ``published_at`` loaded; raises
+    ``VersionConflict``, ``PatchError`` or ``Page.DoesNotExist``.
+    """
+    if connection.vendor == "postgresql":
+        page = _patch_in_database(page_id, version, operations)
+        if page is not None:
+            return page
+    return _patch_in_python(page_id, version, operations)
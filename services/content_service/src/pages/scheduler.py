@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .events import publish_page_events
+from .models import Page
+
+SCHEDULABLE_STATUSES = (Page.Status.DRAFT, Page.Status.REVIEW)
+
+
+def due_pages(now: Optional[datetime] = None):
+    """Unpublished pages whose ``publish_at`` has passed, oldest first (``pages_page_schedule_idx``)."""
+    return Page.objects.filter(
+        status__in=SCHEDULABLE_STATUSES, publish_at__lte=now or timezone.now()
+    ).order_by("publish_at", "id")
+
+
+def publish_due_pages(batch_size: Optional[int] = None, now: Optional[datetime] = None) -> List[Page]:
+    """
+    Publish one batch of due pages and record their events.
+
+    Rows are claimed with ``SELECT ... FOR UPDATE SKIP LOCKED`` so several
+    schedulers can run side by side. ``published_at`` is the scheduled time,
+    not the moment the scheduler caught up. Each page gets a new ``version``,
+    so an edit made against the unpublished page fails its ``If-Match``
+    instead of reverting the publication.
+    """
+    batch_size = batch_size or getattr(settings, "PAGE_SCHEDULER_BATCH_SIZE", 200)
+    now = now or timezone.now()
+    with transaction.atomic():
+        pages = list(due_pages(now).select_for_update(skip_locked=True)[:batch_size])
+        if not pages:
+            return []
+        for page in pages:
+            page.status = Page.Status.PUBLISHED
+            page.published_at = page.publish_at
+            page.updated_at = now
+            page.version += 1
+        # The rows are locked above, so the versions read with them are still current.
+        Page.objects.bulk_update(pages, ["status", "published_at", "updated_at", "version"])
+        publish_page_events(pages)
+    return pages
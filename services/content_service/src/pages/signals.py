@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+from django.db.models import OuterRef, Subquery
+from django.dispatch import receiver
+
+from ferrum_common.outbox.models import OutboxEvent
+from ferrum_common.outbox.signals import events_published
+
+from .models import PageEvent
+
+
+@receiver(events_published)
+def store_stream_ids(sender, events, **kwargs):
+    """Copy stream ids of relayed events into the pages event log with one UPDATE."""
+    PageEvent.objects.filter(outbox_event_id__in=[event.pk for event in events]).update(
+        stream_id=Subquery(OutboxEvent.objects.filter(pk=OuterRef("outbox_event_id")).values("stream_id")[:1])
+    )
@@ -0,0 +1,9 @@
+from __future__ import annotations
+
+from django.apps import AppConfig
+
+
+class StorefrontConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "storefront"
+    verbose_name = "Витрина"
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from decimal import Decimal
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductCard",
+            fields=[
+                ("id", models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name="ID")),
+                ("product_id", models.PositiveBigIntegerField(unique=True)),
+                ("slug", models.SlugField(max_length=255)),
+                ("name", models.CharField(max_length=255)),
+                ("sku", models.CharField(max_length=64)),
+                ("price", models.DecimalField(decimal_places=2, default=Decimal("0.00"), max_digits=12)),
+                ("currency", models.CharField(default="RUB", max_length=3)),
+                ("category_id", models.PositiveBigIntegerField(blank=True, null=True)),
+                (
+                    "source_stream_id",
+                    models.CharField(help_text="ID последнего применённого события стрима.", max_length=64),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Карточка товара",
+                "verbose_name_plural": "Карточки товаров",
+                "ordering": ("name",),
+            },
+        ),
+    ]
@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("storefront", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="productcard",
+            name="is_visible",
+            field=models.BooleanField(
+                default=True, help_text="Ложь, если товар снят с публикации или удалён в каталоге."
+            ),
+        ),
+    ]
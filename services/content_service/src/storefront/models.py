@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from decimal import Decimal
+
+from django.db import models
+
+
+class ProductCard(models.Model):
+    """Денормализованная карточка товара из catalog_service, обновляется из стрима событий."""
+
+    product_id = models.PositiveBigIntegerField(unique=True)
+    slug = models.SlugField(max_length=255, db_index=True)
+    name = models.CharField(max_length=255)
+    sku = models.CharField(max_length=64)
+    price = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+    currency = models.CharField(max_length=3, default="RUB")
+    category_id = models.PositiveBigIntegerField(null=True, blank=True)
+    is_visible = models.BooleanField(
+        default=True, help_text="Ложь, если товар снят с публикации или удалён в каталоге."
+    )
+    source_stream_id = models.CharField(max_length=64, help_text="ID последнего применённого события стрима.")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ("name",)
+        verbose_name = "Карточка товара"
+        verbose_name_plural = "Карточки товаров"
+
+    def __str__(self) -> str:  # pragma: no cover
+        return self.name
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Sequence, Tuple
+
+from django.conf import settings
+from django.db import transaction
+
+from streams.registry import StreamMessage, register
+
+from .models import ProductCard
+
+CARD_FIELDS = [
+    "slug",
+    "name",
+    "sku",
+    "price",
+    "currency",
+    "category_id",
+    "is_visible",
+    "source_stream_id",
+    "updated_at",
+]
+
+
+def _stream_position(stream_id: str) -> Tuple[int, int]:
+    millis, _, sequence = stream_id.partition("-")
+    return int(millis), int(sequence or 0)
+
+
+def _card(message: StreamMessage) -> ProductCard:
+    fields = message.fields
+    try:
+        price = Decimal(fields.get("price") or "0")
+    except InvalidOperation:
+        price = Decimal("0")
+    category_id = fields.get("category_id")
+    return ProductCard(
+        product_id=int(fields["product_id"]),
+        slug=fields.get("slug", ""),
+        name=fields.get("name", ""),
+        sku=fields.get("sku", ""),
+        price=price,
+        currency=fields.get("currency") or "RUB",
+        category_id=int(category_id) if category_id and category_id.isdigit() else None,
+        # Events from before the unpublish flag existed were only sent for published products.
+        is_visible=fields.get("is_published", "true") == "true" and fields.get("deleted") != "true",
+        source_stream_id=message.id,
+    )
+
+
+@register(settings.CATALOG_PRODUCT_STREAM, group="content-storefront")
+def apply_product_events(messages: Sequence[StreamMessage]) -> None:
+    """
+    Upsert product cards from ``catalog:product`` events in one statement.
+
+    Only the newest event per product is applied, and cards already built
+    from a later stream entry are left alone, so redelivered or reclaimed
+    messages are harmless. Unpublished or deleted products keep their card
+    with ``is_visible=False``, so an older event cannot bring them back.
+    """
+    latest: Dict[int, ProductCard] = {}
+    for message in messages:
+        card = _card(message)
+        latest[card.product_id] = card
+
+    with transaction.atomic():
+        applied = dict(
+            ProductCard.objects.select_for_update()
+            .filter(product_id__in=latest)
+            .values_list("product_id", "source_stream_id")
+        )
+        cards = [
+            card
+            for product_id, card in latest.items()
+            if product_id not in applied
+            or _stream_position(card.source_stream_id) > _stream_position(applied[product_id])
+        ]
+        if cards:
+            ProductCard.objects.bulk_create(
+                cards, update_conflicts=True, unique_fields=["product_id"], update_fields=CARD_FIELDS
+            )
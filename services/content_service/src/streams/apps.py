@@ -0,0 +1,14 @@
+from __future__ import annotations
+
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class StreamsConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "streams"
+    verbose_name = "Потребители Redis Streams"
+
+    def ready(self) -> None:
+        # Handlers live in ``<app>/stream_handlers.py`` and register themselves on import.
+        autodiscover_modules("stream_handlers")
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import logging
+import threading
+from typing import List, Optional, Sequence
+
+import redis
+from django.conf import settings
+from django.db import close_old_connections
+
+from ferrum_common import tracing
+from ferrum_common.metrics import instrument_redis
+
+from .registry import BatchHandler, StreamMessage
+
+logger = logging.getLogger(__name__)
+
+
+def get_stream_connection() -> redis.Redis:
+    """Redis client for the shared event bus; may differ from the cache Redis."""
+    return instrument_redis(redis.Redis.from_url(settings.STREAMS_REDIS_URL, decode_responses=True))
+
+
+def _decode(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _messages(entries) -> List[StreamMessage]:
+    messages = []
+    for message_id, fields in entries or ():
+        if fields is None:  # entry was trimmed from the stream while pending
+            continue
+        messages.append(
+            StreamMessage(id=_decode(message_id), fields={_decode(k): _decode(v) for k, v in fields.items()})
+        )
+    return messages
+
+
+class StreamConsumer:
+    """
+    One member of a Redis consumer group feeding batches to a handler.
+
+    Each iteration first reclaims messages that another consumer left
+    pending for longer than ``claim_idle_ms`` (``XAUTOCLAIM``), then reads new
+    ones with a blocking ``XREADGROUP``. A batch is acknowledged only after the
+    handler succeeds. If a batch fails it is retried message by message so one
+    bad message does not hold back the rest; messages delivered
+    ``max_deliveries`` times are copied to ``<stream>:dead`` and acknowledged.
+    """
+
+    def __init__(
+        self,
+        connection: redis.Redis,
+        stream: str,
+        group: str,
+        consumer: str,
+        handler: BatchHandler,
+        *,
+        batch_size: int = 100,
+        block_ms: int = 5000,
+        claim_idle_ms: int = 60000,
+        max_deliveries: int = 5,
+    ):
+        self.connection = connection
+        self.stream = stream
+        self.group = group
+        self.consumer = consumer
+        self.handler = handler
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.claim_idle_ms = claim_idle_ms
+        self.max_deliveries = max_deliveries
+        self._claim_cursor = "0-0"
+
+    @property
+    def dead_letter_stream(self) -> str:
+        return f"{self.stream}:dead"
+
+    def ensure_group(self) -> None:
+        try:
+            self.connection.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except redis.ResponseError as exc:
+            if "BUSYGROUP" not in str(exc):
+                raise
+
+    def claim_stale(self) -> List[StreamMessage]:
+        reply = self.connection.xautoclaim(
+            self.stream,
+            self.group,
+            self.consumer,
+            min_idle_time=self.claim_idle_ms,
+            start_id=self._claim_cursor,
+            count=self.batch_size,
+        )
+        self._claim_cursor = _decode(reply[0])
+        return _messages(reply[1])
+
+    def read_new(self, block_ms: Optional[int] = None) -> List[StreamMessage]:
+        block = self.block_ms if block_ms is None else block_ms
+        # BLOCK 0 waits forever in Redis, so a zero timeout means "do not block".
+        reply = self.connection.xreadgroup(
+            self.group, self.consumer, {self.stream: ">"}, count=self.batch_size, block=block or None
+        )
+        return [message for _stream, entries in reply or () for message in _messages(entries)]
+
+    def run_once(self, block_ms: Optional[int] = None) -> int:
+        """Process reclaimed and new messages once; returns the number of acknowledged messages."""
+        handled = 0
+        stale = self.claim_stale()
+        if stale:
+            handled += self.process(stale)
+        fresh = self.read_new(block_ms=0 if stale else block_ms)
+        if fresh:
+            handled += self.process(fresh)
+        return handled
+
+    def run(self, stop: threading.Event) -> None:
+        self.ensure_group()
+        while not stop.is_set():
+            try:
+                self.run_once()
+            except redis.ConnectionError as exc:  # pragma: no cover - network errors
+                logger.warning("Stream %s consumer %s lost Redis: %s", self.stream, self.consumer, exc)
+                stop.wait(1)
+            finally:
+                close_old_connections()
+
+    def _process_span(self, messages: Sequence[StreamMessage]):
+        # A single message continues the producer's trace; a batch has many
+        # parents, so it starts its own trace linked to each of them.
+        attributes = {
+            "messaging.system": "redis",
+            "messaging.operation": "process",
+            "messaging.destination.name": self.stream,
+            "messaging.consumer.group.name": self.group,
+            "messaging.batch.message_count": len(messages),
+        }
+        if len(messages) == 1:
+            attributes["messaging.message.id"] = messages[0].id
+            return tracing.span(
+                f"process {self.stream}",
+                kind=tracing.SpanKind.CONSUMER,
+                attributes=attributes,
+                context=tracing.extract_context(messages[0].fields),
+            )
+        return tracing.span(
+            f"process {self.stream}",
+            kind=tracing.SpanKind.CONSUMER,
+            attributes=attributes,
+            context=tracing.extract_context({}),
+            links=tracing.links_from(message.fields for message in messages),
+        )
+
+    def process(self, messages: Sequence[StreamMessage]) -> int:
+        try:
+            with self._process_span(messages):
+                self.handler(messages)
+        except Exception:
+            if len(messages) == 1:
+                logger.exception("Handler failed for %s message %s", self.stream, messages[0].id)
+                self._dead_letter_if_exhausted(messages[0])
+                return 0
+            logger.warning("Batch of %s %s messages failed, retrying one by one", len(messages), self.stream)
+            return sum(self.process([message]) for message in messages)
+        self.connection.xack(self.stream, self.group, *[message.id for message in messages])
+        return len(messages)
+
+    def _dead_letter_if_exhausted(self, message: StreamMessage) -> None:
+        pending = self.connection.xpending_range(self.stream, self.group, min=message.id, max=message.id, count=1)
+        if not pending or pending[0]["times_delivered"] < self.max_deliveries:
+            return
+        logger.error("Moving %s message %s to %s", self.stream, message.id, self.dead_letter_stream)
+        pipeline = self.connection.pipeline()
+        pipeline.xadd(self.dead_letter_stream, {**message.fields, "source_id": message.id})
+        pipeline.xack(self.stream, self.group, message.id)
+        pipeline.execute()
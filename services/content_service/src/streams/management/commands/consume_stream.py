@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import os
+import signal
+import socket
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from streams.consumer import StreamConsumer, get_stream_connection
+from streams.registry import get_registration, registered_streams
+
+
+class Command(BaseCommand):
+    help = "Читает Redis Stream через consumer group и передаёт сообщения зарегистрированному обработчику."
+
+    def add_arguments(self, parser):
+        parser.add_argument("stream", nargs="?", help="Имя стрима; без аргумента выводит список обработчиков.")
+        parser.add_argument("--group", help="Consumer group (по умолчанию из регистрации обработчика).")
+        parser.add_argument("--consumer", help="Имя потребителя (по умолчанию host-pid).")
+        parser.add_argument("--workers", type=int, default=settings.STREAMS_WORKERS)
+        parser.add_argument("--batch-size", type=int, default=settings.STREAMS_BATCH_SIZE)
+        parser.add_argument("--block-ms", type=int, default=settings.STREAMS_BLOCK_MS)
+        parser.add_argument("--claim-idle-ms", type=int, default=settings.STREAMS_CLAIM_IDLE_MS)
+        parser.add_argument("--max-deliveries", type=int, default=settings.STREAMS_MAX_DELIVERIES)
+        parser.add_argument("--once", action="store_true", help="Обработать доступные сообщения и выйти.")
+
+    def handle(self, *args, **options):
+        stream = options["stream"]
+        if not stream:
+            for name in registered_streams():
+                registration = get_registration(name)
+                self.stdout.write(f"{name}\t{registration.group}\t{registration.handler.__module__}")
+            return
+        if options["workers"] < 1:
+            raise CommandError("--workers должно быть не меньше 1.")
+
+        registration = get_registration(stream)
+        connection = get_stream_connection()
+        base_name = options["consumer"] or f"{socket.gethostname()}-{os.getpid()}"
+        consumers = [
+            StreamConsumer(
+                connection,
+                stream,
+                options["group"] or registration.group,
+                f"{base_name}-{index}",
+                registration.handler,
+                batch_size=options["batch_size"],
+                block_ms=options["block_ms"],
+                claim_idle_ms=options["claim_idle_ms"],
+                max_deliveries=options["max_deliveries"],
+            )
+            for index in range(options["workers"])
+        ]
+        consumers[0].ensure_group()
+
+        if options["once"]:
+            handled = sum(consumer.run_once(block_ms=0) for consumer in consumers)
+            self.stdout.write(f"Обработано сообщений: {handled}")
+            return
+
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *_: stop.set())
+        threads = [
+            threading.Thread(target=consumer.run, args=(stop,), name=consumer.consumer, daemon=True)
+            for consumer in consumers
+        ]
+        for thread in threads:
+            thread.start()
+        self.stdout.write(f"{stream}: запущено потребителей {len(threads)}")
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=1)
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Sequence
+
+from django.core.exceptions import ImproperlyConfigured
+
+
+@dataclass(frozen=True)
+class StreamMessage:
+    id: str
+    fields: Dict[str, str]
+
+
+BatchHandler = Callable[[Sequence[StreamMessage]], None]
+
+
+@dataclass(frozen=True)
+class Registration:
+    stream: str
+    group: str
+    handler: BatchHandler
+
+
+_registry: Dict[str, Registration] = {}
+
+
+def register(stream: str, group: str) -> Callable[[BatchHandler], BatchHandler]:
+    """
+    Register ``handler`` as the consumer of ``stream`` within consumer group ``group``.
+
+    The handler receives a batch of messages and must be idempotent: messages
+    are redelivered if it raises or the worker dies before acknowledging.
+    Registering the same function again (e.g. on module reload) is a no-op;
+    a different handler for an already registered stream is an error.
+    """
+
+    def decorator(handler: BatchHandler) -> BatchHandler:
+        registration = Registration(stream=stream, group=group, handler=handler)
+        existing = _registry.get(stream)
+        if existing is not None and _handler_key(existing.handler) != _handler_key(handler):
+            raise ImproperlyConfigured(f"Stream {stream!r} already has a handler: {existing.handler.__qualname__}.")
+        _registry[stream] = registration
+        return handler
+
+    return decorator
+
+
+def _handler_key(handler: BatchHandler):
+    return getattr(handler, "__module__", None), getattr(handler, "__qualname__", repr(handler))
+
+
+def get_registration(stream: str) -> Registration:
+    try:
+        return _registry[stream]
+    except KeyError:
+        raise ImproperlyConfigured(f"No handler registered for stream {stream!r}.") from None
+
+
+def registered_streams() -> List[str]:
+    return sorted(_registry)
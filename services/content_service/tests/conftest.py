@@ -0,0 +1,43 @@
+from contextlib import contextmanager
+from typing import Optional
+
+import pytest
+
+from ferrum_common import tracing
+from ferrum_common.query_budget import QueryBudgetExceeded, QueryRecorder, check_report
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "no_query_budget: do not enforce query budgets and N+1 checks in this test")
+
+
+@pytest.fixture(autouse=True)
+def enforce_query_budgets(request, settings):
+    """Requests made through the test clients must fit ``QUERY_BUDGETS`` and must not repeat query shapes."""
+    if request.node.get_closest_marker("no_query_budget") is None:
+        settings.QUERY_BUDGET_ENABLED = True
+        settings.QUERY_BUDGET_RAISE = True
+
+
+@pytest.fixture
+def query_budget():
+    """``with query_budget(5): ...`` fails when the block runs more than 5 queries or an N+1 pattern."""
+
+    @contextmanager
+    def limit(max_queries: Optional[int] = None, label: str = "block"):
+        with QueryRecorder() as report:
+            yield report
+        problems = check_report(label, report, budget=max_queries)
+        if problems:
+            raise QueryBudgetExceeded("; ".join(problems) + "\n" + report.describe())
+
+    return limit
+
+
+@pytest.fixture
+def spans(settings):
+    """Export spans to memory for the test; ``spans()`` returns the finished ones."""
+    settings.TRACING_EXPORTER = "memory"
+    tracing.reset()
+    yield lambda: list(tracing.get_exporter().get_finished_spans())
+    tracing.reset()
@@ -1,12 +1,14 @@
+import fakeredis
 import pytest
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 
-from news.models import NewsArticle, NewsEvent
+from ferrum_common.outbox.relay import relay_batch
+from news.models import NewsArticle, NewsEvent, NewsTag
 
 
 @pytest.mark.django_db
-def test_admin_can_create_and_publish_news():
+def test_admin_can_create_and_publish_news(django_capture_on_commit_callbacks):
     client = APIClient()
     User = get_user_model()
     admin = User.objects.create_superuser(username="admin", email="admin@example.com", password="pass1234")
@@ -36,8 +38,17 @@ def test_admin_can_create_and_publish_news():
     article = NewsArticle.objects.get(slug="site-builder-release")
     assert article.status == NewsArticle.Status.PUBLISHED
     assert article.changelog.count() == 1
-    # event persists even if redis is offline (stream_id='offline')
-    assert NewsEvent.objects.filter(article=article).exists()
+    # event is stored in the outbox and gets its stream id once relayed
+    event = NewsEvent.objects.get(article=article)
+    assert event.stream_id == ""
+
+    redis = fakeredis.FakeRedis()
+    with django_capture_on_commit_callbacks(execute=True):
+        assert relay_batch(connection=redis).published == 1
+    event.refresh_from_db()
+    [(stream_id, fields)] = redis.xrange("content:news")
+    assert event.stream_id == stream_id.decode()
+    assert fields[b"slug"] == b"site-builder-release"
 
 
 @pytest.mark.django_db
@@ -54,8 +65,81 @@ def test_public_news_list_only_returns_published():
     response = client.get("/api/v1/public/news/")
 
     assert response.status_code == 200
-    data = response.json()
+    data = response.json()["results"]
     assert len(data) == 1
     assert data[0]["slug"] == "published"
 
 
+@pytest.mark.django_db
+def test_public_news_tag_filter_facets_and_search():
+    for slug, tags in (("builder", ["Release", "builder", "release"]), ("api", ["release"]), ("misc", [])):
+        NewsArticle.objects.create(
+            title=f"Новость {slug}", slug=slug, body="...", tags=tags, status=NewsArticle.Status.PUBLISHED
+        )
+    NewsArticle.objects.create(title="draft", slug="draft", body="...", tags=["release"])
+    assert set(NewsTag.objects.filter(article__slug="builder").values_list("tag", flat=True)) == {"release", "builder"}
+
+    client = APIClient()
+    tagged = client.get("/api/v1/public/news/?tag=release").json()["results"]
+    assert {item["slug"] for item in tagged} == {"builder", "api"}
+    both = client.get("/api/v1/public/news/?tag=release&tag=BUILDER").json()["results"]
+    assert [item["slug"] for item in both] == ["builder"]
+    assert client.get("/api/v1/public/news/tags/").json() == [
+        {"tag": "release", "count": 2},
+        {"tag": "builder", "count": 1},
+    ]
+    found = client.get("/api/v1/public/news/?search=builder").json()["results"]
+    assert [item["slug"] for item in found] == ["builder"]
+
+    article = NewsArticle.objects.get(slug="api")
+    article.tags = ["docs"]
+    article.save()
+    assert list(NewsTag.objects.filter(article=article).values_list("tag", flat=True)) == ["docs"]
+
+
+@pytest.mark.django_db
+def test_public_news_feed_is_paginated_and_sparse(django_assert_num_queries):
+    from datetime import timedelta
+
+    from django.utils import timezone
+
+    from news.models import NewsChangelog
+
+    now = timezone.now()
+    for index in range(5):
+        article = NewsArticle.objects.create(
+            title=f"Выпуск {index}",
+            slug=f"release-{index}",
+            body="Длинный текст " * 100,
+            status=NewsArticle.Status.PUBLISHED,
+            # two articles share a timestamp, the id breaks the tie
+            published_at=now - timedelta(days=min(index, 3)),
+        )
+        NewsChangelog.objects.create(
+            article=article, title="Фикс", description="...", impact_area="Бекенд", change_type="fixed"
+        )
+    client = APIClient()
+
+    # the conditional GET validators, then the page itself without body
+    with django_assert_num_queries(2) as queries:
+        first = client.get("/api/v1/public/news/?page_size=2").json()
+    assert '"body"' not in queries.captured_queries[-1]["sql"]
+    assert [item["slug"] for item in first["results"]] == ["release-0", "release-1"]
+    assert "body" not in first["results"][0] and "changelog" not in first["results"][0]
+    slugs = [item["slug"] for item in first["results"]]
+    page = first
+    while page["next"]:
+        page = client.get(page["next"]).json()
+        slugs += [item["slug"] for item in page["results"]]
+    assert slugs == ["release-0", "release-1", "release-2", "release-4", "release-3"]
+
+    sparse = client.get("/api/v1/public/news/?fields=slug,title&expand=changelog&page_size=1").json()
+    assert sparse["results"] == [
+        {"title": "Выпуск 0", "slug": "release-0", "changelog": [
+            {"id": 1, "title": "Фикс", "description": "...", "impact_area": "Бекенд", "change_type": "fixed",
+             "metadata": {}},
+        ]},
+    ]
+    detail = client.get(f"/api/v1/public/news/{NewsArticle.objects.get(slug='release-0').pk}/").json()
+    assert detail["body"].startswith("Длинный текст") and len(detail["changelog"]) == 1
+    assert client.get("/api/v1/public/news/?fields=body,secret").status_code == 400
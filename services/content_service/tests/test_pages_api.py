@@ -1,3 +1,5 @@
+import json
+
 import pytest
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
@@ -55,3 +57,307 @@ def test_public_page_endpoint_returns_published_page():
     assert data["slug"] == "home"
 
 
+@pytest.mark.django_db
+def test_published_pages_list_is_streamed():
+    for slug in ("about", "home"):
+        Page.objects.create(
+            title=f"Страница {slug}", slug=slug, status=Page.Status.PUBLISHED, blocks={"text": "\u2028"}
+        )
+    Page.objects.create(title="Черновик", slug="draft")
+
+    response = APIClient().get("/api/v1/pages/published/")
+
+    assert response.status_code == 200
+    assert response.streaming
+    body = b"".join(response.streaming_content)
+    assert b"\\u2028" in body
+    assert [page["slug"] for page in json.loads(body)] == ["about", "home"]
+
+
+@pytest.fixture
+def locmem_cache(settings):
+    settings.CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_published_pages_support_conditional_get_and_response_cache(
+    settings, locmem_cache, django_assert_num_queries
+):
+    # The browsable API needs a staticfiles storage to render.
+    settings.STORAGES = {
+        **settings.STORAGES,
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    }
+    Page.objects.create(title="Главная", slug="home", status=Page.Status.PUBLISHED, blocks={"sections": []})
+    client = APIClient()
+
+    first = client.get("/api/v1/pages/published/home/")
+    assert first.status_code == 200
+    assert first["Surrogate-Key"].split() == ["pages", f"pages-{first.json()['id']}"]
+    assert "public" in first["Cache-Control"]
+    assert "Accept" in first["Vary"]
+
+    html = client.get("/api/v1/pages/published/home/", HTTP_ACCEPT="text/html")
+    assert html["Content-Type"].startswith("text/html")
+    assert "private" in html["Cache-Control"] and "public" not in html["Cache-Control"]
+    assert "Surrogate-Key" not in html
+    assert "Accept" in html["Vary"]
+
+    with django_assert_num_queries(0):
+        cached = client.get("/api/v1/pages/published/home/")
+        not_modified = client.get("/api/v1/pages/published/home/", HTTP_IF_NONE_MATCH=first["ETag"])
+    assert cached.content == first.content
+    assert not_modified.status_code == 304
+
+    listing = b"".join(client.get("/api/v1/pages/published/").streaming_content)
+    with django_assert_num_queries(0):
+        assert client.get("/api/v1/pages/published/").content == listing
+
+    admin = get_user_model().objects.create_superuser(username="admin", email="admin@example.com", password="pass")
+    client.force_authenticate(user=admin)
+    page_id = first.json()["id"]
+    assert client.patch(f"/api/v1/pages/{page_id}/", {"title": "Новая главная"}, format="json").status_code == 200
+    client.force_authenticate(user=None)
+
+    refreshed = client.get("/api/v1/pages/published/home/", HTTP_IF_NONE_MATCH=first["ETag"])
+    assert refreshed.status_code == 200
+    assert refreshed.json()["title"] == "Новая главная"
+
+
+@pytest.mark.django_db(transaction=True)
+def test_scheduler_publishes_due_pages_in_batches_and_warms_cache(locmem_cache, django_assert_num_queries):
+    from datetime import timedelta
+
+    from django.core.cache import cache
+    from django.core.management import call_command
+    from django.utils import timezone
+
+    from common.http_cache import COLLECTION_VERSION_KEY
+    from ferrum_common.outbox.models import OutboxEvent
+    from pages.scheduler import publish_due_pages
+
+    now = timezone.now()
+    for index in range(3):
+        Page.objects.create(title=f"Акция {index}", slug=f"promo-{index}", publish_at=now - timedelta(minutes=index))
+    Page.objects.create(title="Будущее", slug="future", status=Page.Status.REVIEW, publish_at=now + timedelta(days=1))
+
+    batch = publish_due_pages(batch_size=2, now=now)
+    assert [page.slug for page in batch] == ["promo-2", "promo-1"]
+    assert Page.objects.get(slug="promo-2").published_at == now - timedelta(minutes=2)
+
+    call_command("publish_scheduled_pages", batch_size=2)
+
+    assert set(Page.objects.filter(status=Page.Status.PUBLISHED).values_list("slug", flat=True)) == {
+        "promo-0",
+        "promo-1",
+        "promo-2",
+    }
+    assert OutboxEvent.objects.filter(aggregate_type="page").count() == 3
+    client = APIClient()
+    with django_assert_num_queries(0):
+        warm_detail = client.get("/api/v1/pages/published/promo-0/")
+        warm_list = client.get("/api/v1/pages/published/")
+    assert warm_detail.status_code == warm_list.status_code == 200
+
+    # Warmed entries are the responses the view renders itself.
+    version_key = COLLECTION_VERSION_KEY.format(collection="pages")
+    version = cache.get(version_key)
+    cache.clear()
+    cache.set(version_key, version)
+    cold_detail = client.get("/api/v1/pages/published/promo-0/")
+    cold_list = client.get("/api/v1/pages/published/")
+    assert (warm_detail.content, warm_detail["ETag"]) == (cold_detail.content, cold_detail["ETag"])
+    assert warm_detail["Content-Type"] == cold_detail["Content-Type"]
+    assert (warm_list.content, warm_list["ETag"]) == (b"".join(cold_list.streaming_content), cold_list["ETag"])
+
+
+@pytest.mark.django_db(transaction=True)
+def test_stale_edit_does_not_revert_scheduled_publication(locmem_cache):
+    from datetime import timedelta
+
+    from django.utils import timezone
+
+    from pages.scheduler import publish_due_pages
+
+    page = Page.objects.create(title="Акция", slug="promo", publish_at=timezone.now() - timedelta(minutes=1))
+    client = APIClient()
+    admin = get_user_model().objects.create_superuser(username="admin", email="admin@example.com", password="pass")
+    client.force_authenticate(user=admin)
+
+    # The editor loaded the draft (version 1); the scheduler publishes it before the edit is saved.
+    publish_due_pages()
+    stale = client.put(
+        f"/api/v1/pages/{page.pk}/",
+        {"title": "Правка черновика", "slug": "promo", "status": "draft", "blocks": {}},
+        format="json",
+        HTTP_IF_MATCH='"1"',
+    )
+
+    assert stale.status_code == 412
+    page.refresh_from_db()
+    assert (page.status, page.version, page.title) == (Page.Status.PUBLISHED, 2, "Акция")
+
+
+def test_apply_patch_follows_rfc6902():
+    from pages.patch import PatchError, apply_patch, parse_operations
+
+    document = {"sections": [{"type": "hero", "props": {"title": "Ferrum"}}, {"type": "text"}], "props": {}}
+    patched = apply_patch(
+        document,
+        parse_operations(
+            [
+                {"op": "test", "path": "/sections/0/type", "value": "hero"},
+                {"op": "replace", "block": 0, "path": "/props/title", "value": "Ferrum 2"},
+                {"op": "add", "block": "-", "value": {"type": "footer"}},
+                {"op": "move", "from_block": 1, "path": "/sections/0"},
+                {"op": "copy", "from": "/sections/1/props", "path": "/props/a~1b"},
+                {"op": "remove", "path": "/sections/2"},
+            ]
+        ),
+    )
+    assert patched == {
+        "sections": [{"type": "text"}, {"type": "hero", "props": {"title": "Ferrum 2"}}],
+        "props": {"a/b": {"title": "Ferrum 2"}},
+    }
+    with pytest.raises(PatchError):
+        apply_patch({"sections": []}, parse_operations([{"op": "test", "path": "/sections", "value": {}}]))
+    with pytest.raises(PatchError):
+        apply_patch({"sections": []}, parse_operations([{"op": "replace", "path": "/sections/0", "value": 1}]))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_blocks_patch_uses_page_version(locmem_cache):
+    page = Page.objects.create(
+        title="Главная", slug="home", status=Page.Status.PUBLISHED, blocks={"sections": [{"type": "hero"}]}
+    )
+    client = APIClient()
+    admin = get_user_model().objects.create_superuser(username="admin", email="admin@example.com", password="pass")
+    client.force_authenticate(user=admin)
+    url = f"/api/v1/pages/{page.pk}/blocks/"
+    patch = json.dumps([{"op": "add", "block": 0, "path": "/props", "value": {"title": "Ferrum"}}])
+
+    assert client.patch(url, patch, content_type="application/json-patch+json").status_code == 428
+    response = client.patch(url, patch, content_type="application/json-patch+json", HTTP_IF_MATCH='"1"')
+    assert response.status_code == 200
+    assert response.json() == {"id": page.pk, "version": 2}
+    assert response["ETag"] == '"2"'
+    page.refresh_from_db()
+    assert page.blocks == {"sections": [{"type": "hero", "props": {"title": "Ferrum"}}]}
+    assert page.events.count() == 1
+
+    stale = client.patch(url, patch, content_type="application/json-patch+json", HTTP_IF_MATCH='"1"')
+    assert stale.status_code == 412
+    invalid = json.dumps([{"op": "remove", "block": 5}])
+    assert client.patch(url, invalid, content_type="application/json-patch+json", HTTP_IF_MATCH='"2"').status_code == 400
+
+    assert client.patch(f"/api/v1/pages/{page.pk}/", {"title": "Новая"}, format="json").json()["version"] == 3
+    page.refresh_from_db()
+    assert page.version == 3
+
+
+@pytest.mark.django_db
+def test_concurrent_page_update_loses_with_412():
+    from rest_framework.request import Request
+    from rest_framework.test import APIRequestFactory
+
+    from api.pages import PageSerializer, PageViewSet, PreconditionFailed
+
+    page = Page.objects.create(title="Главная", slug="home")
+    view = PageViewSet(request=Request(APIRequestFactory().patch(f"/api/v1/pages/{page.pk}/", HTTP_IF_MATCH='"1"')))
+    serializer = PageSerializer(Page.objects.get(pk=page.pk), data={"title": "Моя правка"}, partial=True)
+    assert serializer.is_valid(), serializer.errors
+
+    # Another writer saves between this request reading version 1 and writing it.
+    Page.objects.filter(pk=page.pk).update(title="Чужая правка", version=2)
+    with pytest.raises(PreconditionFailed):
+        view.perform_update(serializer)
+    page.refresh_from_db()
+    assert (page.title, page.version) == ("Чужая правка", 2)
+
+
+def test_patch_sql_is_one_conditional_jsonb_update():
+    from pages.patch import _patch_sql, parse_operations
+
+    operations = parse_operations(
+        [
+            {"op": "test", "path": "/sections/0/type", "value": "hero"},
+            {"op": "replace", "block": 0, "path": "/props/title", "value": "Ferrum"},
+            {"op": "remove", "path": "/sections/1"},
+        ]
+    )
+    sql, params = _patch_sql(7, 3, operations)
+
+    assert sql.count("UPDATE") == 1
+    assert "jsonb_set(doc, %s::text[], %s::jsonb, false)" in sql
+    assert "doc #- %s::text[]" in sql
+    assert sql.count("%s") == len(params)
+    assert params[:2] == [7, 3]
+    assert params[-2:] == [7, 3]
+    assert ["sections", "0", "props", "title"] in params
+    assert '"Ferrum"' in params
+    assert _patch_sql(7, 3, parse_operations([{"op": "move", "from": "/a", "path": "/b"}])) is None
+
+
+@pytest.mark.django_db
+def test_blocks_patch_runs_in_postgres():
+    from django.db import connection
+
+    from pages.patch import parse_operations, patch_page_blocks
+
+    if connection.vendor != "postgresql":
+        pytest.skip("the jsonb UPDATE path needs PostgreSQL")
+    page = Page.objects.create(title="Главная", slug="home", blocks={"sections": [{"type": "hero"}, {"type": "text"}]})
+    operations = parse_operations(
+        [
+            {"op": "replace", "block": 0, "path": "/type", "value": "banner"},
+            {"op": "add", "block": "-", "value": {"type": "footer"}},
+            {"op": "remove", "block": 1},
+        ]
+    )
+
+    assert patch_page_blocks(page.pk, 1, operations).version == 2
+    page.refresh_from_db()
+    assert page.blocks == {"sections": [{"type": "banner"}, {"type": "footer"}]}
+
+
+@pytest.mark.django_db(transaction=True)
+def test_published_pages_are_compiled_into_shared_blocks(locmem_cache):
+    from datetime import timedelta
+
+    from pages.blocks import block_digest, prune_blocks
+    from pages.models import ContentBlock
+
+    header = {"type": "header", "props": {"menu": ["Каталог", "Бренды"]}}
+    client = APIClient()
+    admin = get_user_model().objects.create_superuser(username="admin", email="admin@example.com", password="pass")
+    client.force_authenticate(user=admin)
+    for slug, hero in (("home", "Ferrum"), ("sale", "Скидки")):
+        payload = {
+            "title": slug,
+            "slug": slug,
+            "status": "published",
+            "blocks": {"sections": [header, {"type": "hero", "props": {"title": hero}}], "props": {}},
+        }
+        assert client.post("/api/v1/pages/", payload, format="json").status_code == 201
+    client.force_authenticate(user=None)
+
+    assert ContentBlock.objects.count() == 3
+    page = client.get("/api/v1/pages/compiled/home/").json()
+    assert page["layout"]["sections"][0] == block_digest({"props": {"menu": ["Каталог", "Бренды"]}, "type": "header"})
+    assert "blocks" not in page
+
+    listing = client.get("/api/v1/pages/compiled/?include=blocks").json()
+    assert [item["slug"] for item in listing["pages"]] == ["home", "sale"]
+    assert len(listing["blocks"]) == 3
+    assert listing["blocks"][page["layout"]["sections"][0]] == header
+
+    digest = page["layout"]["sections"][1]
+    block = client.get(f"/api/v1/pages/blocks/{digest}/")
+    assert block.json() == {"type": "hero", "props": {"title": "Ferrum"}}
+    assert "immutable" in block["Cache-Control"]
+    assert client.get(f"/api/v1/pages/blocks/?digests={digest},{'0' * 64}").json() == {digest: block.json()}
+    assert client.get("/api/v1/pages/blocks/?digests=nope").status_code == 400
+
+    Page.objects.filter(slug="sale").update(status=Page.Status.DRAFT)
+    assert prune_blocks(grace=timedelta(0)) == (1, 1)
+    assert client.get(f"/api/v1/pages/blocks/{digest}/").status_code == 200
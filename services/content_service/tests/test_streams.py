@@ -0,0 +1,122 @@
+import fakeredis
+import pytest
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.test import APIClient
+
+from storefront.models import ProductCard
+from storefront.stream_handlers import apply_product_events
+from streams.consumer import StreamConsumer
+from streams.registry import StreamMessage, get_registration, register
+
+STREAM = "catalog:product"
+
+
+def product_event(product_id, name, price="990.00"):
+    return {
+        "product_id": str(product_id),
+        "slug": f"product-{product_id}",
+        "name": name,
+        "sku": f"SKU{product_id}",
+        "price": price,
+        "currency": "RUB",
+        "category_id": "7",
+    }
+
+
+def make_consumer(redis, **kwargs):
+    consumer = StreamConsumer(redis, STREAM, "content-storefront", "test-0", apply_product_events, **kwargs)
+    consumer.ensure_group()
+    return consumer
+
+
+@pytest.mark.django_db
+def test_product_events_build_storefront_cards():
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    consumer = make_consumer(redis)
+    redis.xadd(STREAM, product_event(1, "Футболка"))
+    redis.xadd(STREAM, product_event(2, "Худи", price="3990.00"))
+    redis.xadd(STREAM, product_event(1, "Футболка v2", price="1290.00"))
+
+    assert consumer.run_once(block_ms=0) == 3
+    assert redis.xpending(STREAM, "content-storefront")["pending"] == 0
+    card = ProductCard.objects.get(product_id=1)
+    assert (card.name, str(card.price)) == ("Футболка v2", "1290.00")
+
+    # A redelivered older event does not roll the card back.
+    stale_id = redis.xrange(STREAM)[0][0]
+    apply_product_events([StreamMessage(id=stale_id, fields=product_event(1, "Футболка"))])
+    assert ProductCard.objects.get(product_id=1).name == "Футболка v2"
+
+    response = APIClient().get("/api/v1/public/products/?ids=1,2")
+    assert response.status_code == 200
+    assert {item["slug"] for item in response.data} == {"product-1", "product-2"}
+
+
+@pytest.mark.django_db
+def test_unpublished_and_deleted_products_are_hidden():
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    consumer = make_consumer(redis)
+    redis.xadd(STREAM, product_event(1, "Футболка"))
+    redis.xadd(STREAM, product_event(2, "Худи"))
+    assert consumer.run_once(block_ms=0) == 2
+
+    redis.xadd(STREAM, {**product_event(1, "Футболка"), "is_published": "false", "deleted": "false"})
+    redis.xadd(STREAM, {**product_event(2, "Худи"), "is_published": "false", "deleted": "true"})
+    assert consumer.run_once(block_ms=0) == 2
+
+    assert not ProductCard.objects.filter(is_visible=True).exists()
+    # A redelivered event from before the unpublish does not bring the card back.
+    apply_product_events([StreamMessage(id=redis.xrange(STREAM)[0][0], fields=product_event(1, "Футболка"))])
+    assert not ProductCard.objects.get(product_id=1).is_visible
+    assert APIClient().get("/api/v1/public/products/?ids=1,2").data == []
+    assert APIClient().get("/api/v1/public/products/product-1/").status_code == 404
+
+
+@pytest.mark.django_db
+def test_poison_message_is_retried_then_dead_lettered():
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    consumer = make_consumer(redis, claim_idle_ms=0, max_deliveries=2)
+    redis.xadd(STREAM, product_event(1, "Футболка"))
+    bad_id = redis.xadd(STREAM, {"slug": "broken"})
+
+    assert consumer.run_once(block_ms=0) == 1
+    assert ProductCard.objects.filter(product_id=1).exists()
+    [pending] = redis.xpending_range(STREAM, "content-storefront", "-", "+", 10)
+    assert pending["message_id"] == bad_id
+
+    # Reclaimed via XAUTOCLAIM; on the second delivery it goes to the dead-letter stream.
+    assert consumer.run_once(block_ms=0) == 0
+    assert redis.xpending(STREAM, "content-storefront")["pending"] == 0
+    [(_, fields)] = redis.xrange(f"{STREAM}:dead")
+    assert fields["source_id"] == bad_id
+
+
+@pytest.mark.django_db
+def test_consumer_continues_the_producer_trace(spans):
+    trace_id = "4bf92f3577b34da6a3ce929d0e0e4736"
+    traceparent = f"00-{trace_id}-00f067aa0ba902b7-01"
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    consumer = make_consumer(redis)
+    redis.xadd(STREAM, {**product_event(1, "Футболка"), "traceparent": traceparent})
+    assert consumer.run_once(block_ms=0) == 1
+
+    redis.xadd(STREAM, {**product_event(1, "Футболка v2"), "traceparent": traceparent})
+    redis.xadd(STREAM, product_event(2, "Худи"))
+    assert consumer.run_once(block_ms=0) == 2
+
+    single, batch = [span for span in spans() if span.name == f"process {STREAM}"]
+    assert single.kind.name == "CONSUMER"
+    assert format(single.context.trace_id, "032x") == trace_id
+    assert format(single.parent.span_id, "016x") == "00f067aa0ba902b7"
+    # A batch starts its own trace and links the producers that sent a context.
+    assert batch.parent is None
+    assert [format(link.context.trace_id, "032x") for link in batch.links] == [trace_id]
+
+
+def test_handler_registration_is_idempotent():
+    registration = get_registration(STREAM)
+    register(STREAM, group="content-storefront")(apply_product_events)
+    assert get_registration(STREAM) == registration
+
+    with pytest.raises(ImproperlyConfigured):
+        register(STREAM, group="other")(lambda messages: None)
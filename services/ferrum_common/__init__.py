@@ -0,0 +1,9 @@
+"""
+Infrastructure shared by the Django services: metrics, tracing, query
+budgets, orjson rendering, keyset pagination and the ``outbox`` app
+(``ferrum_common.outbox`` in ``INSTALLED_APPS``).
+
+Service-specific helpers stay in each service's ``common`` package. Like
+``benchmarking``, this package is imported with ``services/`` on the path
+(pytest ``pythonpath = src ..``; ``PYTHONPATH`` in the images).
+"""
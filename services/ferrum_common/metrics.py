@@ -0,0 +1,351 @@
+from __future__ import annotations
+
+import math
+import threading
+import time
+import weakref
+from bisect import bisect_left
+from contextlib import ExitStack
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from django.db import connections
+from django.http import HttpResponse
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, generate_latest
+from prometheus_client.core import CounterMetricFamily, HistogramMetricFamily
+from prometheus_client.gc_collector import GCCollector
+from prometheus_client.platform_collector import PlatformCollector
+from prometheus_client.process_collector import ProcessCollector
+from prometheus_client.utils import floatToGoString
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+METRICS_PATH = "/metrics"
+
+Key = Tuple[str, Tuple[str, ...]]
+
+
+class _Shard:
+    """Samples written by one thread; only that thread ever mutates them."""
+
+    __slots__ = ("thread", "counters", "histograms")
+
+    def __init__(self, thread: Optional[threading.Thread]):
+        self.thread = weakref.ref(thread) if thread is not None else None
+        self.counters: Dict[Key, float] = {}
+        # Non-cumulative bucket counts, the last item holds the sum of observations.
+        self.histograms: Dict[Key, List[float]] = {}
+
+    def alive(self) -> bool:
+        thread = self.thread() if self.thread is not None else None
+        return thread is not None and thread.is_alive()
+
+    def merge(self, counters: Dict[Key, float], histograms: Dict[Key, List[float]]) -> None:
+        for key, value in counters.items():
+            self.counters[key] = self.counters.get(key, 0.0) + value
+        for key, values in histograms.items():
+            merged = self.histograms.get(key)
+            if merged is None:
+                self.histograms[key] = list(values)
+            else:
+                for index, value in enumerate(values):
+                    merged[index] += value
+
+
+class _Store:
+    """
+    Per-thread sample shards, merged when Prometheus scrapes.
+
+    Recording a sample touches only the shard of the current thread, so
+    requests never wait on a lock; the lock is taken once per thread (to
+    register its shard) and by the scrape. Shards of finished threads are
+    folded into one retired shard so counters stay monotonic.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards: List[_Shard] = []
+        self._retired = _Shard(None)
+
+    def shard(self) -> _Shard:
+        try:
+            return self._local.shard
+        except AttributeError:
+            shard = _Shard(threading.current_thread())
+            with self._lock:
+                self._shards.append(shard)
+            self._local.shard = shard
+            return shard
+
+    def snapshot(self) -> _Shard:
+        with self._lock:
+            live = []
+            for shard in self._shards:
+                if shard.alive():
+                    live.append(shard)
+                else:
+                    self._retired.merge(shard.counters, shard.histograms)
+            self._shards = live
+            total = _Shard(None)
+            total.merge(self._retired.counters, self._retired.histograms)
+        for shard in live:
+            # dict.copy() and list slicing are atomic, the owner thread may keep writing meanwhile.
+            total.merge(shard.counters.copy(), {key: values[:] for key, values in shard.histograms.copy().items()})
+        return total
+
+    def reset(self) -> None:
+        with self._lock:
+            for shard in [*self._shards, self._retired]:
+                shard.counters.clear()
+                shard.histograms.clear()
+
+
+_store = _Store()
+_metrics: Dict[str, "_Metric"] = {}
+
+
+class _Metric:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        if name in _metrics:
+            raise ValueError(f"Metric {name} is already defined")
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        _metrics[name] = self
+
+
+class Counter(_Metric):
+    """Monotonic counter; label values are passed positionally in ``labelnames`` order."""
+
+    def inc(self, *labelvalues: str, amount: float = 1) -> None:
+        counters = _store.shard().counters
+        key = (self.name, labelvalues)
+        counters[key] = counters.get(key, 0.0) + amount
+
+    def family(self, samples: Dict[Tuple[str, ...], float]) -> CounterMetricFamily:
+        family = CounterMetricFamily(self.name, self.documentation, labels=self.labelnames)
+        for labelvalues, value in sorted(samples.items()):
+            family.add_metric(labelvalues, value)
+        return family
+
+
+class Histogram(_Metric):
+    """Histogram with fixed ``buckets``; label values are passed positionally after the value."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(bound) for bound in buckets if bound != math.inf)) + (math.inf,)
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        histograms = _store.shard().histograms
+        key = (self.name, labelvalues)
+        values = histograms.get(key)
+        if values is None:
+            values = histograms[key] = [0.0] * (len(self.buckets) + 1)
+        values[bisect_left(self.buckets, value)] += 1
+        values[-1] += value
+
+    def family(self, samples: Dict[Tuple[str, ...], List[float]]) -> HistogramMetricFamily:
+        family = HistogramMetricFamily(self.name, self.documentation, labels=self.labelnames)
+        for labelvalues, values in sorted(samples.items()):
+            cumulative, buckets = 0.0, []
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                buckets.append((floatToGoString(bound), cumulative))
+            family.add_metric(labelvalues, buckets, values[-1])
+        return family
+
+
+class _Collector:
+    def collect(self):
+        snapshot = _store.snapshot()
+        grouped: Dict[str, Dict[Tuple[str, ...], object]] = {}
+        for (name, labelvalues), value in [*snapshot.counters.items(), *snapshot.histograms.items()]:
+            grouped.setdefault(name, {})[labelvalues] = value
+        for name, metric in sorted(_metrics.items()):
+            yield metric.family(grouped.get(name, {}))
+
+
+registry = CollectorRegistry(auto_describe=False)
+registry.register(_Collector())
+ProcessCollector(registry=registry)
+PlatformCollector(registry=registry)
+GCCollector(registry=registry)
+
+
+def reset() -> None:
+    """Forget every recorded sample (tests)."""
+    _store.reset()
+
+
+def sample(name: str, *labelvalues: str) -> Optional[float]:
+    """Current value of a counter, or the observation count of a histogram; ``None`` if never recorded."""
+    snapshot = _store.snapshot()
+    key = (name, labelvalues)
+    if key in snapshot.counters:
+        return snapshot.counters[key]
+    if key in snapshot.histograms:
+        return sum(snapshot.histograms[key][:-1])
+    return None
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time spent on a request, by route (URL name) and response status.",
+    ("method", "route", "status"),
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Database queries per request.",
+    ("method", "route"),
+    buckets=COUNT_BUCKETS,
+)
+REQUEST_DB_DURATION = Histogram(
+    "http_request_db_duration_seconds",
+    "Time spent in database queries per request.",
+    ("method", "route"),
+)
+REDIS_LATENCY = Histogram(
+    "redis_command_duration_seconds",
+    "Latency of Redis commands; pipelines are timed as a whole under PIPELINE.",
+    ("command",),
+    buckets=FAST_BUCKETS,
+)
+
+
+def metrics_view(request):
+    """Prometheus text exposition of this process' metrics."""
+    return HttpResponse(generate_latest(registry), content_type=CONTENT_TYPE_LATEST)
+
+
+def _command_name(args) -> str:
+    if not args:
+        return "UNKNOWN"
+    name = args[0]
+    if isinstance(name, bytes):
+        name = name.decode(errors="replace")
+    return str(name).split(" ", 1)[0].upper()
+
+
+def instrument_redis(client):
+    """
+    Time the commands of a redis-py client in ``redis_command_duration_seconds``.
+
+    The client's bound ``execute_command`` and ``pipeline`` are replaced on the
+    instance, so every command helper (``get``, ``xadd``, Lua scripts) is
+    covered. Instrumenting a client twice is a no-op.
+    """
+    if getattr(client, "_metrics_instrumented", False):
+        return client
+    execute_command = client.execute_command
+    pipeline = client.pipeline
+
+    def timed_execute_command(*args, **options):
+        started = time.perf_counter()
+        try:
+            return execute_command(*args, **options)
+        finally:
+            REDIS_LATENCY.observe(time.perf_counter() - started, _command_name(args))
+
+    def timed_pipeline(*args, **kwargs):
+        pipe = pipeline(*args, **kwargs)
+        execute = pipe.execute
+
+        def timed_execute(*execute_args, **execute_kwargs):
+            started = time.perf_counter()
+            try:
+                return execute(*execute_args, **execute_kwargs)
+            finally:
+                REDIS_LATENCY.observe(time.perf_counter() - started, "PIPELINE")
+
+        pipe.execute = timed_execute
+        return pipe
+
+    client.execute_command = timed_execute_command
+    client.pipeline = timed_pipeline
+    client._metrics_instrumented = True
+    return client
+
+
+def get_redis_connection(alias: str = "default", write: bool = True):
+    """``django_redis.get_redis_connection`` with command latency metrics."""
+    # Imported lazily: services without a Redis cache never call this.
+    from django_redis import get_redis_connection as _get_redis_connection
+
+    return instrument_redis(_get_redis_connection(alias, write=write))
+
+
+class _QueryTimer:
+    __slots__ = ("count", "duration")
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - started
+
+
+class MetricsMiddleware:
+    """
+    Record latency and database usage of each request.
+
+    Routes are labelled with the URL name (``unmatched`` for 404s outside
+    the URL conf) so the number of series stays bounded. Streaming responses
+    are measured until the last chunk is sent. Scrapes of ``METRICS_PATH``
+    are not recorded.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.path == METRICS_PATH:
+            return self.get_response(request)
+        timer = _QueryTimer()
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(timer))
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            stack.close()
+            self._finish(request, 500, started, timer)
+            raise
+        if response.streaming:
+            response.streaming_content = self._finish_streaming(
+                request, response.status_code, response.streaming_content, started, timer, stack
+            )
+            return response
+        stack.close()
+        self._finish(request, response.status_code, started, timer)
+        return response
+
+    def _finish_streaming(
+        self, request, status: int, chunks: Iterable[bytes], started: float, timer: _QueryTimer, stack: ExitStack
+    ) -> Iterator[bytes]:
+        try:
+            yield from chunks
+        finally:
+            stack.close()
+            self._finish(request, status, started, timer)
+
+    def _finish(self, request, status: int, started: float, timer: _QueryTimer) -> None:
+        match = getattr(request, "resolver_match", None)
+        route = (match.view_name if match else None) or "unmatched"
+        REQUEST_LATENCY.observe(time.perf_counter() - started, request.method, route, str(status))
+        REQUEST_DB_QUERIES.observe(timer.count, request.method, route)
+        REQUEST_DB_DURATION.observe(timer.duration, request.method, route)
@@ -0,0 +1,11 @@
+from __future__ import annotations
+
+from django.apps import AppConfig
+
+
+class OutboxConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "ferrum_common.outbox"
+    # The label keeps the table names and migration history of the per-service copies.
+    label = "outbox"
+    verbose_name = "Outbox событий"
@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from ferrum_common.outbox.relay import outbox_stats, purge_published, relay_pending
+
+
+class Command(BaseCommand):
+    help = "Отправляет накопленные события outbox в Redis Streams."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=None)
+        parser.add_argument("--loop", action="store_true", help="Работать постоянно, опрашивая outbox.")
+        parser.add_argument("--interval", type=float, default=0.5, help="Пауза между опросами, сек.")
+        parser.add_argument(
+            "--purge-days", type=int, default=None, help="Удалить отправленные события старше N дней."
+        )
+
+    def handle(self, *args, **options):
+        if options["purge_days"] is not None:
+            deleted = purge_published(timedelta(days=options["purge_days"]))
+            self.stdout.write(f"Удалено событий: {deleted}")
+            return
+
+        while True:
+            result = relay_pending(options["batch_size"])
+            if result:
+                stats = outbox_stats()
+                self.stdout.write(
+                    f"published={result.published} retried={result.retried} failed={result.failed} "
+                    f"pending={stats['pending']} lag={stats['oldest_pending_age']:.1f}s"
+                )
+            if not options["loop"]:
+                return
+            if not result.published:
+                time.sleep(options["interval"])
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from django.db import models
+from django.utils import timezone
+
+
+class OutboxEvent(models.Model):
+    """Событие для Redis Streams, записанное в той же транзакции, что и изменение данных."""
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Ожидает отправки"
+        PUBLISHED = "published", "Отправлено"
+        FAILED = "failed", "Ошибка"
+
+    stream = models.CharField(max_length=128)
+    aggregate_type = models.CharField(max_length=64)
+    aggregate_id = models.CharField(max_length=64)
+    payload = models.JSONField()
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.PENDING)
+    stream_id = models.CharField(max_length=128, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    available_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    published_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ("id",)
+        indexes = [
+            models.Index(
+                fields=["id"],
+                name="outbox_pending_idx",
+                condition=models.Q(status="pending"),
+            ),
+            models.Index(
+                fields=["aggregate_type", "aggregate_id", "id"],
+                name="outbox_aggregate_pending_idx",
+                condition=models.Q(status="pending"),
+            ),
+        ]
+        verbose_name = "Событие outbox"
+        verbose_name_plural = "События outbox"
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"{self.stream}#{self.id} ({self.status})"
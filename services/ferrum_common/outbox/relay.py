@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+import json
+import logging
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, Min, OuterRef
+from django.utils import timezone
+
+from ferrum_common import tracing
+from ferrum_common.metrics import Counter, get_redis_connection
+
+from .models import OutboxEvent
+from .signals import events_published
+
+logger = logging.getLogger(__name__)
+
+STREAM_PUBLISH_FAILURES = Counter(
+    "stream_publish_failures_total",
+    "Outbox events that failed to reach their Redis stream, by outcome (retried or failed for good).",
+    ("stream", "outcome"),
+)
+STREAM_EVENTS_PUBLISHED = Counter(
+    "stream_events_published_total", "Outbox events published to Redis streams.", ("stream",)
+)
+
+
+@dataclass
+class RelayResult:
+    published: int = 0
+    retried: int = 0
+    failed: int = 0
+    events: List[OutboxEvent] = field(default_factory=list)
+
+    def __bool__(self) -> bool:
+        return bool(self.published or self.retried or self.failed)
+
+
+def _stream_fields(payload: Dict[str, object]) -> Dict[str, object]:
+    # XADD takes flat field/value pairs; nested values travel as JSON.
+    return {
+        key: value if isinstance(value, (str, bytes, int, float)) else json.dumps(value, ensure_ascii=False)
+        for key, value in payload.items()
+    }
+
+
+def _publish_span(events: List[OutboxEvent]):
+    # The relay runs outside the requests that produced the events: each
+    # event's trace is linked rather than continued (the consumer continues it).
+    streams = sorted({event.stream for event in events})
+    return tracing.span(
+        f"publish {streams[0]}" if len(streams) == 1 else "publish outbox",
+        kind=tracing.SpanKind.PRODUCER,
+        attributes={
+            "messaging.system": "redis",
+            "messaging.operation": "publish",
+            "messaging.destination.name": ",".join(streams),
+            "messaging.batch.message_count": len(events),
+        },
+        links=tracing.links_from(event.payload for event in events),
+    )
+
+
+def _retry_delay(attempts: int) -> timedelta:
+    base = getattr(settings, "OUTBOX_RETRY_BACKOFF", 5)
+    return timedelta(seconds=min(base * 2 ** (attempts - 1), 3600))
+
+
+def _claim_batch(batch_size: int) -> List[OutboxEvent]:
+    now = timezone.now()
+    # An event waits while an older event of the same aggregate is still
+    # pending, even if that one is locked by another relay or backing off.
+    blocked = OutboxEvent.objects.filter(
+        status=OutboxEvent.Status.PENDING,
+        aggregate_type=OuterRef("aggregate_type"),
+        aggregate_id=OuterRef("aggregate_id"),
+        id__lt=OuterRef("id"),
+    )
+    return list(
+        OutboxEvent.objects.select_for_update(skip_locked=True)
+        .filter(status=OutboxEvent.Status.PENDING, available_at__lte=now)
+        .exclude(Exists(blocked))
+        .order_by("id")[:batch_size]
+    )
+
+
+def relay_batch(batch_size: Optional[int] = None, connection=None) -> RelayResult:
+    """
+    Publish one batch of pending events with a single pipelined round-trip.
+
+    Rows are claimed with ``SELECT ... FOR UPDATE SKIP LOCKED`` so several
+    relays can run side by side; per-aggregate order is preserved because an
+    event is only eligible once every older event of its aggregate is out of
+    the ``pending`` state. Failed events are retried with exponential backoff
+    and parked as ``failed`` after ``OUTBOX_MAX_ATTEMPTS``.
+    """
+    batch_size = batch_size or getattr(settings, "OUTBOX_BATCH_SIZE", 500)
+    max_attempts = getattr(settings, "OUTBOX_MAX_ATTEMPTS", 10)
+    maxlen = getattr(settings, "OUTBOX_STREAM_MAXLEN", None)
+    result = RelayResult()
+
+    with transaction.atomic():
+        events = _claim_batch(batch_size)
+        if not events:
+            return result
+        try:
+            with _publish_span(events):
+                conn = connection or get_redis_connection("default")
+                pipeline = conn.pipeline(transaction=False)
+                for event in events:
+                    pipeline.xadd(event.stream, _stream_fields(event.payload), maxlen=maxlen, approximate=True)
+                replies = pipeline.execute(raise_on_error=False)
+        except Exception as exc:  # pragma: no cover - network errors
+            logger.warning("Failed to relay %s outbox events: %s", len(events), exc)
+            replies = [exc] * len(events)
+
+        now = timezone.now()
+        stalled = set()
+        for event, reply in zip(events, replies):
+            aggregate = (event.aggregate_type, event.aggregate_id)
+            if aggregate in stalled or isinstance(reply, Exception):
+                # Later events of a failed aggregate must not overtake it.
+                stalled.add(aggregate)
+                event.attempts += 1
+                event.last_error = str(reply) if isinstance(reply, Exception) else "Ожидает предыдущее событие."
+                if event.attempts >= max_attempts:
+                    event.status = OutboxEvent.Status.FAILED
+                    result.failed += 1
+                    STREAM_PUBLISH_FAILURES.inc(event.stream, "failed")
+                else:
+                    event.available_at = now + _retry_delay(event.attempts)
+                    result.retried += 1
+                    STREAM_PUBLISH_FAILURES.inc(event.stream, "retried")
+                continue
+            event.status = OutboxEvent.Status.PUBLISHED
+            event.stream_id = reply.decode() if isinstance(reply, bytes) else str(reply)
+            event.published_at = now
+            event.last_error = ""
+            result.published += 1
+            result.events.append(event)
+            STREAM_EVENTS_PUBLISHED.inc(event.stream)
+
+        OutboxEvent.objects.bulk_update(
+            events, ["status", "stream_id", "attempts", "last_error", "available_at", "published_at"]
+        )
+        if result.events:
+            published = list(result.events)
+            transaction.on_commit(lambda: events_published.send(sender=OutboxEvent, events=published))
+    if result.failed:
+        logger.error("%s outbox events exceeded %s attempts", result.failed, max_attempts)
+    return result
+
+
+def relay_pending(batch_size: Optional[int] = None, max_batches: Optional[int] = None, connection=None) -> RelayResult:
+    """Drain the outbox batch by batch until it is empty or ``max_batches`` is reached."""
+    total = RelayResult()
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        result = relay_batch(batch_size, connection=connection)
+        batches += 1
+        total.published += result.published
+        total.retried += result.retried
+        total.failed += result.failed
+        if not result.published:
+            break
+    return total
+
+
+def outbox_stats() -> Dict[str, object]:
+    """Backlog size and age of the oldest pending event, for monitoring."""
+    pending = OutboxEvent.objects.filter(status=OutboxEvent.Status.PENDING)
+    oldest = pending.aggregate(oldest=Min("created_at"))["oldest"]
+    return {
+        "pending": pending.count(),
+        "failed": OutboxEvent.objects.filter(status=OutboxEvent.Status.FAILED).count(),
+        "oldest_pending_age": (timezone.now() - oldest).total_seconds() if oldest else 0.0,
+    }
+
+
+def purge_published(older_than: timedelta) -> int:
+    deleted, _ = OutboxEvent.objects.filter(
+        status=OutboxEvent.Status.PUBLISHED, published_at__lt=timezone.now() - older_than
+    ).delete()
+    return deleted
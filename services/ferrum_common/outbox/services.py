@@ -0,0 +1,41 @@
+from __future__ import annotations
+
+from typing import Iterable, List, Mapping, Tuple
+
+from ferrum_common.tracing import inject_context
+
+from .models import OutboxEvent
+
+# (stream, aggregate_type, aggregate_id, payload)
+EventSpec = Tuple[str, str, object, Mapping[str, object]]
+
+
+def enqueue_event(stream: str, aggregate_type: str, aggregate_id, payload: Mapping[str, object]) -> OutboxEvent:
+    """
+    Record an event for ``stream``; it is relayed to Redis after the surrounding transaction commits.
+
+    Call it inside the transaction that changes the aggregate so the event and
+    the change are stored atomically. The current trace context travels in the
+    payload (``traceparent``) so consumers can continue the trace.
+    """
+    return OutboxEvent.objects.create(
+        stream=stream,
+        aggregate_type=aggregate_type,
+        aggregate_id=str(aggregate_id),
+        payload=inject_context(dict(payload)),
+    )
+
+
+def enqueue_events(events: Iterable[EventSpec]) -> List[OutboxEvent]:
+    """Record several events with a single INSERT, keeping their order."""
+    trace_fields = inject_context()
+    rows = [
+        OutboxEvent(
+            stream=stream,
+            aggregate_type=aggregate_type,
+            aggregate_id=str(aggregate_id),
+            payload={**payload, **trace_fields},
+        )
+        for stream, aggregate_type, aggregate_id, payload in events
+    ]
+    return OutboxEvent.objects.bulk_create(rows) if rows else []
@@ -0,0 +1,7 @@
+from __future__ import annotations
+
+from django.dispatch import Signal
+
+# Sent after a relay batch commits; ``events`` are the ``OutboxEvent`` rows
+# that reached Redis, with ``stream_id`` filled in.
+events_published = Signal()
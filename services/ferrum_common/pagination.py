@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Optional
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+@dataclass(frozen=True)
+class Cursor:
+    field: str
+    value: Any
+    pk: Any
+    reverse: bool
+
+
+def _get_value(obj, name: str):
+    if isinstance(obj, dict):
+        return obj[name]
+    return getattr(obj, name)
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset pagination over ``(<ordering field>, id)``.
+
+    The ordering is taken from the queryset itself, so ``OrderingFilter`` and
+    ``Meta.ordering`` keep working; ``id`` is always appended as a tiebreaker.
+    Every page is a single indexed range scan regardless of its depth.
+    """
+
+    page_size = 24
+    max_page_size = 100
+    page_size_query_param = "page_size"
+    cursor_query_param = "cursor"
+    tiebreaker = "id"
+    invalid_cursor_message = "Некорректный курсор."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.field, self.descending = self.get_ordering(queryset)
+
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor.reverse)
+        queryset = queryset.order_by(*self._order_by(reverse))
+        if cursor is not None:
+            queryset = queryset.filter(self._position_filter(cursor))
+
+        results = list(queryset[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                return _positive_int(
+                    request.query_params[self.page_size_query_param], strict=True, cutoff=self.max_page_size
+                )
+            except (KeyError, ValueError):
+                pass
+        return self.page_size
+
+    def get_ordering(self, queryset):
+        ordering = list(queryset.query.order_by or queryset.model._meta.ordering or ())
+        field = next((item for item in ordering if isinstance(item, str)), f"-{self.tiebreaker}")
+        return field.lstrip("-"), field.startswith("-")
+
+    def _order_by(self, reverse: bool):
+        descending = self.descending != reverse
+        prefix = "-" if descending else ""
+        if self.field in (self.tiebreaker, "pk"):
+            return (f"{prefix}{self.tiebreaker}",)
+        return (f"{prefix}{self.field}", f"{prefix}{self.tiebreaker}")
+
+    def _position_filter(self, cursor: Cursor) -> Q:
+        lookup = "lt" if self.descending != cursor.reverse else "gt"
+        after_pk = Q(**{f"{self.tiebreaker}__{lookup}": cursor.pk})
+        if self.field in (self.tiebreaker, "pk"):
+            return after_pk
+        return Q(**{f"{self.field}__{lookup}": cursor.value}) | (Q(**{self.field: cursor.value}) & after_pk)
+
+    def decode_cursor(self, request) -> Optional[Cursor]:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode("ascii")))
+            cursor = Cursor(field=data["f"], value=data["v"], pk=data["i"], reverse=bool(data.get("r")))
+        except (TypeError, ValueError, KeyError, UnicodeEncodeError, binascii.Error) as exc:
+            raise NotFound(self.invalid_cursor_message) from exc
+        if cursor.field != self.field:
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    def encode_cursor(self, obj, reverse: bool) -> str:
+        data = {
+            "f": self.field,
+            "v": _encode_value(_get_value(obj, self.field)) if self.field != "pk" else None,
+            "i": _get_value(obj, self.tiebreaker),
+            "r": reverse,
+        }
+        encoded = base64.urlsafe_b64encode(json.dumps(data, separators=(",", ":")).encode()).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(
+            OrderedDict(
+                [
+                    ("next", self.get_next_link()),
+                    ("previous", self.get_previous_link()),
+                    ("results", data),
+                ]
+            )
+        )
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Курсор страницы из ссылок next/previous.",
+                "schema": {"type": "string"},
+            },
+            {
+                "name": self.page_size_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Количество элементов на странице.",
+                "schema": {"type": "integer"},
+            },
+        ]
@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import orjson
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+
+from .renderers import ORJSONRenderer
+
+
+class ORJSONParser(JSONParser):
+    """``JSONParser`` backed by orjson; non UTF-8 bodies are decoded first."""
+
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get("encoding", settings.DEFAULT_CHARSET)
+        body = stream.read() if stream is not None else b""
+        if encoding.lower().replace("-", "") != "utf8":
+            body = body.decode(encoding)
+        try:
+            return orjson.loads(body)
+        except (orjson.JSONDecodeError, UnicodeDecodeError) as exc:
+            raise ParseError(f"JSON parse error - {exc}")
+
+
+class JSONPatchParser(ORJSONParser):
+    """RFC 6902 ``application/json-patch+json`` bodies."""
+
+    media_type = "application/json-patch+json"
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import time
+import traceback
+from collections import Counter
+from contextlib import ExitStack
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from django.conf import settings
+from django.db import connections
+from django.http import JsonResponse
+
+logger = logging.getLogger(__name__)
+
+# ``IN (%s, %s, ...)`` lists of any length share one shape.
+_PARAM_LIST = re.compile(r"\((?:\s*%s\s*,)+\s*%s\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+_IGNORED = ("SAVEPOINT", "RELEASE SAVEPOINT", "ROLLBACK TO SAVEPOINT")
+
+
+class QueryBudgetExceeded(AssertionError):
+    """A request ran more queries than its budget or repeated a query shape (N+1)."""
+
+
+def query_shape(sql: str) -> str:
+    """``sql`` with parameter lists collapsed, so per-row repetitions of a query compare equal."""
+    return _WHITESPACE.sub(" ", _PARAM_LIST.sub("(%s...)", sql)).strip()
+
+
+def _origin() -> str:
+    # The innermost frame of service code (or its tests) that issued the query.
+    root = str(Path(settings.BASE_DIR).parent)
+    for frame in reversed(traceback.extract_stack()[:-3]):
+        if frame.filename.startswith(root) and frame.filename != __file__:
+            return f"{frame.filename[len(root) + 1:]}:{frame.lineno} in {frame.name}"
+    return "unknown"
+
+
+@dataclass
+class QueryReport:
+    count: int = 0
+    duration: float = 0.0
+    shapes: Counter = field(default_factory=Counter)
+    origins: Dict[str, str] = field(default_factory=dict)
+    threshold: int = 3
+
+    def repeated(self) -> Dict[str, int]:
+        """Query shapes executed at least ``threshold`` times: the N+1 suspects."""
+        return {shape: count for shape, count in self.shapes.items() if count >= self.threshold}
+
+    def describe(self) -> str:
+        lines = [f"{self.count} queries in {self.duration * 1000:.1f}ms"]
+        for shape, count in sorted(self.repeated().items(), key=lambda item: -item[1]):
+            lines.append(f"  N+1 x{count} at {self.origins.get(shape, 'unknown')}: {shape[:200]}")
+        return "\n".join(lines)
+
+
+class QueryRecorder:
+    """
+    Record the queries of every database connection of this thread.
+
+    Use as a context manager; the report is filled as queries run, so a
+    streaming response can keep recording after the view has returned.
+    """
+
+    def __init__(self, threshold: Optional[int] = None):
+        if threshold is None:
+            threshold = getattr(settings, "QUERY_BUDGET_N_PLUS_ONE_THRESHOLD", 3)
+        self.report = QueryReport(threshold=threshold)
+        self._stack: Optional[ExitStack] = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            report = self.report
+            report.duration += time.perf_counter() - started
+            if not sql.lstrip().upper().startswith(_IGNORED):
+                report.count += 1
+                shape = query_shape(sql)
+                report.shapes[shape] += 1
+                if report.shapes[shape] == report.threshold:
+                    report.origins[shape] = _origin()
+
+    def __enter__(self) -> QueryReport:
+        self._stack = ExitStack()
+        for connection in connections.all():
+            self._stack.enter_context(connection.execute_wrapper(self))
+        return self.report
+
+    def __exit__(self, *exc_info) -> None:
+        self._stack.close()
+
+
+class _ViewStats:
+    """Per-view query totals of this process, for ``QUERY_BUDGET_STATS_PATH`` in development."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views: Dict[str, Dict[str, float]] = {}
+
+    def add(self, view: str, report: QueryReport) -> None:
+        with self._lock:
+            stats = self._views.setdefault(
+                view, {"requests": 0, "queries": 0, "max_queries": 0, "db_ms": 0.0, "n_plus_one": 0}
+            )
+            stats["requests"] += 1
+            stats["queries"] += report.count
+            stats["max_queries"] = max(stats["max_queries"], report.count)
+            stats["db_ms"] += report.duration * 1000
+            stats["n_plus_one"] += bool(report.repeated())
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            return {view: dict(stats) for view, stats in sorted(self._views.items())}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._views.clear()
+
+
+view_stats = _ViewStats()
+
+
+def budget_for(view_name: str, method: str = "GET") -> Optional[int]:
+    """``QUERY_BUDGETS["<METHOD> <view name>"]``, then ``QUERY_BUDGETS["<view name>"]``, then the default."""
+    budgets = getattr(settings, "QUERY_BUDGETS", {})
+    default = budgets.get(view_name, getattr(settings, "QUERY_BUDGET_DEFAULT", None))
+    return budgets.get(f"{method} {view_name}", default)
+
+
+def check_report(
+    view_name: str, report: QueryReport, budget: Optional[int] = None, method: str = "GET"
+) -> List[str]:
+    """Budget and N+1 violations of one request, as human readable messages."""
+    problems = []
+    budget = budget_for(view_name, method) if budget is None else budget
+    if budget is not None and report.count > budget:
+        problems.append(f"{view_name}: {report.count} queries, budget {budget}")
+    if report.repeated():
+        problems.append(f"{view_name}: repeated query shapes (N+1)")
+    return problems
+
+
+class QueryBudgetMiddleware:
+    """
+    Count the queries of each request and flag N+1 patterns.
+
+    Active when ``QUERY_BUDGET_ENABLED`` is set (``DEBUG`` by default).
+    Responses get ``X-Query-Count``/``X-Query-Time-Ms`` headers, requests
+    over their ``QUERY_BUDGETS`` entry (see ``budget_for``) or repeating a
+    query shape ``QUERY_BUDGET_N_PLUS_ONE_THRESHOLD`` times are logged, or
+    raise ``QueryBudgetExceeded`` with ``QUERY_BUDGET_RAISE`` (the test
+    suites). With ``DEBUG``, ``QUERY_BUDGET_STATS_PATH`` serves the per-view
+    totals collected by this process.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, "QUERY_BUDGET_ENABLED", settings.DEBUG):
+            return self.get_response(request)
+        if settings.DEBUG and request.path == getattr(settings, "QUERY_BUDGET_STATS_PATH", "/_debug/queries/"):
+            if request.method == "DELETE":
+                view_stats.reset()
+            return JsonResponse(view_stats.snapshot(), json_dumps_params={"ensure_ascii": False})
+
+        recorder = QueryRecorder()
+        recorder.__enter__()
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            recorder.__exit__(None, None, None)
+            raise
+        if response.streaming:
+            response.streaming_content = self._finish_streaming(request, response.streaming_content, recorder)
+            return response
+        recorder.__exit__(None, None, None)
+        self._finish(request, recorder.report, response)
+        return response
+
+    def _finish_streaming(self, request, chunks: Iterable[bytes], recorder: QueryRecorder) -> Iterator[bytes]:
+        try:
+            yield from chunks
+        finally:
+            recorder.__exit__(None, None, None)
+            self._finish(request, recorder.report, None)
+
+    def _finish(self, request, report: QueryReport, response) -> None:
+        match = getattr(request, "resolver_match", None)
+        view_name = (match.view_name if match else None) or request.path
+        if response is not None:
+            response["X-Query-Count"] = str(report.count)
+            response["X-Query-Time-Ms"] = f"{report.duration * 1000:.1f}"
+        view_stats.add(f"{request.method} {view_name}", report)
+        problems = check_report(view_name, report, method=request.method)
+        if not problems:
+            return
+        message = "; ".join(problems) + "\n" + report.describe()
+        if getattr(settings, "QUERY_BUDGET_RAISE", False):
+            raise QueryBudgetExceeded(message)
+        logger.warning("%s %s: %s", request.method, request.path, message)
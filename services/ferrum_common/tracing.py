@@ -0,0 +1,452 @@
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from functools import lru_cache, wraps
+from typing import Callable, Dict, Iterable, Iterator, Mapping, Optional, Sequence, Union
+
+from django.conf import settings
+from django.db import connections
+from django.utils.module_loading import import_string
+from opentelemetry import context as otel_context
+from opentelemetry import propagate, trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import ReadableSpan, TracerProvider
+from opentelemetry.sdk.trace.export import (
+    BatchSpanProcessor,
+    ConsoleSpanExporter,
+    SimpleSpanProcessor,
+    SpanExporter,
+    SpanExportResult,
+)
+from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+from opentelemetry.trace import Link, Span, SpanKind, Status, StatusCode
+
+from .query_budget import query_shape
+
+logger = logging.getLogger(__name__)
+
+TRACE_FIELDS = ("traceparent", "tracestate")
+
+
+class JSONLinesSpanExporter(SpanExporter):
+    """Append finished spans to a file, one JSON document per line; for offline runs without a collector."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: Sequence[ReadableSpan]) -> SpanExportResult:
+        lines = [span.to_json(indent=None) + "\n" for span in spans]
+        try:
+            with self._lock, open(self.path, "a", encoding="utf-8") as handle:
+                handle.writelines(lines)
+        except OSError as exc:  # pragma: no cover - filesystem errors
+            logger.warning("Failed to write %s spans to %s: %s", len(lines), self.path, exc)
+            return SpanExportResult.FAILURE
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self) -> None:
+        pass
+
+
+def build_exporter(name: str) -> Optional[SpanExporter]:
+    """
+    Exporter for a ``TRACING_EXPORTER`` value.
+
+    ``memory`` keeps spans in the process (tests), ``console`` prints them,
+    ``file`` appends JSON lines to ``TRACING_FILE_PATH``; any other value is
+    the dotted path of an exporter class or factory, e.g. the OTLP exporter.
+    An empty value or ``none`` disables tracing.
+    """
+    name = (name or "").strip()
+    if name.lower() in ("", "none"):
+        return None
+    if name == "memory":
+        return InMemorySpanExporter()
+    if name == "console":
+        return ConsoleSpanExporter()
+    if name == "file":
+        return JSONLinesSpanExporter(getattr(settings, "TRACING_FILE_PATH", "traces.jsonl"))
+    return import_string(name)()
+
+
+_lock = threading.Lock()
+_configured = False
+_provider: Optional[TracerProvider] = None
+_exporter: Optional[SpanExporter] = None
+
+
+def configure(exporter: Union[str, SpanExporter, None] = None) -> Optional[TracerProvider]:
+    """
+    (Re)build the tracer provider; ``exporter`` defaults to the ``TRACING_EXPORTER`` setting.
+
+    The provider is private to this module rather than the global OpenTelemetry
+    one, so tests can switch exporters freely. Returns ``None`` when tracing
+    is disabled; spans are then no-ops.
+    """
+    global _configured, _provider, _exporter
+    with _lock:
+        if _provider is not None:
+            _provider.shutdown()
+        if exporter is None:
+            exporter = getattr(settings, "TRACING_EXPORTER", "")
+        if isinstance(exporter, str):
+            exporter = build_exporter(exporter)
+        _exporter = exporter
+        _provider = None
+        if exporter is not None:
+            _provider = TracerProvider(
+                resource=Resource.create({"service.name": getattr(settings, "TRACING_SERVICE_NAME", "ferrum")}),
+                shutdown_on_exit=False,
+            )
+            # In-memory spans must be visible as soon as they end; real exporters get batched off the request path.
+            processor = SimpleSpanProcessor if isinstance(exporter, InMemorySpanExporter) else BatchSpanProcessor
+            _provider.add_span_processor(processor(exporter))
+        _configured = True
+        return _provider
+
+
+def _ensure_configured() -> None:
+    if not _configured:
+        configure()
+
+
+def enabled() -> bool:
+    _ensure_configured()
+    return _provider is not None
+
+
+def get_exporter() -> Optional[SpanExporter]:
+    _ensure_configured()
+    return _exporter
+
+
+def get_tracer() -> trace.Tracer:
+    _ensure_configured()
+    provider = _provider
+    return provider.get_tracer("ferrum") if provider is not None else trace.NoOpTracer()
+
+
+def force_flush() -> None:
+    if _provider is not None:
+        _provider.force_flush()
+
+
+def reset() -> None:
+    """Drop the tracer provider; the next span re-reads the ``TRACING_*`` settings (tests change them)."""
+    global _configured, _provider, _exporter
+    with _lock:
+        if _provider is not None:
+            _provider.shutdown()
+        _configured = False
+        _provider = _exporter = None
+
+
+def current_span() -> Span:
+    return trace.get_current_span()
+
+
+@contextmanager
+def span(
+    name: str,
+    kind: SpanKind = SpanKind.INTERNAL,
+    attributes: Optional[Dict[str, object]] = None,
+    context: Optional[otel_context.Context] = None,
+    links: Optional[Sequence[Link]] = None,
+) -> Iterator[Span]:
+    """Child span of the current one (or of ``context``); exceptions are recorded on it."""
+    with get_tracer().start_as_current_span(
+        name, context=context, kind=kind, attributes=attributes, links=links
+    ) as current:
+        yield current
+
+
+def traced(name: Optional[str] = None) -> Callable[[Callable], Callable]:
+    """Decorator wrapping every call of the function in a span named after it."""
+
+    def decorator(func: Callable) -> Callable:
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled():
+                return func(*args, **kwargs)
+            with span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def inject_context(carrier: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """W3C trace context of the current span (``traceparent``/``tracestate``); empty outside a trace."""
+    carrier = {} if carrier is None else carrier
+    if current_span().get_span_context().is_valid:
+        propagate.inject(carrier)
+    return carrier
+
+
+def extract_context(fields: Mapping[str, object]) -> otel_context.Context:
+    """Context continuing the trace whose ``traceparent`` travels in ``fields``."""
+    return propagate.extract({key: str(fields[key]) for key in TRACE_FIELDS if fields.get(key)})
+
+
+def link_from(fields: Mapping[str, object]) -> Optional[Link]:
+    span_context = trace.get_current_span(extract_context(fields)).get_span_context()
+    return Link(span_context) if span_context.is_valid else None
+
+
+def links_from(carriers: Iterable[Mapping[str, object]]) -> list:
+    return [link for link in map(link_from, carriers) if link is not None]
+
+
+class _QueryGroup:
+    __slots__ = ("parent", "shape", "span", "count", "ended")
+
+    def __init__(self, parent: Span, shape: str, span: Span, ended: int):
+        self.parent = parent
+        self.shape = shape
+        self.span = span
+        self.count = 1
+        self.ended = ended
+
+
+class _QuerySpans:
+    """
+    ``execute_wrapper`` turning database queries into spans.
+
+    Consecutive queries of the same shape under the same parent span (an
+    N+1 loop, a batch of saves) are folded into a single span carrying
+    ``db.query.count``, so a trace stays readable and cheap to export.
+    """
+
+    def __init__(self, tracer: trace.Tracer):
+        self.tracer = tracer
+        self.group: Optional[_QueryGroup] = None
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.time_ns()
+        error: Optional[BaseException] = None
+        try:
+            return execute(sql, params, many, context)
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            self._record(sql, context, started, time.time_ns(), error)
+
+    def _record(self, sql: str, context, started: int, ended: int, error: Optional[BaseException]) -> None:
+        parent = current_span()
+        shape = query_shape(sql)
+        group = self.group
+        if group is not None and group.parent is parent and group.shape == shape and error is None:
+            group.count += 1
+            group.ended = ended
+            return
+        self.flush()
+        operation = shape.split(" ", 1)[0].upper()
+        connection = context.get("connection")
+        db_span = self.tracer.start_span(
+            f"db {operation}",
+            context=trace.set_span_in_context(parent),
+            kind=SpanKind.CLIENT,
+            attributes={
+                "db.system": connection.vendor if connection is not None else "unknown",
+                "db.operation": operation,
+                "db.statement": shape[:2000],
+            },
+            start_time=started,
+        )
+        self.group = _QueryGroup(parent, shape, db_span, ended)
+        if error is not None:
+            db_span.record_exception(error)
+            db_span.set_status(Status(StatusCode.ERROR, str(error)))
+            self.flush()
+
+    def flush(self) -> None:
+        group, self.group = self.group, None
+        if group is not None:
+            group.span.set_attribute("db.query.count", group.count)
+            group.span.end(end_time=group.ended)
+
+
+class _RequestTrace:
+    __slots__ = ("span", "queries", "stack", "token", "view_span", "view_token")
+
+    def __init__(self, span: Span, queries: _QuerySpans, stack: ExitStack, token: object):
+        self.span = span
+        self.queries = queries
+        self.stack = stack
+        self.token = token
+        self.view_span: Optional[Span] = None
+        self.view_token: Optional[object] = None
+
+
+class TracingMiddleware:
+    """
+    Open a server span per request and a child span around the view.
+
+    The incoming W3C ``traceparent`` header is honoured, so a request made
+    by another traced service continues its trace. Database queries issued
+    while the request is handled become child spans (see ``_QuerySpans``),
+    and the response carries the trace id in ``X-Trace-Id``. Does nothing
+    unless ``TRACING_EXPORTER`` is set.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not enabled():
+            return self.get_response(request)
+        tracer = get_tracer()
+        parent = propagate.extract(request.headers)
+        server_span = tracer.start_span(
+            request.method,
+            context=parent,
+            kind=SpanKind.SERVER,
+            attributes={"http.request.method": request.method, "url.path": request.path},
+        )
+        token = otel_context.attach(trace.set_span_in_context(server_span, parent))
+        queries = _QuerySpans(tracer)
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(queries))
+        state = request._tracing = _RequestTrace(server_span, queries, stack, token)
+        try:
+            response = self.get_response(request)
+        except BaseException as exc:
+            server_span.record_exception(exc)
+            self._finish(request, state, 500)
+            raise
+        response["X-Trace-Id"] = format(server_span.get_span_context().trace_id, "032x")
+        if response.streaming:
+            # The body is produced after this middleware returns: close the view
+            # span and leave the context now, the generator re-enters the trace.
+            self._end_view(state)
+            otel_context.detach(state.token)
+            response.streaming_content = self._finish_streaming(
+                request, state, response.status_code, response.streaming_content
+            )
+            return response
+        self._finish(request, state, response.status_code)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        state = getattr(request, "_tracing", None)
+        if state is None:
+            return None
+        view_class = getattr(view_func, "cls", None)
+        name = view_class.__name__ if view_class is not None else getattr(view_func, "__qualname__", "view")
+        actions = getattr(view_func, "actions", None)
+        if actions and request.method.lower() in actions:
+            name = f"{name}.{actions[request.method.lower()]}"
+        state.queries.flush()
+        state.view_span = get_tracer().start_span(f"view {name}")
+        state.view_token = otel_context.attach(trace.set_span_in_context(state.view_span))
+        return None
+
+    def process_exception(self, request, exception):
+        state = getattr(request, "_tracing", None)
+        if state is not None and state.view_span is not None:
+            state.view_span.record_exception(exception)
+            state.view_span.set_status(Status(StatusCode.ERROR, str(exception)))
+        return None
+
+    def _finish_streaming(self, request, state: _RequestTrace, status: int, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        state.token = otel_context.attach(trace.set_span_in_context(state.span))
+        try:
+            yield from chunks
+        finally:
+            self._finish(request, state, status)
+
+    def _end_view(self, state: _RequestTrace) -> None:
+        state.queries.flush()
+        if state.view_span is not None:
+            otel_context.detach(state.view_token)
+            state.view_span.end()
+            state.view_span = state.view_token = None
+
+    def _finish(self, request, state: _RequestTrace, status: int) -> None:
+        self._end_view(state)
+        state.stack.close()
+        state.queries.flush()
+        match = getattr(request, "resolver_match", None)
+        route = (match.view_name if match else None) or "unmatched"
+        server_span = state.span
+        server_span.update_name(f"{request.method} {route}")
+        server_span.set_attribute("http.route", match.route if match else route)
+        server_span.set_attribute("http.response.status_code", status)
+        if status >= 500:
+            server_span.set_status(Status(StatusCode.ERROR))
+        otel_context.detach(state.token)
+        server_span.end()
+
+
+def _serializer_name(serializer) -> str:
+    child = getattr(serializer, "child", None)
+    return f"{type(child).__name__}[]" if child is not None else type(serializer).__name__
+
+
+class _TracedSerializerMixin:
+    """Spans around ``.data``, ``is_valid()`` and ``save()`` of one serializer class."""
+
+    @property
+    def data(self):
+        # ``.data`` is cached after the first access; only the first one does any work.
+        if hasattr(self, "_data") or not enabled():
+            return super().data
+        with span(f"serialize {_serializer_name(self)}"):
+            return super().data
+
+    def is_valid(self, *args, **kwargs):
+        if not enabled():
+            return super().is_valid(*args, **kwargs)
+        with span(f"validate {_serializer_name(self)}"):
+            return super().is_valid(*args, **kwargs)
+
+    def save(self, **kwargs):
+        if not enabled():
+            return super().save(**kwargs)
+        with span(f"save {_serializer_name(self)}"):
+            return super().save(**kwargs)
+
+
+@lru_cache(maxsize=None)
+def traced_serializer_class(serializer_class: type) -> type:
+    """
+    Subclass of ``serializer_class`` tracing its top-level entry points.
+
+    ``many=True`` instances use a traced list serializer as well. Nested
+    serializers keep their own classes: they render through
+    ``to_representation`` and are covered by their parent's span.
+    """
+    from rest_framework.serializers import ListSerializer
+
+    attrs: Dict[str, object] = {
+        "__module__": serializer_class.__module__,
+        "__qualname__": serializer_class.__qualname__,
+    }
+    if not issubclass(serializer_class, ListSerializer):
+        meta = getattr(serializer_class, "Meta", None)
+        list_class = getattr(meta, "list_serializer_class", ListSerializer)
+        attrs["Meta"] = type(
+            "Meta", (meta,) if meta is not None else (), {"list_serializer_class": traced_serializer_class(list_class)}
+        )
+    return type(serializer_class.__name__, (_TracedSerializerMixin, serializer_class), attrs)
+
+
+class TracedViewMixin:
+    """
+    DRF generic view mixin: serializers from ``get_serializer()`` report
+    ``serialize``/``validate``/``save`` spans under the view span while
+    tracing is enabled.
+    """
+
+    def get_serializer_class(self):
+        serializer_class = super().get_serializer_class()
+        return traced_serializer_class(serializer_class) if enabled() else serializer_class
@@ -0,0 +1,327 @@
+"""
+Load test for the hot endpoints of locally running services.
+
+Locust-style: ``--users`` virtual users run for ``--duration`` seconds,
+each picking weighted tasks of the services given on the command line.
+Seed the services first (``manage.py seed_benchmark`` in catalog and
+content), then for example::
+
+    python services/loadtest.py --catalog http://localhost:8001 --content http://localhost:8002 \
+        --auth http://localhost:8000 --users 16 --duration 60 --output results/$(git rev-parse --short HEAD).json
+
+Throughput and p50/p95/p99 per endpoint are printed and written as JSON;
+``--compare`` prints the change against an earlier result file. Only the
+standard library and the shared ``benchmarking`` helpers next to it are used,
+so the script runs from any checkout.
+"""
+
+from __future__ import annotations
+
+import argparse
+import http.client
+import json
+import random
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+from benchmarking import percentile
+
+
+class HTTPClient:
+    """Keep-alive connections of one virtual user, one per service."""
+
+    def __init__(self, timeout: float = 30.0):
+        self.timeout = timeout
+        self._connections: Dict[str, http.client.HTTPConnection] = {}
+
+    def request(
+        self, method: str, url: str, body: Optional[dict] = None, headers: Optional[Dict[str, str]] = None
+    ) -> Tuple[int, bytes]:
+        parts = urlsplit(url)
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+        payload = json.dumps(body).encode() if body is not None else None
+        headers = {"Accept": "application/json", **(headers or {})}
+        if payload is not None:
+            headers["Content-Type"] = "application/json"
+        for attempt in range(2):
+            connection = self._connection(parts.scheme, parts.netloc)
+            try:
+                connection.request(method, path, body=payload, headers=headers)
+                response = connection.getresponse()
+                return response.status, response.read()
+            except (http.client.HTTPException, ConnectionError):
+                # The server closed an idle keep-alive connection; retry once on a fresh one.
+                connection.close()
+                self._connections.pop(parts.netloc, None)
+                if attempt:
+                    raise
+        raise AssertionError("unreachable")
+
+    def _connection(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        connection = self._connections.get(netloc)
+        if connection is None:
+            factory = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            connection = self._connections[netloc] = factory(netloc, timeout=self.timeout)
+        return connection
+
+    def get_json(self, url: str, **headers):
+        status, body = self.request("GET", url, headers=headers)
+        if status != 200:
+            raise RuntimeError(f"GET {url} answered {status}: {body[:200]!r}")
+        return json.loads(body)
+
+
+Request = Tuple[str, str, Optional[dict], Dict[str, str]]
+
+
+@dataclass
+class Task:
+    name: str
+    weight: int
+    # Returns method, url, body and headers of the timed request, or None when this user skips the task.
+    # Requests the task needs beforehand (filling a basket) go through the client and are not timed.
+    build: Callable[[random.Random, HTTPClient, int], Optional[Request]]
+    expected: Tuple[int, ...] = (200,)
+    # Statuses counted as ``rate_limited`` rather than errors; their latency is not timed.
+    limited: Tuple[int, ...] = ()
+
+
+def get(url: Callable[[random.Random], str]) -> Callable[[random.Random, HTTPClient, int], Request]:
+    return lambda rnd, client, user: ("GET", url(rnd), None, {})
+
+
+@dataclass
+class EndpointStats:
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+    rate_limited: int = 0
+    statuses: Dict[str, int] = field(default_factory=dict)
+
+    def summary(self, elapsed: float) -> Dict[str, float]:
+        count = len(self.latencies) + self.errors + self.rate_limited
+        return {
+            "requests": count,
+            "errors": self.errors,
+            "rate_limited": self.rate_limited,
+            "throughput_rps": round(count / elapsed, 1) if elapsed else 0.0,
+            "mean_ms": round(sum(self.latencies) / len(self.latencies) * 1000, 2) if self.latencies else 0.0,
+            **{f"p{q}_ms": round(percentile(self.latencies, q) * 1000, 2) for q in (50, 95, 99)},
+            "statuses": dict(self.statuses),
+        }
+
+
+def _results(items) -> list:
+    return items["results"] if isinstance(items, dict) and "results" in items else items
+
+
+def catalog_tasks(base: str, tokens: Sequence[str], client: HTTPClient, basket_size: int) -> List[Task]:
+    products = [item["id"] for item in _results(client.get_json(f"{base}/api/v1/goods/?page_size=100"))]
+    roots = [item["id"] for item in _results(client.get_json(f"{base}/api/v1/categories/")) if not item.get("parent")]
+    if not products:
+        raise RuntimeError("catalog has no products, run `manage.py seed_benchmark` first")
+    tasks = [
+        Task("goods-list", 30, get(lambda rnd: f"{base}/api/v1/goods/")),
+        Task("goods-detail", 40, get(lambda rnd: f"{base}/api/v1/goods/{rnd.choice(products)}/")),
+        Task("category-tree", 15, get(lambda rnd: f"{base}/api/v1/categories/?tree=true")),
+    ]
+    if roots:
+        tasks.append(
+            Task("goods-list-category", 10, get(lambda rnd: f"{base}/api/v1/goods/?category_tree={rnd.choice(roots)}"))
+        )
+    if not tokens:
+        return tasks
+
+    auth = {"Authorization": f"Bearer {tokens[0]}"}
+    payment = _results(client.get_json(f"{base}/api/v1/payments/methods/", **auth))[0]["id"]
+    delivery = _results(client.get_json(f"{base}/api/v1/deliveries/methods/", **auth))[0]["id"]
+
+    def checkout(rnd, user_client: HTTPClient, user: int) -> Optional[Request]:
+        # A checkout consumes the basket, so each user refills its own basket (one token per user) first.
+        if user >= len(tokens):
+            return None
+        headers = {"Authorization": f"Bearer {tokens[user]}"}
+        basket = []
+        for product in rnd.sample(products, min(basket_size, len(products))):
+            status, body = user_client.request(
+                "POST", f"{base}/api/v1/me/basket-items/", {"product": product, "count": 1}, headers
+            )
+            if status in (200, 201):
+                basket.append(json.loads(body)["id"])
+        payload = {
+            "payment_method": payment,
+            "delivery_method": delivery,
+            "basket_item_ids": basket,
+            "recipient_data": {"full_name": "Нагрузочный Тест"},
+        }
+        return "POST", f"{base}/api/v1/checkouts/", payload, headers
+
+    tasks.append(Task("checkout-create", 5, checkout, (201,)))
+    return tasks
+
+
+def content_tasks(base: str, client: HTTPClient) -> List[Task]:
+    pages = [page["slug"] for page in client.get_json(f"{base}/api/v1/pages/published/")]
+    news = [article["id"] for article in _results(client.get_json(f"{base}/api/v1/public/news/?page_size=100"))]
+    if not pages:
+        raise RuntimeError("content has no published pages, run `manage.py seed_benchmark` first")
+    tasks = [
+        Task("published-page", 40, get(lambda rnd: f"{base}/api/v1/pages/published/{rnd.choice(pages)}/")),
+        Task("compiled-page", 20, get(lambda rnd: f"{base}/api/v1/pages/compiled/{rnd.choice(pages)}/?include=blocks")),
+        Task("public-news", 25, get(lambda rnd: f"{base}/api/v1/public/news/")),
+    ]
+    if news:
+        tasks.append(Task("public-news-detail", 15, get(lambda rnd: f"{base}/api/v1/public/news/{rnd.choice(news)}/")))
+    return tasks
+
+
+def auth_tasks(base: str) -> List[Task]:
+    # Codes are delivered by e-mail only, so confirmation is measured on its rejection path.
+    # All users share one address: unless auth_service runs with its IP limits off, 429s follow the limit.
+    def login(rnd, client, user):
+        return "POST", f"{base}/api/v1/auth/login/", {"email": f"load-{rnd.randrange(10**6)}@bench.local"}, {}
+
+    def confirm(rnd, client, user):
+        body = {"email": f"load-{rnd.randrange(10**6)}@bench.local", "code": "000000"}
+        return "POST", f"{base}/api/v1/auth/confirm/", body, {}
+
+    return [
+        Task("otp-login", 50, login, limited=(429,)),
+        Task("otp-confirm-rejected", 50, confirm, (400,), limited=(429,)),
+    ]
+
+
+def run(tasks: List[Task], users: int, duration: float, seed: int) -> Tuple[Dict[str, EndpointStats], float]:
+    stats = {task.name: EndpointStats() for task in tasks}
+    weights = [task.weight for task in tasks]
+    deadline = time.monotonic() + duration
+    lock = threading.Lock()
+
+    def user(index: int) -> None:
+        rnd = random.Random(seed + index)
+        client = HTTPClient()
+        local = {task.name: EndpointStats() for task in tasks}
+        while time.monotonic() < deadline:
+            task = rnd.choices(tasks, weights)[0]
+            request = task.build(rnd, client, index)
+            if request is None:
+                continue
+            method, url, body, headers = request
+            started = time.perf_counter()
+            try:
+                status, _ = client.request(method, url, body, headers)
+            except (OSError, http.client.HTTPException):
+                status = 0
+            elapsed = time.perf_counter() - started
+            entry = local[task.name]
+            entry.statuses[str(status)] = entry.statuses.get(str(status), 0) + 1
+            if status in task.expected:
+                entry.latencies.append(elapsed)
+            elif status in task.limited:
+                entry.rate_limited += 1
+            else:
+                entry.errors += 1
+        with lock:
+            for name, entry in local.items():
+                stats[name].latencies.extend(entry.latencies)
+                stats[name].errors += entry.errors
+                stats[name].rate_limited += entry.rate_limited
+                for status, count in entry.statuses.items():
+                    stats[name].statuses[status] = stats[name].statuses.get(status, 0) + count
+
+    started = time.monotonic()
+    threads = [threading.Thread(target=user, args=(index,), daemon=True) for index in range(users)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return stats, time.monotonic() - started
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current: dict, previous: dict) -> None:
+    print(f"\nagainst {previous.get('commit') or 'previous run'}:")
+    for name, now in current["endpoints"].items():
+        before = previous.get("endpoints", {}).get(name)
+        if not before:
+            continue
+        changes = []
+        for metric in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+            if before[metric]:
+                changes.append(f"{metric} {(now[metric] - before[metric]) / before[metric] * 100:+.1f}%")
+        print(f"  {name:24} " + ", ".join(changes))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--catalog", help="base URL of catalog_service")
+    parser.add_argument(
+        "--catalog-token",
+        action="append",
+        default=[],
+        help="JWT of a buyer, once per user placing orders (see `seed_benchmark --tokens`); enables checkout-create",
+    )
+    parser.add_argument("--basket-size", type=int, default=50)
+    parser.add_argument("--content", help="base URL of content_service")
+    parser.add_argument("--auth", help="base URL of auth_service")
+    parser.add_argument("--users", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="JSON results of an earlier run")
+    args = parser.parse_args(argv)
+
+    client = HTTPClient()
+    tasks: List[Task] = []
+    if args.catalog:
+        tasks += catalog_tasks(args.catalog.rstrip("/"), args.catalog_token, client, args.basket_size)
+    if args.content:
+        tasks += content_tasks(args.content.rstrip("/"), client)
+    if args.auth:
+        tasks += auth_tasks(args.auth.rstrip("/"))
+    if not tasks:
+        parser.error("give at least one of --catalog, --content, --auth")
+
+    stats, elapsed = run(tasks, args.users, args.duration, args.seed)
+    result = {
+        "id": str(uuid.uuid4()),
+        "commit": git_commit(),
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "users": args.users,
+        "duration": round(elapsed, 2),
+        "endpoints": {name: entry.summary(elapsed) for name, entry in stats.items()},
+    }
+    total = sum(entry["requests"] for entry in result["endpoints"].values())
+    result["throughput_rps"] = round(total / elapsed, 1)
+
+    print(f"{'endpoint':24} {'req':>7} {'err':>5} {'429':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}  (ms)")
+    for name, entry in result["endpoints"].items():
+        print(
+            f"{name:24} {entry['requests']:>7} {entry['errors']:>5} {entry['rate_limited']:>5} "
+            f"{entry['throughput_rps']:>8} {entry['p50_ms']:>8} {entry['p95_ms']:>8} {entry['p99_ms']:>8}"
+        )
+    print(f"total {total} requests, {result['throughput_rps']} rps")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(result, handle, ensure_ascii=False, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as handle:
+            compare(result, json.load(handle))
+    return 0 if all(entry["errors"] == 0 for entry in result["endpoints"].values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,6 +3,7 @@ from __future__ import annotations
 from django.contrib.auth import get_user_model
 from rest_framework import filters, permissions, serializers, viewsets
 
+from ferrum_common.tracing import TracedViewMixin
 from recipients.models import Recipient
 
 User = get_user_model()
@@ -35,7 +36,7 @@ class MyRecipientSerializer(RecipientSerializer):
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
 
 
-class RecipientViewSet(viewsets.ModelViewSet):
+class RecipientViewSet(TracedViewMixin, viewsets.ModelViewSet):
     """Admin CRUD for managing all recipients."""
 
     queryset = Recipient.objects.select_related("user").all()
@@ -46,7 +47,7 @@ class RecipientViewSet(viewsets.ModelViewSet):
     ordering_fields = ("created_at", "city")
 
 
-class MyRecipientViewSet(viewsets.ModelViewSet):
+class MyRecipientViewSet(TracedViewMixin, viewsets.ModelViewSet):
     """Customer-facing CRUD limited to own recipients."""
 
     serializer_class = MyRecipientSerializer
@@ -3,6 +3,8 @@ from __future__ import annotations
 from django.contrib.auth import get_user_model
 from rest_framework import filters, permissions, serializers, viewsets
 
+from ferrum_common.tracing import TracedViewMixin
+
 User = get_user_model()
 
 
@@ -45,7 +47,7 @@ class UserSerializer(serializers.ModelSerializer):
         return instance
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(TracedViewMixin, viewsets.ModelViewSet):
     """CRUD операции для пользователей (административный доступ)."""
 
     serializer_class = UserSerializer
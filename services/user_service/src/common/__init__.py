@@ -0,0 +1 @@
+"""Shared helpers for user service."""
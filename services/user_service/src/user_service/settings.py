@@ -29,6 +29,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "ferrum_common.metrics.MetricsMiddleware",
+    "ferrum_common.tracing.TracingMiddleware",
+    "ferrum_common.query_budget.QueryBudgetMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -88,6 +91,15 @@ AUTH_USER_MODEL = "accounts.User"
 
 REST_FRAMEWORK = {
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
+    "DEFAULT_RENDERER_CLASSES": (
+        "ferrum_common.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "ferrum_common.parsers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
     "DEFAULT_AUTHENTICATION_CLASSES": ("rest_framework_simplejwt.authentication.JWTAuthentication",),
     "DEFAULT_FILTER_BACKENDS": [
@@ -108,3 +120,16 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=14),
 }
 
+# Query budgets per "<METHOD> <url name>", enforced by ferrum_common.query_budget.QueryBudgetMiddleware in tests.
+QUERY_BUDGET_ENABLED = os.getenv("QUERY_BUDGET_ENABLED", str(DEBUG)).lower() == "true"
+QUERY_BUDGET_N_PLUS_ONE_THRESHOLD = int(os.getenv("QUERY_BUDGET_N_PLUS_ONE_THRESHOLD", 3))
+QUERY_BUDGETS = {
+    "GET recipient-list": 2,
+    "GET my-recipient-list": 2,
+}
+
+# OpenTelemetry tracing (ferrum_common.tracing): "memory", "console", "file" (JSON lines in TRACING_FILE_PATH)
+# or a dotted path to an exporter class, e.g. the OTLP one. Empty disables tracing.
+TRACING_EXPORTER = os.getenv("TRACING_EXPORTER", "")
+TRACING_FILE_PATH = os.getenv("TRACING_FILE_PATH", str(BASE_DIR / "traces.jsonl"))
+TRACING_SERVICE_NAME = os.getenv("TRACING_SERVICE_NAME", "user_service")
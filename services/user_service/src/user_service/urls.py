@@ -7,6 +7,7 @@ from rest_framework.routers import DefaultRouter
 
 from api.users import UserViewSet
 from api.recipients import MyRecipientViewSet, RecipientViewSet
+from ferrum_common.metrics import metrics_view
 
 router = DefaultRouter()
 router.register(r"users", UserViewSet, basename="user")
@@ -15,6 +16,7 @@ router.register(r"me/recipients", MyRecipientViewSet, basename="my-recipient")
 
 urlpatterns = [
     path("admin/", admin.site.urls),
+    path("metrics", metrics_view, name="metrics"),
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path("api/docs/", SpectacularSwaggerView.as_view(url_name="schema"), name="docs"),
     path("api/v1/", include(router.urls)),